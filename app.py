@@ -1,15 +1,116 @@
 import streamlit as st
 import pandas as pd
+import io
 import os
-from src.data_sim import generate_data
 from src.etl import clean_and_standardize
 from src.logic import run_checks
-from src.reporter import generate_excel
-from src.privacy import apply_privacy
+from src.reporter import generate_excel, STYLE_FILLS
+from src.privacy import apply_privacy_many
+from src.instrument import RunLog, step
+from src.cache import ResultCache, content_key
+from src.preview import PAGE_SIZES, criterion_options, filter_queries, page_of
+from src.jobs import JobRunner, FINISHED, CANCELLED, FAILED
+
+DASHBOARD_STAGES = ["clean_and_standardize", "run_checks", "apply_privacy", "generate_excel"]
 
 # Page Config
 st.set_page_config(page_title="CDAS - Clinical Data Automation Suite", page_icon="🏥", layout="wide")
 
+@st.cache_resource
+def get_result_cache():
+    # Shared across sessions: ETL + check results keyed by a hash of the input bytes
+    return ResultCache(max_entries=8, max_bytes=512 * 1024 * 1024)
+
+@st.cache_resource
+def get_job_runner():
+    # Shared across sessions: at most 2 pipeline runs at a time, the rest queue
+    return JobRunner(max_workers=2)
+
+def run_dashboard_job(job, edc_bytes, lab_bytes, region, cache_key, result_cache):
+    """
+    Background job: ETL -> checks -> privacy -> in-memory report.
+    Runs in a worker thread, so it must not call st.* functions.
+    """
+    run_log = RunLog()
+    with run_log:
+        cached = result_cache.get(cache_key)
+        if cached is None:
+            # Parse straight from memory: no temp files, nothing shared between sessions
+            job.stage("clean_and_standardize")
+            with step("clean_and_standardize") as rec:
+                edc_df, lab_df = clean_and_standardize(io.BytesIO(edc_bytes), io.BytesIO(lab_bytes))
+                if edc_df is None or lab_df is None:
+                    raise ValueError("ETL Process Failed.")
+                rec["rows_out"] = len(edc_df) + len(lab_df)
+                
+            job.stage("run_checks")
+            with step("run_checks", rows_in=len(edc_df) + len(lab_df)) as rec:
+                safety_df, recon_df = run_checks(edc_df, lab_df)
+                rec["rows_out"] = len(safety_df) + len(recon_df)
+                
+            result_cache.put(cache_key, (edc_df, lab_df, safety_df, recon_df))
+        else:
+            edc_df, lab_df, safety_df, recon_df = cached
+            
+        # --- Privacy Layer ---
+        job.stage("apply_privacy")
+        with step("apply_privacy", rows_in=len(safety_df) + len(recon_df)):
+            safety_df_clean, recon_df_clean = apply_privacy_many([safety_df, recon_df], region)
+            
+        # Generate Report (in memory)
+        job.stage("generate_excel")
+        report = io.BytesIO()
+        with step("generate_excel", rows_in=len(safety_df) + len(recon_df)):
+            generate_excel(safety_df_clean, recon_df_clean, report)
+            
+    return {
+        "num_patients": edc_df["USUBJID"].nunique(),
+        "safety_df": safety_df_clean,
+        "recon_df": recon_df_clean,
+        "report": report.getvalue(),
+        "run_log": run_log.to_frame(),
+        "from_cache": cached is not None,
+    }
+
+@st.fragment(run_every=1.0)
+def show_job_progress(job_id):
+    """
+    Polls the background job; reruns the whole app once it has finished.
+    """
+    runner = get_job_runner()
+    job = runner.get(job_id)
+    if job is None or job.status in FINISHED:
+        st.rerun()
+    label = "Queued (waiting for a free worker)..." if job.current_stage is None else f"Running: {job.current_stage}..."
+    st.progress(job.progress, text=label)
+    if st.button("Cancel Run", key="cancel_job"):
+        runner.cancel(job_id)
+        st.rerun()
+
+def show_query_tab(df, output, fill_color):
+    """
+    Filtered, paginated preview of one query tab. Filtering and paging run on
+    the server; only the visible page is styled and sent to the browser.
+    """
+    if df.empty:
+        st.success(f"No {output} queries.")
+        return
+        
+    f1, f2, f3 = st.columns([1, 2, 2])
+    subject = f1.text_input("Subject contains", key=f"{output}_subject")
+    query_types = f2.multiselect("Query type", sorted(df["Query_Text"].dropna().unique()), key=f"{output}_types")
+    options = {label: c for label, c in criterion_options(output).items() if c["field"] in df.columns}
+    criterion = f3.selectbox("Criterion met", ["(any)"] + list(options), key=f"{output}_criterion")
+    
+    filtered = filter_queries(df, subject, query_types, options.get(criterion))
+    p1, p2, p3 = st.columns([1, 1, 2])
+    page_size = p1.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{output}_page_size")
+    requested = p2.number_input("Page", min_value=1, value=1, step=1, key=f"{output}_page")
+    page_df, page_no, num_pages = page_of(filtered, requested, page_size)
+    p3.caption(f"Page {page_no} of {num_pages} - {len(filtered):,} of {len(df):,} queries match")
+    
+    st.dataframe(page_df.style.map(lambda _: f"background-color: #{fill_color}", subset=["Query_Text"]))
+
 
 
 # Main Area
@@ -30,13 +131,14 @@ with st.expander("About This Pipeline"):
 col1, col2 = st.columns(2)
 
 with col1:
-    edc_file = st.file_uploader("Upload EDC Visits (.csv)", type=["csv"], help="Required columns: SubjectID, VisitDate, Raw_Temp, Raw_HR, Raw_RR, Blood_Draw_Performed")
+    edc_file = st.file_uploader("Upload EDC Visits (.csv / .parquet)", type=["csv", "parquet"], help="Required columns: SubjectID, VisitDate, Raw_Temp, Raw_HR, Raw_RR, Blood_Draw_Performed")
 
 with col2:
-    lab_file = st.file_uploader("Upload Lab Results (.csv)", type=["csv"], help="Required columns: SubjectID, VisitDate, SampleID, WBC")
+    lab_file = st.file_uploader("Upload Lab Results (.csv / .parquet)", type=["csv", "parquet"], help="Required columns: SubjectID, VisitDate, SampleID, WBC")
 
 if st.button("Use Demo Data", help="Generates synthetic clinical data with built-in dirtiness (typos, outliers) for testing."):
     with st.spinner("Generating demo data..."):
+        from src.data_sim import generate_data
         generate_data() # Generates raw_edc_visits.csv and raw_lab_results.csv in current dir
         st.success("Demo Data Generated!")
         # Simulating file upload by reading into session state or just using filenames later
@@ -50,95 +152,116 @@ with col_region:
     region = st.selectbox("Select Study Region (Privacy Protocol)", ["Canada (PIPEDA)", "Alberta (HIA)", "British Columbia (PIPA)", "Ontario (PHIPA)", "USA (HIPAA)"], index=0, help="Determines how PII (Initials, DOB) is masked in the output.")
 
 # Logic to run pipeline
-if st.button("Run Compliance Checks", help="Executes the full pipeline: ETL -> Safety Logic -> Reporting"):
-    
-    edc_path = None
-    lab_path = None
+# Stays active across reruns, so changing the region or downloading only
+# re-runs privacy + reporting on the cached results.
+run_clicked = st.button("Run Compliance Checks", help="Executes the full pipeline: ETL -> Safety Logic -> Reporting")
+if run_clicked:
+    st.session_state['pipeline_active'] = True
+
+if st.session_state.get('pipeline_active'):
     
     # 1. Handle Input Sources
     if st.session_state.get('use_demo'):
-        edc_path = "raw_edc_visits.csv"
-        lab_path = "raw_lab_results.csv"
+        demo_edc = "raw_edc_visits.csv"
+        demo_lab = "raw_lab_results.csv"
         
-        if not os.path.exists(edc_path) or not os.path.exists(lab_path):
+        if not os.path.exists(demo_edc) or not os.path.exists(demo_lab):
              st.error("Demo data not found. Please click 'Use Demo Data' first.")
              st.stop()
              
+        with open(demo_edc, "rb") as f:
+            edc_bytes = f.read()
+        with open(demo_lab, "rb") as f:
+            lab_bytes = f.read()
+        edc_ext = lab_ext = ".csv"
+             
     elif edc_file and lab_file:
-        # Save uploaded files to temp
-        edc_path = "temp_edc.csv"
-        lab_path = "temp_lab.csv"
-        
-        with open(edc_path, "wb") as f:
-            f.write(edc_file.getbuffer())
-            
-        with open(lab_path, "wb") as f:
-            f.write(lab_file.getbuffer())
+        edc_bytes = edc_file.getvalue()
+        lab_bytes = lab_file.getvalue()
+        edc_ext = os.path.splitext(edc_file.name)[1].lower()
+        lab_ext = os.path.splitext(lab_file.name)[1].lower()
     else:
         st.warning("Please upload both files or use demo data.")
         st.stop()
-
-    # 2. Run ETL & Logic
-    try:
-        with st.spinner("Running ETL and Safety Checks..."):
-            edc_df, lab_df = clean_and_standardize(edc_path, lab_path)
-            
-            if edc_df is None or lab_df is None:
-                st.error("ETL Process Failed.")
-                st.stop()
-                
-            safety_df, recon_df = run_checks(edc_df, lab_df)
-
-            # --- Privacy Layer ---
-            st.info(f"Privacy Protocol Active: {region} - PII Masking Applied.")
-            safety_df_clean = apply_privacy(safety_df, region)
-            recon_df_clean = apply_privacy(recon_df, region)
-            
-            # Generate Report
-            output_file = "Query_Log.xlsx"
-            generate_excel(safety_df_clean, recon_df_clean, output_file)
-            
-        # 3. Dashboard Metrics
-        st.divider()
-        st.subheader("Study Metrics")
         
-        m1, m2, m3 = st.columns(3)
-        num_patients = edc_df['USUBJID'].nunique()
-        sepsis_flags = len(safety_df)
-        missing_labs = len(recon_df)
+    result_cache = get_result_cache()
+    cache_key = content_key(edc_bytes, edc_ext, lab_bytes, lab_ext)
+    runner = get_job_runner()
+    job = runner.get(st.session_state.get('job_id', ''))
+    
+    if run_clicked:
+        st.session_state['active_key'] = cache_key
+    elif st.session_state.get('active_key') != cache_key:
+        # New inputs since the last run: wait for an explicit click
+        st.info("Inputs changed. Click 'Run Compliance Checks' to process them.")
+        st.stop()
         
-        m1.metric("Total Patients", num_patients)
-        m2.metric("Sepsis Flags", sepsis_flags, delta="-High Risk" if sepsis_flags > 0 else "Normal", delta_color="inverse")
-        m3.metric("Missing Lab Samples", missing_labs, delta="Recon Issue" if missing_labs > 0 else "Clean", delta_color="inverse")
+    # 2. Run ETL & Logic in the background
+    # A new job starts on an explicit click, or when only the region changed
+    # (ETL/check results then come from the cache, so it is quick).
+    job_key = (cache_key, region)
+    if run_clicked or job is None or job.key != job_key:
+        if job is not None and not run_clicked and job.key[0] == cache_key and job.status not in FINISHED:
+            # Only the region changed mid-run: let the job finish and fill the
+            # cache, then the next job only re-runs privacy + reporting
+            show_job_progress(job.job_id)
+            st.stop()
+        if job is not None:
+            runner.cancel(job.job_id)
+        job_id = runner.submit(run_dashboard_job, edc_bytes, lab_bytes, region, cache_key, result_cache,
+                               stages=DASHBOARD_STAGES, key=job_key)
+        st.session_state['job_id'] = job_id
+        job = runner.get(job_id)
         
-        # 4. Data Preview
-        if not safety_df.empty:
-            st.subheader("Safety Flags Detected")
-            st.warning(f"Found {len(safety_df)} potential safety issues.")
-
-            st.dataframe(safety_df_clean.style.applymap(lambda x: 'background-color: #ffcccc', subset=['Query_Text']))
-        else:
-            st.success("No Safety Flags detected.")
-            
-        # 5. Download
-        with open(output_file, "rb") as f:
-            st.download_button(
-                label="Download Query Log (Excel)",
-                data=f,
-                file_name="Query_Log.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
-            
-    except Exception as e:
-        st.error(f"An error occurred: {e}")
-        # Optional: Print traceback for debugging
-        import traceback
-        st.text(traceback.format_exc())
-
-    # Cleanup temp files if used
-    if edc_file and lab_file:
-        try:
-             os.remove("temp_edc.csv")
-             os.remove("temp_lab.csv")
-        except:
-            pass
+    if job.status not in FINISHED:
+        show_job_progress(job.job_id)
+        st.stop()
+    if job.status == CANCELLED:
+        st.warning("Run cancelled. Click 'Run Compliance Checks' to start again.")
+        st.stop()
+    if job.status == FAILED:
+        st.error(f"An error occurred: {job.error}")
+        st.stop()
+        
+    result = job.result
+    safety_df_clean, recon_df_clean = result["safety_df"], result["recon_df"]
+    if result["from_cache"]:
+        st.caption("Inputs unchanged: reusing cached ETL and check results.")
+    st.info(f"Privacy Protocol Active: {region} - PII Masking Applied.")
+    
+    # 3. Dashboard Metrics
+    st.divider()
+    st.subheader("Study Metrics")
+    
+    m1, m2, m3 = st.columns(3)
+    num_patients = result["num_patients"]
+    sepsis_flags = len(safety_df_clean)
+    missing_labs = len(recon_df_clean)
+    
+    m1.metric("Total Patients", num_patients)
+    m2.metric("Sepsis Flags", sepsis_flags, delta="-High Risk" if sepsis_flags > 0 else "Normal", delta_color="inverse")
+    m3.metric("Missing Lab Samples", missing_labs, delta="Recon Issue" if missing_labs > 0 else "Clean", delta_color="inverse")
+    
+    with st.expander("Stage Timings"):
+        st.dataframe(result["run_log"], hide_index=True)
+    
+    # 4. Data Preview
+    if sepsis_flags:
+        st.subheader("Safety Flags Detected")
+        st.warning(f"Found {sepsis_flags} potential safety issues.")
+    else:
+        st.success("No Safety Flags detected.")
+        
+    safety_tab, recon_tab = st.tabs([f"Safety Queries ({sepsis_flags:,})", f"Recon Queries ({missing_labs:,})"])
+    with safety_tab:
+        show_query_tab(safety_df_clean, "safety", STYLE_FILLS["cdas_safety"])
+    with recon_tab:
+        show_query_tab(recon_df_clean, "recon", STYLE_FILLS["cdas_recon"])
+        
+    # 5. Download
+    st.download_button(
+        label="Download Query Log (Excel)",
+        data=result["report"],
+        file_name="Query_Log.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
@@ -0,0 +1,39 @@
+import argparse
+import tempfile
+import time
+import pandas as pd
+from src.data_sim import generate_load_data
+from src.etl import clean_and_standardize
+from src.logic import MERGE_KEYS, run_checks
+
+def _mb(*frames):
+    return sum(df.memory_usage(deep=True).sum() for df in frames) / 1024 / 1024
+
+def _time(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare default vs optimized ETL dtypes.")
+    parser.add_argument("--subjects", type=int, default=200_000)
+    parser.add_argument("--visits", type=int, default=5)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        edc_path, lab_path = generate_load_data(args.subjects, args.visits, seed=0, out_dir=tmp)
+        frames = {
+            "default": clean_and_standardize(edc_path, lab_path),
+            "optimized": clean_and_standardize(edc_path, lab_path, optimize=True),
+        }
+        
+    for mode, (edc_df, lab_df) in frames.items():
+        merge_s = _time(lambda: pd.merge(edc_df, lab_df, on=MERGE_KEYS, how="left"))
+        checks_s = _time(lambda: run_checks(edc_df, lab_df), repeat=1)
+        print(f"[BENCH] {mode:<9} memory={_mb(edc_df, lab_df):8.1f} MB merge={merge_s:.3f}s run_checks={checks_s:.3f}s")
+
+if __name__ == "__main__":
+    main()
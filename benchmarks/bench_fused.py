@@ -0,0 +1,55 @@
+import argparse
+import os
+import tempfile
+import time
+import pandas as pd
+from src.data_sim import generate_load_data
+from src.etl import clean_and_standardize
+from src.kernel import run_checks_fused
+from src.logic import run_checks
+from src.reporter import RECON_COLUMNS, SAFETY_COLUMNS
+
+def same_queries(expected, actual, columns):
+    """
+    True if both query frames have the same rows (index), in the same order,
+    with equal report columns.
+    """
+    if list(expected.index) != list(actual.index):
+        return False
+    if expected.empty:
+        return True
+    try:
+        pd.testing.assert_frame_equal(expected[columns].reset_index(drop=True),
+                                      actual[columns].reset_index(drop=True), check_dtype=False)
+    except AssertionError:
+        return False
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the fused ETL + checks kernel against the multi-pass path.")
+    parser.add_argument("--subjects", default="100000,300000", help="Comma separated subject counts")
+    parser.add_argument("--visits", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=100_000)
+    parser.add_argument("--format", choices=["csv", "parquet"], default="parquet")
+    args = parser.parse_args()
+    
+    for n in [int(s) for s in args.subjects.split(",")]:
+        with tempfile.TemporaryDirectory() as work_dir:
+            generate_load_data(n, args.visits, seed=0, output_format=args.format, out_dir=work_dir)
+            edc_path = os.path.join(work_dir, f"raw_edc_visits.{args.format}")
+            lab_path = os.path.join(work_dir, f"raw_lab_results.{args.format}")
+            
+            start = time.perf_counter()
+            safety_df, recon_df = run_checks(*clean_and_standardize(edc_path, lab_path))
+            multi_time = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            fused_safety, fused_recon = run_checks_fused(edc_path, lab_path, batch_size=args.batch_size)
+            fused_time = time.perf_counter() - start
+            
+            parity = same_queries(safety_df, fused_safety, SAFETY_COLUMNS) and same_queries(recon_df, fused_recon, RECON_COLUMNS)
+            print(f"[BENCH] subjects={n:,} multi-pass={multi_time:.2f}s fused={fused_time:.2f}s "
+                  f"speedup={multi_time / fused_time:.2f}x parity={parity}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from src.reporter import generate_excel
+
+def make_queries(n, seed=0):
+    """
+    Builds safety/recon frames shaped like run_checks output.
+    """
+    rng = np.random.default_rng(seed)
+    subjects = np.char.add("SUBJ-", rng.integers(0, n, n).astype(str))
+    safety_df = pd.DataFrame({
+        "USUBJID": subjects,
+        "INITIALS": "[REDACTED]",
+        "BRTHDTC": "1980-05-XX",
+        "SVSTDTC": "2023-06-01",
+        "VSSTRESN_TEMP": rng.uniform(35, 40, n).round(1),
+        "VSSTRESN_HR": rng.integers(60, 130, n).astype(float),
+        "Raw_RR": rng.integers(12, 25, n),
+        "WBC": rng.uniform(3, 15, n).round(1),
+        "Query_Text": "Potential Sepsis: >= 2 criteria met. Please confirm clinical status.",
+    })
+    recon_df = safety_df[["USUBJID", "INITIALS", "BRTHDTC", "SVSTDTC"]].assign(
+        Blood_Draw_Performed="Yes", SampleID=np.nan,
+        Query_Text="Lab sample missing despite blood draw confirmation.",
+    )
+    return safety_df, recon_df
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Query Log writers.")
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows per tab")
+    args = parser.parse_args()
+    
+    safety_df, recon_df = make_queries(args.rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        timings = {}
+        for write_only in (False, True):
+            out = os.path.join(tmp, f"log_{write_only}.xlsx")
+            start = time.perf_counter()
+            generate_excel(safety_df, recon_df, out, write_only=write_only)
+            timings[write_only] = time.perf_counter() - start
+            
+    print(f"[BENCH] rows={args.rows:,} cell_by_cell={timings[False]:.2f}s "
+          f"write_only={timings[True]:.2f}s speedup={timings[False] / timings[True]:.1f}x")
+
+if __name__ == "__main__":
+    main()
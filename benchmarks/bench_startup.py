@@ -0,0 +1,68 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cold-start commands, each run in a fresh interpreter
+COMMANDS = {
+    "main.py --help": [sys.executable, "main.py", "--help"],
+    "import main": [sys.executable, "-c", "import main"],
+    "import src.logic": [sys.executable, "-c", "import src.logic"],
+    "import src.reporter": [sys.executable, "-c", "import src.reporter"],
+    "generate_excel (first call)": [sys.executable, "-c", "import pandas as pd; from src.reporter import generate_excel; "
+                                    "import io; generate_excel(pd.DataFrame(), pd.DataFrame(), io.BytesIO())"],
+}
+
+def cold_start_s(cmd, runs=5):
+    """
+    Median wall time of `cmd` over `runs` fresh interpreter starts.
+    """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=REPO_ROOT, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+def import_profile(module, top=15):
+    """
+    Slowest imports (cumulative microseconds) when importing `module`, via -X importtime.
+    Returns: list of (cumulative_us, self_us, module name)
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=REPO_ROOT, check=True, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure CLI cold-start time and import-time profile.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=150, help="Fail if 'main.py --help' median exceeds this")
+    parser.add_argument("--profile", default="main", metavar="MODULE", help="Module to show the import-time profile for")
+    args = parser.parse_args()
+    
+    results = {name: cold_start_s(cmd, args.runs) for name, cmd in COMMANDS.items()}
+    for name, seconds in results.items():
+        print(f"[BENCH] {name:<28} {seconds * 1000:8.1f} ms")
+    
+    print(f"[BENCH] Slowest imports for 'import {args.profile}' (cumulative / self ms):")
+    for cumulative_us, self_us, name in import_profile(args.profile):
+        print(f"          {cumulative_us / 1000:8.1f} {self_us / 1000:8.1f}  {name}")
+    
+    help_ms = results["main.py --help"] * 1000
+    if help_ms > args.target_ms:
+        print(f"[WARN] CLI cold start {help_ms:.1f} ms exceeds target {args.target_ms:.0f} ms")
+        sys.exit(1)
+    print(f"[BENCH] CLI cold start within target ({help_ms:.1f} ms <= {args.target_ms:.0f} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from src.etl import normalize_temp, normalize_temp_series
+
+def make_raw_temps(n, seed=0):
+    """
+    Builds a Raw_Temp column with the same mix of formats as data_sim.
+    """
+    rng = np.random.default_rng(seed)
+    values = np.round(rng.uniform(35.0, 104.0, n), 1).astype(str)
+    units = rng.choice(np.array([" C", " F", ""]), n)
+    return pd.Series(np.char.add(values, units), dtype=object)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Raw_Temp normalization.")
+    parser.add_argument("--rows", default="1000000,10000000", help="Comma separated row counts")
+    parser.add_argument("--skip-apply", action="store_true", help="Only time the vectorized path")
+    args = parser.parse_args()
+    
+    for n in [int(r) for r in args.rows.split(",")]:
+        raw = make_raw_temps(n)
+        
+        start = time.perf_counter()
+        vec = normalize_temp_series(raw)
+        vec_time = time.perf_counter() - start
+        print(f"[BENCH] rows={n:,} vectorized={vec_time:.2f}s")
+        
+        if not args.skip_apply:
+            start = time.perf_counter()
+            ref = raw.apply(normalize_temp)
+            ref_time = time.perf_counter() - start
+            same = np.array_equal(vec.to_numpy(), ref.to_numpy(), equal_nan=True)
+            print(f"[BENCH] rows={n:,} apply={ref_time:.2f}s speedup={ref_time / vec_time:.1f}x parity={same}")
+
+if __name__ == "__main__":
+    main()
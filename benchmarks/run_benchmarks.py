@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+import pandas as pd
+from src.data_sim import generate_load_data
+from src.etl import clean_and_standardize, load_standardized, save_standardized
+from src.logic import run_checks
+from src.privacy import apply_privacy_many
+from src.reporter import generate_excel
+
+STAGES = ["generate_data", "clean_and_standardize", "run_checks", "apply_privacy", "generate_excel"]
+DEFAULT_HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history.json")
+REGION = "Alberta (HIA)"
+
+# Each stage: untimed setup from the previous stage's output on disk, a timed
+# call, then its output is saved for the next stage. Returns rows in/out.
+def _stage_generate_data(work_dir, size):
+    start = time.perf_counter()
+    generate_load_data(size, seed=0, out_dir=work_dir)
+    return time.perf_counter() - start, size, size
+
+def _stage_clean_and_standardize(work_dir, size):
+    edc_path = os.path.join(work_dir, "raw_edc_visits.csv")
+    lab_path = os.path.join(work_dir, "raw_lab_results.csv")
+    start = time.perf_counter()
+    edc_df, lab_df = clean_and_standardize(edc_path, lab_path)
+    elapsed = time.perf_counter() - start
+    save_standardized(edc_df, lab_df, work_dir)
+    return elapsed, len(edc_df) + len(lab_df), len(edc_df) + len(lab_df)
+
+def _stage_run_checks(work_dir, size):
+    edc_df, lab_df = load_standardized(work_dir)
+    start = time.perf_counter()
+    safety_df, recon_df = run_checks(edc_df, lab_df)
+    elapsed = time.perf_counter() - start
+    safety_df.to_pickle(os.path.join(work_dir, "safety.pkl"))
+    recon_df.to_pickle(os.path.join(work_dir, "recon.pkl"))
+    return elapsed, len(edc_df), len(safety_df) + len(recon_df)
+
+def _stage_apply_privacy(work_dir, size):
+    safety_df = pd.read_pickle(os.path.join(work_dir, "safety.pkl"))
+    recon_df = pd.read_pickle(os.path.join(work_dir, "recon.pkl"))
+    start = time.perf_counter()
+    safety_df, recon_df = apply_privacy_many([safety_df, recon_df], REGION)
+    elapsed = time.perf_counter() - start
+    safety_df.to_pickle(os.path.join(work_dir, "safety_clean.pkl"))
+    recon_df.to_pickle(os.path.join(work_dir, "recon_clean.pkl"))
+    return elapsed, len(safety_df) + len(recon_df), len(safety_df) + len(recon_df)
+
+def _stage_generate_excel(work_dir, size):
+    safety_df = pd.read_pickle(os.path.join(work_dir, "safety_clean.pkl"))
+    recon_df = pd.read_pickle(os.path.join(work_dir, "recon_clean.pkl"))
+    start = time.perf_counter()
+    generate_excel(safety_df, recon_df, os.path.join(work_dir, "Query_Log.xlsx"))
+    elapsed = time.perf_counter() - start
+    return elapsed, len(safety_df) + len(recon_df), len(safety_df) + len(recon_df)
+
+STAGE_FUNCS = {
+    "generate_data": _stage_generate_data,
+    "clean_and_standardize": _stage_clean_and_standardize,
+    "run_checks": _stage_run_checks,
+    "apply_privacy": _stage_apply_privacy,
+    "generate_excel": _stage_generate_excel,
+}
+
+def _run_stage(stage, work_dir, size):
+    """
+    Runs in a fresh worker process so peak RSS is per stage.
+    """
+    wall, rows_in, rows_out = STAGE_FUNCS[stage](work_dir, size)
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "stage": stage,
+        "size": size,
+        "wall_s": round(wall, 4),
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+        "rows_in": rows_in,
+        "rows_out": rows_out,
+        "rows_per_s": round(rows_in / wall, 1) if wall > 0 else None,
+    }
+
+def run_suite(sizes, stages=STAGES):
+    """
+    Runs every stage at every size on generated data.
+    Returns: list of result dicts
+    """
+    results = []
+    # Earlier stages always run, since each stage reads the previous one's output
+    last = max(STAGES.index(s) for s in stages)
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            work_dir = os.path.join(tmp, str(size))
+            os.makedirs(work_dir)
+            for stage in STAGES[:last + 1]:
+                with ProcessPoolExecutor(max_workers=1) as pool:
+                    result = pool.submit(_run_stage, stage, work_dir, size).result()
+                if stage not in stages:
+                    continue
+                results.append(result)
+                print(f"[BENCH] {stage:<22} size={size:>9,} wall={result['wall_s']:>8.3f}s "
+                      f"peak_rss={result['peak_rss_mb']:>8.1f}MB rows/s={result['rows_per_s'] or 0:>12,.0f}")
+    return results
+
+def _key(result):
+    return f"{result['stage']}@{result['size']}"
+
+def load_history(path):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {"baseline": {}, "runs": []}
+
+def find_regressions(results, baseline, threshold):
+    """
+    Stages whose wall time exceeds the stored baseline by more than `threshold`.
+    """
+    regressions = []
+    for result in results:
+        base = baseline.get(_key(result))
+        if base and result["wall_s"] > base["wall_s"] * (1 + threshold):
+            regressions.append((result, base))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CDAS pipeline benchmark suite with regression tracking.")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma separated subject counts")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma separated stages to time")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSON history file")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+    args = parser.parse_args(argv)
+    
+    sizes = [int(s) for s in args.sizes.split(",")]
+    stages = [s for s in args.stages.split(",") if s]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(sorted(unknown))}")
+        
+    results = run_suite(sizes, stages)
+    history = load_history(args.history)
+    regressions = find_regressions(results, history["baseline"], args.threshold)
+    
+    history["runs"].append({
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "pandas": pd.__version__,
+        "results": results,
+    })
+    for result in results:
+        if args.update_baseline or _key(result) not in history["baseline"]:
+            history["baseline"][_key(result)] = result
+    with open(args.history, "w") as f:
+        json.dump(history, f, indent=2)
+    print(f"[INFO] Results appended to {args.history}")
+    
+    for result, base in regressions:
+        print(f"[ERROR] Regression in {_key(result)}: {result['wall_s']:.3f}s vs baseline {base['wall_s']:.3f}s")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,25 +1,172 @@
 import sys
-from src.data_sim import generate_data
-from src.etl import clean_and_standardize
-from src.logic import run_checks
-from src.reporter import generate_excel
+import argparse
+from src.instrument import RunLog, step
+from src.regions import PRIVACY_CONFIG
 
-def main():
+# Pipeline modules (pandas, NumPy, openpyxl) are imported where each mode runs,
+# so --help and argument errors return without loading the data stack.
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Clinical Data Automation Suite (CDAS) pipeline")
+    parser.add_argument("--edc", default="raw_edc_visits.csv", help="EDC visits export (.csv / .parquet)")
+    parser.add_argument("--lab", default="raw_lab_results.csv", help="Lab results export (.csv / .parquet)")
+    parser.add_argument("--output", default="Query_Log.xlsx", help="Query log workbook to write")
+    parser.add_argument("--generate", action="store_true", help="Generate synthetic demo data into raw_edc_visits.csv / raw_lab_results.csv first (overwrites them)")
+    parser.add_argument("--shard-by", choices=["query", "subjects", "site"], help="Split the query log into several reports in --report-dir (by query type, subject range or SITEID)")
+    parser.add_argument("--report-format", choices=["xlsx", "csv", "parquet"], default="xlsx", help="csv/parquet: unstyled report files per tab in --report-dir instead of --output")
+    parser.add_argument("--report-dir", default="query_logs", help="Sharded/flat reports plus report_index.csv")
+    parser.add_argument("--report-workers", type=int, default=2, help="Processes writing report shards in parallel")
+    parser.add_argument("--subjects-per-shard", type=int, default=10_000, help="Subjects per report with --shard-by subjects")
+    parser.add_argument("--region", choices=list(PRIVACY_CONFIG), help="Apply this region's PII masking before reporting")
+    parser.add_argument("--studies", nargs="+", metavar="GLOB", help="Batch mode: study directories (globs) holding raw_edc_visits.* and raw_lab_results.*")
+    parser.add_argument("--manifest", metavar="CSV", help="Batch mode: CSV manifest with columns study, edc, lab[, region]")
+    parser.add_argument("--jobs", type=int, default=2, help="Studies processed concurrently in batch mode")
+    parser.add_argument("--out-dir", default="cdas_output", help="Batch mode: one sub-directory per study plus batch_summary.csv")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for ETL and checks (1 = single process)")
+    parser.add_argument("--incremental", metavar="STATE_DIR", help="Only re-check subjects whose rows changed since the last run stored in STATE_DIR")
+    parser.add_argument("--fused", action="store_true", help="Single-pass ETL + checks over EDC batches; standardizes only flagged rows (single-process mode)")
+    parser.add_argument("--optimize-dtypes", action="store_true", help="Use categorical/datetime64/float32 dtypes after ETL (single-process mode)")
+    parser.add_argument("--longitudinal", action="store_true", help="Add cross-visit trend checks (WBC rising, HR above subject baseline) to the safety tab (single-process mode)")
+    parser.add_argument("--lab-window", type=int, metavar="DAYS", help="Match labs to the nearest visit within +/- DAYS and flag duplicate/orphan samples (single-process mode)")
+    parser.add_argument("--lab-index", metavar="DIR", help="Reconcile against a persistent Lab key index in DIR, updated with --lab; earlier Lab deliveries stay indexed (single-process mode)")
+    parser.add_argument("--study", help="Study identifier; required with --lab-index, which only ever serves one study")
+    parser.add_argument("--run-log", metavar="PATH", help="Write per-stage timings and memory to a JSON run log")
+    parser.add_argument("--profile", metavar="PATH", help="Dump cProfile stats for the whole run")
+    args = parser.parse_args(argv)
+    if args.studies or args.manifest:
+        # Batch mode runs the standard ETL -> checks -> workbook per study
+        single_run_only = {"--fused": args.fused, "--incremental": args.incremental, "--longitudinal": args.longitudinal,
+                           "--lab-index": args.lab_index, "--shard-by": args.shard_by,
+                           "--report-format": args.report_format != "xlsx", "--workers": args.workers > 1,
+                           "--run-log": args.run_log, "--profile": args.profile, "--generate": args.generate}
+        # Inputs and output come from the studies; per-study logs go to --out-dir
+        for option in ("edc", "lab", "output"):
+            single_run_only[f"--{option}"] = getattr(args, option) != parser.get_default(option)
+        unsupported = [flag for flag, used in single_run_only.items() if used]
+        if unsupported:
+            parser.error(f"{', '.join(unsupported)} cannot be used in batch mode (--studies / --manifest)")
+    # Run modes replace the single-process ETL -> checks, which the options below belong to
+    modes = {"--incremental": bool(args.incremental), "--workers": args.workers > 1, "--fused": args.fused}
+    single_process_options = {"--optimize-dtypes": args.optimize_dtypes, "--longitudinal": args.longitudinal,
+                              "--lab-window": args.lab_window is not None, "--lab-index": bool(args.lab_index)}
+    mode_supports = {"--incremental": {"--lab-window"}, "--workers": set(), "--fused": set()}
+    active_modes = [mode for mode, used in modes.items() if used]
+    if len(active_modes) > 1:
+        parser.error(f"{' and '.join(active_modes)} cannot be combined")
+    for mode in active_modes:
+        unsupported = [option for option, used in single_process_options.items() if used and option not in mode_supports[mode]]
+        if unsupported:
+            parser.error(f"{', '.join(unsupported)} cannot be used with {mode}")
+    if args.lab_index and not args.study:
+        parser.error("--lab-index needs --study, so one study's lab keys never reconcile another study")
+    if args.lab_index and args.lab_window is not None:
+        parser.error("--lab-index reconciles on exact visit dates and cannot be combined with --lab-window")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.studies or args.manifest:
+        run_batch_mode(args)
+        return
+    run_log = RunLog(profile_path=args.profile)
+    try:
+        with run_log:
+            run_pipeline(args)
+    finally:
+        if args.run_log:
+            run_log.write_json(args.run_log)
+
+def run_pipeline(args):
     print("==========================================")
     print("   Clinical Data Automation Suite (CDAS)  ")
     print("               Phase 1                    ")
     print("==========================================")
     
-    # Step 1: Data Generation
+    # Step 1: Data Generation (only on request: it overwrites the default input files)
+    if args.generate:
+        try:
+            from src.data_sim import generate_data
+            with step("generate_data"):
+                generate_data()
+        except Exception as e:
+            print(f"[ERROR] Data Generation failed: {e}")
+            sys.exit(1)
+        
+    # Steps 2 & 3 for changed subjects only
+    if args.incremental:
+        try:
+            from src.incremental import run_checks_incremental
+            with step("incremental"):
+                safety_df, recon_df = run_checks_incremental(args.edc, args.lab, args.incremental, tolerance_days=args.lab_window)
+            if safety_df is None or recon_df is None:
+                print("[ERROR] Incremental run failed to produce dataframes.")
+                sys.exit(1)
+        except Exception as e:
+            print(f"[ERROR] Incremental run failed: {e}")
+            sys.exit(1)
+    # Steps 2 & 3 in a process pool, sharded by subject
+    elif args.workers > 1:
+        try:
+            from src.pipeline import run_pipeline_parallel
+            with step("parallel_pipeline"):
+                safety_df, recon_df = run_pipeline_parallel(args.edc, args.lab, workers=args.workers, region=args.region)
+            if safety_df is None or recon_df is None:
+                print("[ERROR] Parallel pipeline failed to produce dataframes.")
+                sys.exit(1)
+        except Exception as e:
+            print(f"[ERROR] Parallel pipeline failed: {e}")
+            sys.exit(1)
+    # Steps 2 & 3 fused into one pass over EDC batches
+    elif args.fused:
+        try:
+            from src.kernel import run_checks_fused
+            with step("fused_checks"):
+                safety_df, recon_df = run_checks_fused(args.edc, args.lab)
+        except Exception as e:
+            print(f"[ERROR] Fused checks failed: {e}")
+            sys.exit(1)
+    else:
+        safety_df, recon_df = run_single_process(args.edc, args.lab, optimize=args.optimize_dtypes, longitudinal=args.longitudinal,
+                                                 lab_window=args.lab_window, lab_index_dir=args.lab_index, study=args.study,
+                                                 extra_columns=["SITEID"] if args.shard_by == "site" else [])
+        
+    # Step 4: Reporting (parallel workers already masked their shards)
     try:
-        generate_data()
+        from src.privacy import apply_privacy_many
+        from src.reporter import generate_excel
+        masked_in_workers = not args.incremental and args.workers > 1
+        if args.region and not masked_in_workers:
+            with step("apply_privacy", rows_in=len(safety_df) + len(recon_df)):
+                safety_df, recon_df = apply_privacy_many([safety_df, recon_df], args.region)
+        if args.shard_by or args.report_format != "xlsx":
+            from src.shards import write_report_shards
+            write_report_shards(safety_df, recon_df, args.report_dir, by=args.shard_by, fmt=args.report_format,
+                                workers=args.report_workers, subjects_per_shard=args.subjects_per_shard)
+            report_path = args.report_dir
+        else:
+            with step("generate_excel", rows_in=len(safety_df) + len(recon_df)):
+                generate_excel(safety_df, recon_df, args.output)
+            report_path = args.output
     except Exception as e:
-        print(f"[ERROR] Data Generation failed: {e}")
+        print(f"[ERROR] Report generation failed: {e}")
         sys.exit(1)
         
+    print("==========================================")
+    print("[SUCCESS] CDAS Pipeline Completed.")
+    print(f"Check '{report_path}' for results.")
+    print("==========================================")
+
+def run_single_process(edc_path, lab_path, optimize=False, longitudinal=False, lab_window=None, lab_index_dir=None,
+                       study=None, extra_columns=()):
+    from src.etl import clean_and_standardize
+    from src.logic import run_query_checks
+    from src.reporter import report_frames
+    
     # Step 2: ETL
     try:
-        edc_df, lab_df = clean_and_standardize("raw_edc_visits.csv", "raw_lab_results.csv")
+        with step("clean_and_standardize") as rec:
+            edc_df, lab_df = clean_and_standardize(edc_path, lab_path, optimize=optimize)
+            rec["rows_out"] = None if edc_df is None else len(edc_df) + len(lab_df)
         if edc_df is None or lab_df is None:
             print("[ERROR] ETL failed to produce dataframes.")
             sys.exit(1)
@@ -29,24 +176,60 @@ def main():
         
     # Step 3: Logic & Safety Checks
     try:
-        safety_df, recon_df = run_checks(edc_df, lab_df)
+        if lab_index_dir:
+            from src.lab_index import open_lab_index
+            from src.logic import run_recon_checks
+            from src.rules import DEFAULT_RULES
+            with step("run_checks", rows_in=len(edc_df) + len(lab_df)) as rec:
+                results = run_query_checks(edc_df, lab_df, rules=DEFAULT_RULES.for_output("safety"))
+                with step("lab_index"):
+                    lab_index = open_lab_index(lab_index_dir, [lab_path], study)
+                recon_results = run_recon_checks(edc_df, lab_index)
+                rec["rows_out"] = len(results) + len(recon_results)
+            safety_df, _ = report_frames(results, extra_columns)
+            _, recon_df = report_frames(recon_results, extra_columns)
+        else:
+            with step("run_checks", rows_in=len(edc_df) + len(lab_df)) as rec:
+                results = run_query_checks(edc_df, lab_df, tolerance_days=lab_window)
+                rec["rows_out"] = len(results)
+            # Only the report columns of flagged rows are copied
+            safety_df, recon_df = report_frames(results, extra_columns)
+        if not recon_df.empty:
+            print(f"[WARN] Found {len(recon_df)} reconciliation issues.")
+        if not safety_df.empty:
+            print(f"[WARN] Found {len(safety_df)} potential sepsis cases.")
+            
+        if longitudinal:
+            import pandas as pd
+            from src.longitudinal import run_longitudinal_checks
+            with step("longitudinal_checks", rows_in=len(edc_df)) as rec:
+                trend_df = run_longitudinal_checks(edc_df, lab_df)
+                rec["rows_out"] = len(trend_df)
+            # Same columns as the safety tab, including extra ones such as SITEID
+            safety_df = pd.concat([safety_df, trend_df.reindex(columns=safety_df.columns)], ignore_index=True)
     except Exception as e:
         print(f"[ERROR] Logic checks failed: {e}")
         import traceback
         traceback.print_exc()
         sys.exit(1)
         
-    # Step 4: Reporting
+    return safety_df, recon_df
+
+def run_batch_mode(args):
+    from src.batch import discover_studies, load_manifest, run_batch
+    studies = load_manifest(args.manifest) if args.manifest else []
+    studies += discover_studies(args.studies or [])
+    if not studies:
+        print("[ERROR] No studies found for the given manifest / globs.")
+        sys.exit(1)
     try:
-        generate_excel(safety_df, recon_df, "Query_Log.xlsx")
-    except Exception as e:
-        print(f"[ERROR] Report generation failed: {e}")
+        summary_df = run_batch(studies, args.out_dir, jobs=args.jobs, region=args.region,
+                               tolerance_days=args.lab_window, optimize=args.optimize_dtypes)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+    if (summary_df["status"] != "ok").any():
         sys.exit(1)
-        
-    print("==========================================")
-    print("[SUCCESS] CDAS Pipeline Completed.")
-    print("Check 'Query_Log.xlsx' for results.")
-    print("==========================================")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,182 @@
+import csv
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import pandas as pd
+from src.etl import clean_and_standardize
+from src.logic import run_query_checks
+from src.privacy import PRIVACY_CONFIG, apply_privacy_many
+from src.reporter import generate_excel, report_frames
+from src.instrument import RunLog, step
+
+EDC_NAMES = ("raw_edc_visits.csv", "raw_edc_visits.parquet")
+LAB_NAMES = ("raw_lab_results.csv", "raw_lab_results.parquet")
+SUMMARY_COLUMNS = ["study", "status", "edc_rows", "lab_rows", "safety", "recon",
+                   "etl_s", "checks_s", "report_s", "total_s", "output"]
+
+def _first_existing(directory, names):
+    for name in names:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+def discover_studies(patterns):
+    """
+    One study per directory matched by the glob patterns; each directory holds
+    raw_edc_visits.(csv|parquet) and raw_lab_results.(csv|parquet).
+    Returns: list of {"study", "edc", "lab"} dicts, in sorted path order
+    """
+    studies = []
+    for pattern in patterns:
+        for directory in sorted(glob.glob(pattern)):
+            if not os.path.isdir(directory):
+                continue
+            edc_path = _first_existing(directory, EDC_NAMES)
+            lab_path = _first_existing(directory, LAB_NAMES)
+            if edc_path is None or lab_path is None:
+                print(f"[WARN] Skipping {directory}: EDC or Lab export not found.")
+                continue
+            studies.append({"study": os.path.basename(os.path.normpath(directory)), "edc": edc_path, "lab": lab_path})
+    return studies
+
+def load_manifest(path):
+    """
+    Reads a CSV manifest with columns study, edc, lab and optional region.
+    Relative paths are resolved against the manifest's directory.
+    """
+    base_dir = os.path.dirname(os.path.abspath(path))
+    studies = []
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            study = {"study": row["study"].strip()}
+            for key in ("edc", "lab"):
+                study[key] = os.path.join(base_dir, row[key].strip())
+            if (row.get("region") or "").strip():
+                study["region"] = row["region"].strip()
+            studies.append(study)
+    return studies
+
+def _is_safe_name(name):
+    # One plain path component: no separators, no "." / "..", not absolute
+    return bool(name) and name not in (".", "..") and "/" not in name and "\\" not in name and not os.path.isabs(name)
+
+def _validate_studies(studies, region):
+    names = [s["study"] for s in studies]
+    unsafe = [name for name in names if not _is_safe_name(name)]
+    if unsafe:
+        raise ValueError(f"Study names must be plain directory names inside the output directory: {unsafe}")
+    if len(set(names)) != len(names):
+        raise ValueError("Study names must be unique (each study gets its own output directory)")
+    for study in studies:
+        study_region = study.get("region", region)
+        if study_region is not None and study_region not in PRIVACY_CONFIG:
+            raise ValueError(f"Study {study['study']}: unknown region '{study_region}'")
+
+def run_study(study, out_dir, region=None, tolerance_days=None, optimize=False):
+    """
+    Worker: ETL -> checks -> privacy -> report for one study, into
+    out_dir/<study>/ (Query_Log.xlsx + run_log.json).
+    Never raises; failures are reported in the summary row.
+    Returns: summary dict (see SUMMARY_COLUMNS)
+    """
+    study_dir = os.path.join(out_dir, study["study"])
+    os.makedirs(study_dir, exist_ok=True)
+    output = os.path.join(study_dir, "Query_Log.xlsx")
+    summary = {"study": study["study"], "status": "ok", "output": output}
+    region = study.get("region", region)
+    
+    run_log = RunLog()
+    start = time.perf_counter()
+    try:
+        with run_log:
+            with step("etl") as rec:
+                edc_df, lab_df = clean_and_standardize(study["edc"], study["lab"], optimize=optimize)
+            if edc_df is None or lab_df is None:
+                raise RuntimeError("ETL failed to produce dataframes")
+            summary["edc_rows"], summary["lab_rows"] = len(edc_df), len(lab_df)
+            
+            with step("checks", rows_in=len(edc_df) + len(lab_df)) as rec:
+                safety_df, recon_df = report_frames(run_query_checks(edc_df, lab_df, tolerance_days=tolerance_days))
+                rec["rows_out"] = len(safety_df) + len(recon_df)
+            summary["safety"], summary["recon"] = len(safety_df), len(recon_df)
+            
+            with step("report", rows_in=len(safety_df) + len(recon_df)):
+                if region:
+                    safety_df, recon_df = apply_privacy_many([safety_df, recon_df], region)
+                generate_excel(safety_df, recon_df, output)
+    except Exception as e:
+        summary["status"] = f"failed: {e}"
+        summary["output"] = None
+    
+    summary["total_s"] = round(time.perf_counter() - start, 3)
+    for record in run_log.records:
+        if f"{record['stage']}_s" in SUMMARY_COLUMNS:
+            summary[f"{record['stage']}_s"] = record["wall_s"]
+    run_log.write_json(os.path.join(study_dir, "run_log.json"))
+    return summary
+
+def _run_in_pool(studies, jobs, run_args, summaries):
+    """
+    Runs studies in one process pool, filling summaries by study name.
+    A worker that dies (e.g. OOM kill) breaks the whole pool, so every study
+    still in flight fails with BrokenProcessPool; those are not recorded.
+    Returns: the studies lost to a broken pool, to be re-run
+    """
+    lost = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(run_study, study, *run_args): study for study in studies}
+        for future in as_completed(futures):
+            name = futures[future]["study"]
+            try:
+                summaries[name] = future.result()
+            except BrokenProcessPool:
+                lost.append(futures[future])
+                continue
+            except Exception as e:
+                # Raised outside run_study itself (e.g. the study could not be sent to the worker)
+                summaries[name] = {"study": name, "status": f"failed: {type(e).__name__}: {e}", "output": None}
+            print(f"[INFO] {name}: {summaries[name]['status']}")
+    # Re-run in input order
+    order = {id(study): i for i, study in enumerate(studies)}
+    return sorted(lost, key=lambda study: order[id(study)])
+
+def run_batch(studies, out_dir, jobs=2, region=None, tolerance_days=None, optimize=False):
+    """
+    Runs every study with at most `jobs` worker processes (jobs=1 runs in-process).
+    Writes out_dir/batch_summary.csv and returns the summary table in input order.
+    """
+    _validate_studies(studies, region)
+    os.makedirs(out_dir, exist_ok=True)
+    print(f"[INFO] Running {len(studies)} studies with {jobs} worker(s)...")
+    
+    summaries = {}
+    if jobs <= 1:
+        for study in studies:
+            summaries[study["study"]] = run_study(study, out_dir, region, tolerance_days, optimize)
+            print(f"[INFO] {study['study']}: {summaries[study['study']]['status']}")
+    else:
+        lost = _run_in_pool(studies, jobs, (out_dir, region, tolerance_days, optimize), summaries)
+        if lost:
+            print(f"[WARN] A worker process died; re-running {len(lost)} studies one at a time in fresh workers.")
+        for study in lost:
+            # Alone in its own pool, a study that kills its worker again fails by itself
+            if _run_in_pool([study], 1, (out_dir, region, tolerance_days, optimize), summaries):
+                summaries[study["study"]] = {"study": study["study"], "output": None,
+                                             "status": "failed: worker process died (BrokenProcessPool)"}
+                print(f"[INFO] {study['study']}: {summaries[study['study']]['status']}")
+    
+    summary_df = pd.DataFrame([summaries[s["study"]] for s in studies]).reindex(columns=SUMMARY_COLUMNS)
+    count_cols = ["edc_rows", "lab_rows", "safety", "recon"]
+    summary_df[count_cols] = summary_df[count_cols].astype("Int64")
+    summary_path = os.path.join(out_dir, "batch_summary.csv")
+    summary_df.to_csv(summary_path, index=False)
+    print(summary_df.drop(columns="output").to_string(index=False))
+    print(f"[INFO] Batch summary written to {summary_path}")
+    
+    failed = (summary_df["status"] != "ok").sum()
+    if failed:
+        print(f"[WARN] {failed} of {len(summary_df)} studies failed.")
+    return summary_df
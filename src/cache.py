@@ -0,0 +1,71 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+def content_key(*parts):
+    """
+    SHA-256 over raw bytes / strings, e.g. uploaded file contents and names.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    return digest.hexdigest()
+
+def _size_of(value):
+    """
+    Approximate in-memory size of a cached value (DataFrames and tuples of them).
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (tuple, list)):
+        return sum(_size_of(v) for v in value)
+    return 0
+
+class ResultCache:
+    """
+    Thread-safe, content-addressed LRU cache for pipeline results.
+    Evicts least recently used entries beyond max_entries or max_bytes.
+    """
+    def __init__(self, max_entries=8, max_bytes=512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+            
+    def put(self, key, value):
+        size = _size_of(value)
+        if size > self.max_bytes:
+            return # Too big to cache at all
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._sizes[key] = size
+            while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                old_key, _ = self._entries.popitem(last=False)
+                del self._sizes[old_key]
+                
+    @property
+    def total_bytes(self):
+        return sum(self._sizes.values())
+        
+    def __len__(self):
+        return len(self._entries)
+        
+    def __contains__(self, key):
+        return key in self._entries
@@ -1,12 +1,45 @@
+import os
+import argparse
 import pandas as pd
 import numpy as np
 import random
 from datetime import datetime, timedelta
 
-def generate_data():
+# Default dirtiness rates for generate_load_data, roughly matching generate_data
+DEFAULT_DIRTINESS = {
+    "unitless_temp": 0.20,    # Raw_Temp with no unit
+    "fever": 0.40,            # Temp drawn from a fever range
+    "hr_tachycardia": 0.09,   # HR 101-120
+    "hr_typo": 0.14,          # "High" / "Not Done" / "TBD"
+    "hr_outlier": 0.02,       # "900"
+    "no_blood_draw": 0.20,    # Blood_Draw_Performed == "No"
+    "missing_lab": 0.05,      # Subjects whose lab results never arrive
+}
+
+# generate_load_data draws each block of this many subjects from its own
+# seeded stream, so the output does not depend on chunk_subjects
+SEED_BLOCK_SUBJECTS = 1_000
+
+def _write_table(df, stem, output_format):
+    """
+    Writes a generated frame as CSV or Parquet.
+    """
+    if output_format == "parquet":
+        path = f"{stem}.parquet"
+        df.to_parquet(path, index=False)
+    elif output_format == "csv":
+        path = f"{stem}.csv"
+        df.to_csv(path, index=False)
+    else:
+        raise ValueError(f"Unsupported output format: {output_format}")
+    print(f"[INFO] {path} created with {len(df)} rows.")
+    return path
+
+def generate_data(output_format="csv"):
     """
     Generates simulated clinical data for EDC visits and Lab results.
     Outputs: raw_edc_visits.csv, raw_lab_results.csv
+    (or .parquet with output_format="parquet")
     """
     print("[INFO] Generating messy clinical data...")
     
@@ -59,7 +92,7 @@ def generate_data():
         initials = "".join(random.choices("ABCDEFGHIJKLMNOPQRSTUVWXYZ", k=3))
         dob = start_date - timedelta(days=random.randint(365*20, 365*70)) # Ages 20-70 approx
         dob_str = dob.strftime("%Y-%m-%d")
-
+        
         edc_data.append({
             "SubjectID": subj,
             "VisitDate": visit_date_str,
@@ -72,9 +105,8 @@ def generate_data():
         })
         
     edc_df = pd.DataFrame(edc_data)
-    edc_df.to_csv("raw_edc_visits.csv", index=False)
-    print(f"[INFO] raw_edc_visits.csv created with {len(edc_df)} rows.")
-
+    _write_table(edc_df, "raw_edc_visits", output_format)
+    
     # --- Generate Lab Data ---
     # Logic: If Blood_Draw_Performed is Yes, usually there is a lab result.
     # Missing Recon: 5 patients have Yes but no lab result.
@@ -82,7 +114,7 @@ def generate_data():
     lab_data = []
     
     # Select 5 subjects to have MISSING lab data despite having blood draw
-    missing_recon_subjs = random.sample(subject_ids, 5)
+    missing_recon_subjs = set(random.sample(subject_ids, 5))
     
     for row in edc_data:
         subj = row["SubjectID"]
@@ -102,8 +134,172 @@ def generate_data():
              })
              
     lab_df = pd.DataFrame(lab_data)
-    lab_df.to_csv("raw_lab_results.csv", index=False)
-    print(f"[INFO] raw_lab_results.csv created with {len(lab_df)} rows.")
+    _write_table(lab_df, "raw_lab_results", output_format)
+
+def _letters(rng, n, k):
+    codes = rng.integers(ord("A"), ord("Z") + 1, size=(n, k), dtype=np.uint8)
+    return np.frombuffer(codes.tobytes(), dtype=f"S{k}").astype(str)
+
+def _format_ids(prefix, numbers, width):
+    return pd.Series(numbers).astype(str).str.zfill(width).radd(prefix).to_numpy()
+
+def _edc_chunk(rng, first_subject, num_subjects, visits_per_subject, width, dirtiness):
+    """
+    Vectorized EDC rows for subjects [first_subject, first_subject + num_subjects).
+    Returns: (edc chunk, per-visit array of "subject has missing labs" flags)
+    """
+    n = num_subjects * visits_per_subject
+    subject_no = np.repeat(np.arange(first_subject, first_subject + num_subjects) + 1, visits_per_subject)
+    start_date = np.datetime64("2023-01-01")
+    
+    # Visits: random baseline, then 7-35 days apart
+    baseline = np.repeat(rng.integers(0, 366, num_subjects), visits_per_subject)
+    gaps = rng.integers(7, 36, size=(num_subjects, visits_per_subject))
+    gaps[:, 0] = 0
+    visit_date = start_date + (baseline + gaps.cumsum(axis=1).ravel()).astype("timedelta64[D]")
+    dob = start_date - rng.integers(365 * 20, 365 * 70, num_subjects).astype("timedelta64[D]")
+    
+    # Raw_Temp: fever or normal range, in C, F or unitless (F-range)
+    fever = rng.random(n) < dirtiness["fever"]
+    unitless = rng.random(n) < dirtiness["unitless_temp"]
+    in_f = unitless | (rng.random(n) < 0.5)
+    low = np.where(in_f, np.where(fever, 100.4, 97.0), np.where(fever, 38.0, 36.5))
+    high = np.where(in_f, np.where(fever, 103.0, 99.5), np.where(fever, 39.5, 37.5))
+    temp = pd.Series(np.round(rng.uniform(low, high), 1)).astype(str)
+    unit = np.where(unitless, "", np.where(in_f, " F", " C"))
+    raw_temp = (temp + unit).to_numpy()
+    
+    # Raw_HR: numbers, typos, outliers
+    hr_kind = rng.random(n)
+    cut_tachy = dirtiness["hr_tachycardia"]
+    cut_typo = cut_tachy + dirtiness["hr_typo"]
+    cut_outlier = cut_typo + dirtiness["hr_outlier"]
+    raw_hr = np.where(hr_kind < cut_tachy, rng.integers(101, 121, n), rng.integers(60, 101, n)).astype(str).astype(object)
+    typos = (hr_kind >= cut_tachy) & (hr_kind < cut_typo)
+    raw_hr[typos] = rng.choice(np.array(["High", "Not Done", "TBD"], dtype=object), typos.sum())
+    raw_hr[(hr_kind >= cut_typo) & (hr_kind < cut_outlier)] = "900"
+    
+    edc_df = pd.DataFrame({
+        "SubjectID": _format_ids("SUBJ-", subject_no, width),
+        "VisitDate": pd.DatetimeIndex(visit_date).strftime("%Y-%m-%d"),
+        "PatientInitials": np.repeat(_letters(rng, num_subjects, 3), visits_per_subject),
+        "DateOfBirth": np.repeat(pd.DatetimeIndex(dob).strftime("%Y-%m-%d"), visits_per_subject),
+        "Raw_Temp": raw_temp,
+        "Raw_HR": raw_hr,
+        "Raw_RR": rng.integers(12, 26, n),
+        "Blood_Draw_Performed": np.where(rng.random(n) < dirtiness["no_blood_draw"], "No", "Yes"),
+    })
+    missing_lab = np.repeat(rng.random(num_subjects) < dirtiness["missing_lab"], visits_per_subject)
+    return edc_df, missing_lab
+
+def _lab_chunk(rng, edc_df, missing_lab):
+    """
+    Lab rows for every EDC visit with a blood draw, except missing-lab subjects.
+    """
+    has_lab = (edc_df["Blood_Draw_Performed"].to_numpy() == "Yes") & ~missing_lab
+    n = int(has_lab.sum())
+    # Indexed by the EDC row each sample belongs to
+    return pd.DataFrame({
+        "SubjectID": edc_df["SubjectID"].to_numpy()[has_lab],
+        "VisitDate": edc_df["VisitDate"].to_numpy()[has_lab],
+        "SampleID": _format_ids("SMP-", rng.integers(10000, 100000, n), 5),
+        "WBC": np.round(rng.uniform(3.0, 15.0, n), 1),
+    }, index=edc_df.index[has_lab])
+
+def _seed_block(seed_seq, block, num_subjects, visits_per_subject, width, dirtiness):
+    """
+    EDC and Lab rows of one SEED_BLOCK_SUBJECTS block, from the block's own stream.
+    """
+    first = block * SEED_BLOCK_SUBJECTS
+    count = min(SEED_BLOCK_SUBJECTS, num_subjects - first)
+    rng = np.random.default_rng(np.random.SeedSequence(seed_seq.entropy, spawn_key=(block,)))
+    edc_df, missing_lab = _edc_chunk(rng, first, count, visits_per_subject, width, dirtiness)
+    return edc_df, _lab_chunk(rng, edc_df, missing_lab)
+
+class _ChunkWriter:
+    """
+    Appends chunks to one CSV or Parquet file.
+    """
+    def __init__(self, path, output_format):
+        self.path = path
+        self.output_format = output_format
+        self.rows = 0
+        self._parquet = None
+        
+    def write(self, df):
+        if self.output_format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            df.to_csv(self.path, mode="w" if self.rows == 0 else "a", header=self.rows == 0, index=False)
+        self.rows += len(df)
+        
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+def generate_load_data(num_subjects, visits_per_subject=1, seed=None, dirtiness=None,
+                       chunk_subjects=100_000, output_format="csv", out_dir="."):
+    """
+    Generates large synthetic EDC/Lab exports for load and benchmark testing.
+    Rows are sampled with NumPy in chunks of `chunk_subjects` subjects and
+    appended to disk, so memory stays flat regardless of study size. The same
+    seed gives the same files for any chunk_subjects.
+    dirtiness: overrides for DEFAULT_DIRTINESS rates
+    Returns: (edc_path, lab_path)
+    """
+    if output_format not in ("csv", "parquet"):
+        raise ValueError(f"Unsupported output format: {output_format}")
+    rates = dict(DEFAULT_DIRTINESS, **(dirtiness or {}))
+    seed_seq = np.random.SeedSequence(seed)
+    width = max(3, len(str(num_subjects)))
+    
+    os.makedirs(out_dir, exist_ok=True)
+    edc_writer = _ChunkWriter(os.path.join(out_dir, f"raw_edc_visits.{output_format}"), output_format)
+    lab_writer = _ChunkWriter(os.path.join(out_dir, f"raw_lab_results.{output_format}"), output_format)
+    print(f"[INFO] Generating load data: {num_subjects:,} subjects x {visits_per_subject} visits...")
+    
+    try:
+        cached_block, block_rows = None, None
+        for first in range(0, num_subjects, chunk_subjects):
+            last = min(first + chunk_subjects, num_subjects)
+            edc_parts, lab_parts = [], []
+            # Cut this chunk's subjects out of the seed blocks it overlaps
+            for block in range(first // SEED_BLOCK_SUBJECTS, (last - 1) // SEED_BLOCK_SUBJECTS + 1):
+                if block != cached_block:
+                    cached_block = block
+                    block_rows = _seed_block(seed_seq, block, num_subjects, visits_per_subject, width, rates)
+                block_edc, block_lab = block_rows
+                block_first = block * SEED_BLOCK_SUBJECTS
+                lo = (max(first, block_first) - block_first) * visits_per_subject
+                hi = (min(last, block_first + SEED_BLOCK_SUBJECTS) - block_first) * visits_per_subject
+                edc_parts.append(block_edc.iloc[lo:hi])
+                lab_parts.append(block_lab[(block_lab.index >= lo) & (block_lab.index < hi)])
+            edc_writer.write(pd.concat(edc_parts, ignore_index=True))
+            lab_writer.write(pd.concat(lab_parts, ignore_index=True))
+    finally:
+        edc_writer.close()
+        lab_writer.close()
+        
+    print(f"[INFO] {edc_writer.path} created with {edc_writer.rows} rows.")
+    print(f"[INFO] {lab_writer.path} created with {lab_writer.rows} rows.")
+    return edc_writer.path, lab_writer.path
 
 if __name__ == "__main__":
-    generate_data()
+    parser = argparse.ArgumentParser(description="Generate synthetic clinical data.")
+    parser.add_argument("--subjects", type=int, help="Generate a load-test study with this many subjects")
+    parser.add_argument("--visits", type=int, default=1, help="Visits per subject (load mode)")
+    parser.add_argument("--seed", type=int, help="Random seed (load mode)")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--out-dir", default=".")
+    args = parser.parse_args()
+    
+    if args.subjects:
+        generate_load_data(args.subjects, args.visits, seed=args.seed,
+                           output_format=args.format, out_dir=args.out_dir)
+    else:
+        generate_data(output_format=args.format)
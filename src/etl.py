@@ -1,92 +1,411 @@
+import io
+import json
+import os
 import pandas as pd
 import numpy as np
+from pandas.tseries.api import guess_datetime_format
+from src.instrument import step
 
-def clean_and_standardize(edc_path, lab_path):
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+
+def normalize_temp(val):
     """
-    Cleans and standardizes EDC and Lab data.
+    Parses temperature string, converts F to C.
+    Returns numeric Celsius value.
+    Scalar reference implementation; the ETL uses normalize_temp_series.
     """
-    print("[INFO] Starting ETL process...")
+    if pd.isna(val):
+        return np.nan
+        
+    val_str = str(val).upper().strip()
+    
+    # Detect unit
+    unit = "F" # Default assumption if no unit and looks like F (e.g. > 50)
+    numeric_part = ""
+    
+    if "C" in val_str:
+        unit = "C"
+        numeric_part = val_str.replace("C", "").strip()
+    elif "F" in val_str:
+        unit = "F"
+        numeric_part = val_str.replace("F", "").strip()
+    else:
+        # Guess based on magnitude if just a number
+        try:
+            float_val = float(val_str)
+            if float_val > 50: # Likely F
+                unit = "F"
+                numeric_part = val_str
+            else:
+                unit = "C"
+                numeric_part = val_str
+        except ValueError:
+            return np.nan # Unparseable
+            
     try:
-        edc_df = pd.read_csv(edc_path)
-        lab_df = pd.read_csv(lab_path)
-    except FileNotFoundError as e:
-        print(f"[ERROR] Input file not found: {e}")
-        return None, None
+        temp_c = float(numeric_part)
+        if unit == "F":
+            temp_c = (temp_c - 32) * 5/9
+        return round(temp_c, 1)
+    except ValueError:
+        return np.nan
 
-    # --- Standardize EDC ---
+def _to_float(val):
+    try:
+        return float(val)
+    except ValueError:
+        return np.nan
+
+# Decimal numbers that pd.to_numeric and float() parse the same way
+PLAIN_NUMBER = r"[+-]?(?:\d+\.?\d*|\.\d+)(?:E[+-]?\d+)?"
+
+def normalize_temp_series(raw):
+    """
+    Vectorized version of normalize_temp over a whole Raw_Temp column.
+    Same C/F/magnitude rules, same output values.
+    """
+    missing = raw.isna().to_numpy()
+    text = raw.astype(str).str.upper().str.strip()
+    
+    # Detect unit ("C" wins over "F", same as the scalar parser)
+    is_c = text.str.contains("C", regex=False).to_numpy() & ~missing
+    is_f = text.str.contains("F", regex=False).to_numpy() & ~is_c & ~missing
+    
+    numeric_part = text.where(~is_c, text.str.replace("C", "", regex=False).str.strip())
+    numeric_part = numeric_part.where(~is_f, numeric_part.str.replace("F", "", regex=False).str.strip())
+    
+    # to_numeric only gets plain decimals: it also accepts things float() rejects
+    # (e.g. "1E 3"), and rejects some it accepts ("1_0", "infinity"). Anything
+    # else goes through float() itself, like the scalar parser.
+    plain = numeric_part.str.fullmatch(PLAIN_NUMBER).to_numpy(dtype=bool, na_value=False) & ~missing
+    values = np.full(len(raw), np.nan)
+    values[plain] = pd.to_numeric(numeric_part[plain]).to_numpy(dtype="float64")
+    retry = ~plain & ~missing
+    if retry.any():
+        values[retry] = [_to_float(v) for v in numeric_part[retry]]
+    
+    # Unitless: guess based on magnitude
+    is_f = is_f | (~is_c & ~is_f & (values > 50))
+    temp_c = np.where(is_f, (values - 32) * 5 / 9, values)
+    
+    # np.round can disagree with round() right at a .x5 boundary; use round() there
+    rounded = np.round(temp_c, 1)
+    finite = np.isfinite(temp_c)
+    scaled = np.where(finite, temp_c, 0.0) * 10
+    near_tie = finite & (np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    if near_tie.any():
+        rounded[near_tie] = [round(float(v), 1) for v in temp_c[near_tie]]
+        
+    return pd.Series(rounded, index=raw.index)
+
+EDC_COLUMN_MAP = {
+    "SubjectID": "USUBJID",
+    "VisitDate": "SVSTDTC",
+    "PatientInitials": "INITIALS",
+    "DateOfBirth": "BRTHDTC"
+}
+
+LAB_COLUMN_MAP = {
+    "SubjectID": "USUBJID",
+    "VisitDate": "SVSTDTC"
+}
+
+def guess_date_formats(raw_df):
+    """
+    Date format of every raw date column, guessed once from its first
+    non-missing value, the way pd.to_datetime does for a whole column.
+    Passing these to every shard or chunk of one export makes them parse
+    dates exactly like a single pass over the whole file would.
+    Returns: {SDTM column: format, or None where pandas could not guess one}
+    """
+    formats = {}
+    for raw_column, column in EDC_COLUMN_MAP.items():
+        if column not in ("SVSTDTC", "BRTHDTC") or raw_column not in raw_df.columns:
+            continue
+        values = raw_df[raw_column].dropna()
+        if values.empty:
+            continue
+        formats[column] = guess_datetime_format(values.iloc[0]) if isinstance(values.iloc[0], str) else None
+    return formats
+
+def _standardize_date(values, iso_strings=True, date_format=None):
+    """
+    Parses dates; returns ISO 8601 strings, or datetime64 dates if iso_strings is False.
+    date_format: format to parse with (see guess_date_formats); guessed from the values if None
+    """
+    dates = pd.to_datetime(values, format=date_format)
+    if iso_strings:
+        return dates.dt.strftime("%Y-%m-%d")
+    return dates.dt.normalize()
+
+def standardize_edc(edc_df, iso_strings=True, date_formats=None):
+    """
+    Applies SDTM renames, ISO 8601 dates, temperature and HR standardization
+    to a raw EDC frame (or chunk of one).
+    iso_strings=False keeps dates as datetime64 (see optimize_dtypes).
+    date_formats: guess_date_formats() of the whole export, for a chunk of it
+    """
+    date_formats = date_formats or {}
     # Rename columns
-    edc_df.rename(columns={
-        "SubjectID": "USUBJID",
-        "VisitDate": "SVSTDTC",
-        "PatientInitials": "INITIALS",
-        "DateOfBirth": "BRTHDTC"
-    }, inplace=True)
+    edc_df.rename(columns=EDC_COLUMN_MAP, inplace=True)
     
     # Ensure ISO 8601 Date
-    edc_df["SVSTDTC"] = pd.to_datetime(edc_df["SVSTDTC"]).dt.strftime("%Y-%m-%d")
-    if "BRTHDTC" in edc_df.columns:
-        edc_df["BRTHDTC"] = pd.to_datetime(edc_df["BRTHDTC"]).dt.strftime("%Y-%m-%d")
+    with step("dates", rows_in=len(edc_df)):
+        edc_df["SVSTDTC"] = _standardize_date(edc_df["SVSTDTC"], iso_strings, date_formats.get("SVSTDTC"))
+        if "BRTHDTC" in edc_df.columns:
+            edc_df["BRTHDTC"] = _standardize_date(edc_df["BRTHDTC"], iso_strings, date_formats.get("BRTHDTC"))
     
     # --- Unit Conversion (Temp) ---
-    def normalize_temp(val):
-        """
-        Parses temperature string, converts F to C.
-        Returns numeric Celsius value.
-        """
-        if pd.isna(val):
-            return np.nan
-            
-        val_str = str(val).upper().strip()
-        
-        # Detect unit
-        unit = "F" # Default assumption if no unit and looks like F (e.g. > 50)
-        numeric_part = ""
-        
-        if "C" in val_str:
-            unit = "C"
-            numeric_part = val_str.replace("C", "").strip()
-        elif "F" in val_str:
-            unit = "F"
-            numeric_part = val_str.replace("F", "").strip()
-        else:
-            # Guess based on magnitude if just a number
-            try:
-                float_val = float(val_str)
-                if float_val > 50: # Likely F
-                    unit = "F"
-                    numeric_part = val_str
-                else:
-                    unit = "C"
-                    numeric_part = val_str
-            except ValueError:
-                return np.nan # Unparseable
-                
-        try:
-            temp_c = float(numeric_part)
-            if unit == "F":
-                temp_c = (temp_c - 32) * 5/9
-            return round(temp_c, 1)
-        except ValueError:
-            return np.nan
-
-    edc_df["VSSTRESN_TEMP"] = edc_df["Raw_Temp"].apply(normalize_temp)
+    with step("normalize_temp", rows_in=len(edc_df)):
+        edc_df["VSSTRESN_TEMP"] = normalize_temp_series(edc_df["Raw_Temp"])
     
     # --- Handle Non-Numeric HR ---
     # Convert to numeric, coerce errors to NaN
-    edc_df["VSSTRESN_HR"] = pd.to_numeric(edc_df["Raw_HR"], errors='coerce')
+    with step("hr", rows_in=len(edc_df)):
+        edc_df["VSSTRESN_HR"] = pd.to_numeric(edc_df["Raw_HR"], errors='coerce')
+    return edc_df
+
+def standardize_lab(lab_df, iso_strings=True, date_formats=None):
+    """
+    Applies SDTM renames and ISO 8601 dates to a raw Lab frame (or chunk of one).
+    date_formats: guess_date_formats() of the whole export, for a chunk of it
+    """
+    lab_df.rename(columns=LAB_COLUMN_MAP, inplace=True)
+    
+    # Ensure ISO 8601
+    lab_df["SVSTDTC"] = _standardize_date(lab_df["SVSTDTC"], iso_strings, (date_formats or {}).get("SVSTDTC"))
+    return lab_df
+
+def _frame_mb(*frames):
+    return sum(df.memory_usage(deep=True).sum() for df in frames) / 1024 / 1024
+
+def _to_int16_or_float32(values):
+    """
+    Int16 for whole-number vitals (nullable), float32 otherwise.
+    """
+    values = pd.to_numeric(values, errors="coerce")
+    whole = values.dropna()
+    if ((whole % 1 == 0) & whole.abs().le(np.iinfo(np.int16).max)).all():
+        return values.astype("Int16")
+    return values.astype("float32")
+
+def optimize_dtypes(edc_df, lab_df):
+    """
+    Memory-optimized dtypes for standardized frames:
+    subject IDs as categoricals sharing one category set (so the merge stays
+    categorical), Yes/No flags and initials as categoricals, visit/birth dates
+    as datetime64 and vitals as float32/Int16. Dates are formatted back to
+    ISO strings only at report time.
+    Returns: edc_df, lab_df
+    """
+    before_mb = _frame_mb(edc_df, lab_df)
+    edc_df = edc_df.copy()
+    lab_df = lab_df.copy()
+    
+    subjects = pd.CategoricalDtype(pd.Index(edc_df["USUBJID"].dropna().unique()).union(lab_df["USUBJID"].dropna().unique()))
+    edc_df["USUBJID"] = edc_df["USUBJID"].astype(subjects)
+    lab_df["USUBJID"] = lab_df["USUBJID"].astype(subjects)
+    
+    for df, columns in ((edc_df, ["SVSTDTC", "BRTHDTC"]), (lab_df, ["SVSTDTC"])):
+        for column in columns:
+            if column in df.columns and not pd.api.types.is_datetime64_any_dtype(df[column]):
+                df[column] = pd.to_datetime(df[column])
+                
+    for column in ("Blood_Draw_Performed", "INITIALS"):
+        if column in edc_df.columns:
+            edc_df[column] = edc_df[column].astype("category")
+            
+    for df, columns in ((edc_df, ["VSSTRESN_TEMP"]), (lab_df, ["WBC"])):
+        for column in columns:
+            if column in df.columns:
+                df[column] = df[column].astype("float32")
+    for column in ("VSSTRESN_HR", "Raw_RR"):
+        if column in edc_df.columns:
+            edc_df[column] = _to_int16_or_float32(edc_df[column])
+            
+    after_mb = _frame_mb(edc_df, lab_df)
+    print(f"[INFO] Optimized dtypes: {before_mb:.1f} MB -> {after_mb:.1f} MB ({1 - after_mb / before_mb:.0%} saved)")
+    return edc_df, lab_df
+
+def _as_source(source):
+    """
+    Raw bytes are wrapped in a buffer; paths and file-like objects pass through.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    return source
+
+def _is_path(source):
+    return isinstance(source, (str, os.PathLike))
+
+def _is_parquet(source):
+    """
+    Parquet by file extension (paths, named uploads) or by the PAR1 magic bytes.
+    """
+    name = source if _is_path(source) else getattr(source, "name", None)
+    if isinstance(name, (str, os.PathLike)) and str(name).lower().endswith(PARQUET_EXTENSIONS):
+        return True
+    if _is_path(source) or not hasattr(source, "seek"):
+        return False
+    position = source.tell()
+    magic = source.read(4)
+    source.seek(position)
+    return magic == b"PAR1"
+
+def read_table(source):
+    """
+    Reads a raw export as CSV or Parquet.
+    source: a path, a file-like object (e.g. an uploaded file) or raw bytes
+    """
+    source = _as_source(source)
+    if _is_parquet(source):
+        return pd.read_parquet(source)
+    return pd.read_csv(source)
+
+def _sdtm_paths(sdtm_dir):
+    return os.path.join(sdtm_dir, "edc_sdtm.parquet"), os.path.join(sdtm_dir, "lab_sdtm.parquet")
+
+def _sdtm_manifest_path(sdtm_dir):
+    return os.path.join(sdtm_dir, "sdtm_manifest.json")
+
+def _sdtm_manifest(source_paths, optimize):
+    """
+    What persisted SDTM frames were built from: absolute source paths with
+    size and mtime_ns, plus the dtype mode. None for buffers (no identity).
+    """
+    if not all(_is_path(p) for p in source_paths):
+        return None
+    sources = []
+    for path in source_paths:
+        stat = os.stat(path)
+        sources.append([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+    return {"sources": sources, "optimize": bool(optimize)}
+
+def save_standardized(edc_df, lab_df, sdtm_dir, manifest=None):
+    """
+    Persists standardized EDC/Lab frames as Parquet so later runs can skip parsing.
+    manifest: see _sdtm_manifest; without one the frames are never reused by
+    clean_and_standardize (load_standardized still reads them)
+    """
+    os.makedirs(sdtm_dir, exist_ok=True)
+    edc_out, lab_out = _sdtm_paths(sdtm_dir)
+    manifest_path = _sdtm_manifest_path(sdtm_dir)
+    # Drop the old manifest first so a half-written cache is never trusted
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    edc_df.to_parquet(edc_out, index=False)
+    lab_df.to_parquet(lab_out, index=False)
+    if manifest is not None:
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+    print(f"[INFO] Standardized frames saved to {sdtm_dir}")
+
+def load_standardized(sdtm_dir):
+    """
+    Loads frames written by save_standardized.
+    Returns: edc_df, lab_df
+    """
+    edc_out, lab_out = _sdtm_paths(sdtm_dir)
+    return pd.read_parquet(edc_out), pd.read_parquet(lab_out)
+
+def _sdtm_is_fresh(sdtm_dir, manifest):
+    """
+    True if persisted SDTM frames exist and were built from exactly these
+    source files (path, size, mtime_ns) with the same dtype mode.
+    """
+    if manifest is None:
+        return False
+    manifest_path = _sdtm_manifest_path(sdtm_dir)
+    if not all(os.path.exists(p) for p in (*_sdtm_paths(sdtm_dir), manifest_path)):
+        return False
+    with open(manifest_path) as f:
+        return json.load(f) == manifest
+
+def clean_and_standardize(edc_path, lab_path, sdtm_dir=None, optimize=False):
+    """
+    Cleans and standardizes EDC and Lab data.
+    Inputs may be CSV or Parquet, given as paths, file-like objects or bytes.
+    If sdtm_dir is given, the standardized frames are persisted there as
+    Parquet and reused only while they were built from these same input
+    files (see _sdtm_manifest).
+    optimize=True returns memory-optimized dtypes (see optimize_dtypes).
+    """
+    print("[INFO] Starting ETL process...")
+    try:
+        manifest = _sdtm_manifest((edc_path, lab_path), optimize) if sdtm_dir else None
+        if sdtm_dir and _sdtm_is_fresh(sdtm_dir, manifest):
+            print(f"[INFO] Reusing standardized frames from {sdtm_dir}")
+            return load_standardized(sdtm_dir)
+        with step("read") as rec:
+            edc_df = read_table(edc_path)
+            lab_df = read_table(lab_path)
+            rec["rows_out"] = len(edc_df) + len(lab_df)
+    except FileNotFoundError as e:
+        print(f"[ERROR] Input file not found: {e}")
+        return None, None
+    
+    # --- Standardize EDC ---
+    with step("standardize_edc", rows_in=len(edc_df)):
+        edc_df = standardize_edc(edc_df, iso_strings=not optimize)
     
     # --- Standardize Lab ---
-    lab_df.rename(columns={
-        "SubjectID": "USUBJID",
-        "VisitDate": "SVSTDTC"
-    }, inplace=True)
+    with step("standardize_lab", rows_in=len(lab_df)):
+        lab_df = standardize_lab(lab_df, iso_strings=not optimize)
+        
+    if optimize:
+        with step("optimize_dtypes"):
+            edc_df, lab_df = optimize_dtypes(edc_df, lab_df)
     
-    # Ensure ISO 8601
-    lab_df["SVSTDTC"] = pd.to_datetime(lab_df["SVSTDTC"]).dt.strftime("%Y-%m-%d")
+    if sdtm_dir:
+        save_standardized(edc_df, lab_df, sdtm_dir, manifest)
     
     print("[INFO] ETL Complete.")
     return edc_df, lab_df
 
+def stream_standardized(path, source="edc", chunksize=100_000):
+    """
+    Streaming ETL for exports larger than memory.
+    Reads `path` in chunks of `chunksize` rows and yields standardized frames,
+    so peak memory is bounded by the chunk size rather than the file size.
+    source: "edc" or "lab"
+    """
+    standardizers = {"edc": standardize_edc, "lab": standardize_lab}
+    if source not in standardizers:
+        raise ValueError(f"Unknown source '{source}', expected 'edc' or 'lab'.")
+    standardize = standardizers[source]
+    
+    # Free-text vitals stay text in every chunk, so dtypes don't drift between chunks
+    dtype = {"Raw_Temp": str, "Raw_HR": str} if source == "edc" else None
+    
+    print(f"[INFO] Streaming {source.upper()} ETL from {path} (chunksize={chunksize})...")
+    # Date formats are guessed once, from the first value of each column in
+    # the file, and reused for every later chunk (as a full read would parse them)
+    date_formats = {}
+    for chunk in read_raw_chunks(path, chunksize, dtype):
+        date_formats = {**guess_date_formats(chunk), **date_formats}
+        yield standardize(chunk, date_formats=date_formats)
+        
+def read_raw_chunks(source, chunksize=100_000, dtype=None):
+    """
+    Yields raw (not yet standardized) chunks of a CSV or Parquet export.
+    source: a path, file-like object or bytes; a DataFrame is sliced into chunks
+    """
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunksize):
+            yield source.iloc[start:start + chunksize]
+        return
+        
+    source = _as_source(source)
+    if _is_parquet(source):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+        return
+        
+    with pd.read_csv(source, chunksize=chunksize, dtype=dtype) as reader:
+        for chunk in reader:
+            yield chunk
+
 if __name__ == "__main__":
     # Test run
     clean_and_standardize("raw_edc_visits.csv", "raw_lab_results.csv")
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+from src.etl import guess_date_formats, read_table, standardize_edc, standardize_lab
+from src.logic import run_checks
+from src.rules import DEFAULT_RULES
+
+STATE_FILES = {
+    "hashes": "subject_hashes.pkl",
+    "safety": "safety_results.pkl",
+    "recon": "recon_results.pkl",
+    "config": "check_config.json",
+}
+
+def subject_hashes(raw_df):
+    """
+    Order-sensitive content hash of every subject's raw rows.
+    Returns: Series of uint64 hashes indexed by SubjectID
+    """
+    if raw_df.empty:
+        return pd.Series(dtype="UInt64", index=pd.Index([], name="SubjectID"))
+    row_hash = pd.util.hash_pandas_object(raw_df, index=False).to_numpy()
+    ordinal = raw_df.groupby("SubjectID", sort=False).cumcount().to_numpy()
+    # Mix in the row's position within the subject so reordering counts as a change
+    mixed = pd.util.hash_pandas_object(pd.DataFrame({"h": row_hash, "o": ordinal}), index=False).to_numpy()
+    
+    # XOR-fold row hashes per subject
+    subjects = raw_df["SubjectID"].to_numpy()
+    order = np.argsort(subjects, kind="stable")
+    sorted_subjects = subjects[order]
+    starts = np.flatnonzero(np.r_[True, sorted_subjects[1:] != sorted_subjects[:-1]])
+    combined = np.bitwise_xor.reduceat(mixed[order], starts)
+    return pd.Series(combined, index=pd.Index(sorted_subjects[starts], name="SubjectID"), dtype="UInt64")
+
+def _same_hash(previous, current):
+    # Missing on both sides (e.g. a subject with no Lab rows) counts as unchanged
+    return previous.eq(current).fillna(False) | (previous.isna() & current.isna())
+
+def check_config(rules, tolerance_days):
+    """
+    Fingerprint of everything besides the data that decides the results:
+    a hash of the edit-check spec plus the check parameters.
+    """
+    spec = json.dumps(rules.checks, sort_keys=True)
+    return {"rules_sha256": hashlib.sha256(spec.encode()).hexdigest(), "tolerance_days": tolerance_days}
+
+def _load_state(state_dir):
+    paths = {k: os.path.join(state_dir, v) for k, v in STATE_FILES.items()}
+    if not all(os.path.exists(p) for p in paths.values()):
+        return None
+    state = {k: pd.read_pickle(p) for k, p in paths.items() if k != "config"}
+    with open(paths["config"]) as f:
+        state["config"] = json.load(f)
+    return state
+
+def _save_state(state_dir, hashes, safety_df, recon_df, config):
+    os.makedirs(state_dir, exist_ok=True)
+    for key, obj in (("hashes", hashes), ("safety", safety_df), ("recon", recon_df)):
+        obj.to_pickle(os.path.join(state_dir, STATE_FILES[key]))
+    with open(os.path.join(state_dir, STATE_FILES["config"]), "w") as f:
+        json.dump(config, f, indent=2)
+
+def _in_visit_order(parts, visit_positions, lab_positions):
+    """
+    Combines carried-forward and fresh results in the order of a full run:
+    visit queries in current visit order, then lab-sample issues (which have
+    no visit) in current lab file order.
+    """
+    if not parts:
+        return pd.DataFrame(columns=["USUBJID", "_SUBJ_SEQ", "_LAB_SUBJ_SEQ"])
+    results = pd.concat([p for p in parts if not p.empty] or parts[:1])
+    ordered = results.merge(visit_positions, on=["USUBJID", "_SUBJ_SEQ"], how="left")
+    if "_LAB_SUBJ_SEQ" in ordered.columns:
+        ordered = ordered.merge(lab_positions, on=["USUBJID", "_LAB_SUBJ_SEQ"], how="left")
+    else:
+        ordered["_LAB_SEQ"] = np.nan
+    ordered["_LAB_ISSUE"] = ordered["_VISIT_SEQ"].isna()
+    ordered = ordered.sort_values(["_LAB_ISSUE", "_VISIT_SEQ", "_LAB_SEQ"], kind="stable")
+    return ordered.drop(columns=["_VISIT_SEQ", "_LAB_SEQ", "_LAB_ISSUE"]).reset_index(drop=True)
+
+def run_checks_incremental(edc_path, lab_path, state_dir, rules=None, tolerance_days=None):
+    """
+    Incremental ETL + checks. Subjects whose raw EDC and Lab rows are unchanged
+    since the previous run keep their stored results; only changed or new
+    subjects are re-standardized and re-checked. If the edit checks or
+    tolerance_days differ from the stored run, every subject is re-checked.
+    Returns: safety_df, recon_df (same rows and order as a full run)
+    """
+    print("[INFO] Starting incremental run...")
+    try:
+        edc_raw = read_table(edc_path)
+        lab_raw = read_table(lab_path)
+    except FileNotFoundError as e:
+        print(f"[ERROR] Input file not found: {e}")
+        return None, None
+        
+    # Outer join: subjects only in the Lab export still have orphan samples to report
+    hashes = pd.DataFrame({"EDC_HASH": subject_hashes(edc_raw)}).join(
+        subject_hashes(lab_raw).rename("LAB_HASH"), how="outer"
+    )
+    
+    rules = rules or DEFAULT_RULES
+    config = check_config(rules, tolerance_days)
+    state = _load_state(state_dir)
+    if state is not None and state["config"] != config:
+        print("[INFO] Edit checks or check parameters changed since last run; re-checking all subjects.")
+        state = None
+    if state is None:
+        changed = hashes.index
+    else:
+        previous = state["hashes"].reindex(hashes.index)
+        same = _same_hash(previous["EDC_HASH"], hashes["EDC_HASH"]) & _same_hash(previous["LAB_HASH"], hashes["LAB_HASH"])
+        changed = hashes.index[~same]
+    print(f"[INFO] {len(changed)} of {len(hashes)} subjects changed since last run.")
+    
+    # Position of every visit within its subject, so results can be re-ordered later
+    edc_raw["_SUBJ_SEQ"] = edc_raw.groupby("SubjectID", sort=False).cumcount()
+    visit_positions = pd.DataFrame({
+        "USUBJID": edc_raw["SubjectID"],
+        "_SUBJ_SEQ": edc_raw["_SUBJ_SEQ"],
+        "_VISIT_SEQ": np.arange(len(edc_raw)),
+    })
+    # Same for lab samples, which order the duplicate / orphan sample issues
+    lab_raw["_LAB_SUBJ_SEQ"] = lab_raw.groupby("SubjectID", sort=False).cumcount()
+    lab_positions = pd.DataFrame({
+        "USUBJID": lab_raw["SubjectID"],
+        "_LAB_SUBJ_SEQ": lab_raw["_LAB_SUBJ_SEQ"],
+        "_LAB_SEQ": np.arange(len(lab_raw)),
+    })
+    
+    safety_parts = []
+    recon_parts = []
+    if state is not None:
+        keep = ~state["safety"]["USUBJID"].isin(changed) & state["safety"]["USUBJID"].isin(hashes.index)
+        safety_parts.append(state["safety"][keep])
+        keep = ~state["recon"]["USUBJID"].isin(changed) & state["recon"]["USUBJID"].isin(hashes.index)
+        recon_parts.append(state["recon"][keep])
+        
+    if len(changed):
+        # Changed subjects parse dates with the whole files' formats, like a full run
+        edc_df = standardize_edc(edc_raw[edc_raw["SubjectID"].isin(changed)].reset_index(drop=True),
+                                 date_formats=guess_date_formats(edc_raw))
+        lab_df = standardize_lab(lab_raw[lab_raw["SubjectID"].isin(changed)].reset_index(drop=True),
+                                 date_formats=guess_date_formats(lab_raw))
+        safety_new, recon_new = run_checks(edc_df, lab_df, rules, tolerance_days)
+        safety_parts.append(safety_new)
+        recon_parts.append(recon_new)
+        
+    safety_df = _in_visit_order(safety_parts, visit_positions, lab_positions)
+    recon_df = _in_visit_order(recon_parts, visit_positions, lab_positions)
+    
+    _save_state(state_dir, hashes, safety_df, recon_df, config)
+    position_columns = ["_SUBJ_SEQ", "_LAB_SUBJ_SEQ"]
+    return safety_df.drop(columns=position_columns, errors="ignore"), recon_df.drop(columns=position_columns, errors="ignore")
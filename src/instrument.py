@@ -0,0 +1,130 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+# Active RunLog per thread, so concurrent runs (e.g. dashboard jobs) each record their own steps
+_local = threading.local()
+
+# tracemalloc is process-wide, so at most one RunLog (in any thread) may trace memory
+_trace_lock = threading.Lock()
+_tracing_log = None
+
+def _process_peak_rss_mb():
+    """
+    Highest RSS of the whole process so far, not of one step: a later step
+    only shows a higher value if it pushed the process past the earlier maximum.
+    """
+    if resource is None:
+        return None
+    # ru_maxrss is KB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+class RunLog:
+    """
+    Collects per-stage timings for one pipeline run, plus the process-wide
+    peak RSS reached by the end of each stage (process_peak_rss_mb).
+    Use as a context manager to make it the active log that step() records into.
+    profile_path: also dump cProfile stats for the whole run there
+    trace_memory: track per-step peak Python allocations with tracemalloc (slower);
+        tracing is process-wide, so only one RunLog at a time may use it
+    """
+    def __init__(self, profile_path=None, trace_memory=False):
+        self.records = []
+        self.profile_path = profile_path
+        self.trace_memory = trace_memory
+        self.started_at = None
+        self._stack = []
+        self._peaks = []  # traced peak so far of each open step, outermost first
+        self._profiler = None
+        self._previous = None
+        self._started_tracing = False
+        
+    def __enter__(self):
+        global _tracing_log
+        if self.trace_memory:
+            import tracemalloc
+            with _trace_lock:
+                if _tracing_log is not None:
+                    raise RuntimeError("trace_memory: another RunLog is already tracing memory (tracemalloc is process-wide)")
+                _tracing_log = self
+            self._started_tracing = not tracemalloc.is_tracing()
+            if self._started_tracing:
+                tracemalloc.start()
+        self._previous, _local.active_log = getattr(_local, "active_log", None), self
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        if self.profile_path:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+        
+    def __exit__(self, *exc):
+        global _tracing_log
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(self.profile_path)
+            print(f"[INFO] cProfile stats written to {self.profile_path}")
+        if self.trace_memory:
+            import tracemalloc
+            if self._started_tracing:
+                tracemalloc.stop()
+            with _trace_lock:
+                _tracing_log = None
+        _local.active_log = self._previous
+        return False
+        
+    def to_dict(self):
+        return {"started_at": self.started_at, "stages": self.records}
+        
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        print(f"[INFO] Run log written to {path}")
+        
+    def to_frame(self):
+        import pandas as pd
+        return pd.DataFrame(self.records)
+
+@contextmanager
+def step(name, rows_in=None):
+    """
+    Times a pipeline stage or sub-step into the active RunLog.
+    Yields a record dict; set record["rows_out"] before leaving the block.
+    Nested steps are recorded as "outer/inner". No-op without an active log.
+    """
+    log = getattr(_local, "active_log", None)
+    if log is None:
+        yield {}
+        return
+        
+    log._stack.append(name)
+    record = {"stage": "/".join(log._stack), "rows_in": rows_in, "rows_out": None}
+    if log.trace_memory:
+        import tracemalloc
+        # reset_peak() is shared by all open steps: bank the parent's peak first
+        if log._peaks:
+            log._peaks[-1] = max(log._peaks[-1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        log._peaks.append(0)
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield record
+    finally:
+        record["wall_s"] = round(time.perf_counter() - wall_start, 4)
+        record["cpu_s"] = round(time.process_time() - cpu_start, 4)
+        record["process_peak_rss_mb"] = _process_peak_rss_mb()
+        if log.trace_memory:
+            peak = max(log._peaks.pop(), tracemalloc.get_traced_memory()[1])
+            if log._peaks:
+                log._peaks[-1] = max(log._peaks[-1], peak)
+            record["peak_alloc_mb"] = round(peak / 1024 / 1024, 1)
+        log._stack.pop()
+        log.records.append(record)
@@ -0,0 +1,136 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+class JobCancelled(Exception):
+    """
+    Raised inside a job at its next stage boundary after cancel() was requested.
+    """
+
+class Job:
+    """
+    State of one background run. The job function receives the Job and calls
+    job.stage(name) before each stage; that updates progress and is where a
+    requested cancellation takes effect (threads cannot be interrupted mid-stage).
+    """
+    def __init__(self, job_id, stages, key=None):
+        self.job_id = job_id
+        self.key = key
+        self.stages = list(stages)
+        self.status = QUEUED
+        self.current_stage = None
+        self.completed_stages = 0
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._future = None
+    
+    @property
+    def progress(self):
+        if self.status == DONE:
+            return 1.0
+        return self.completed_stages / len(self.stages) if self.stages else 0.0
+    
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+    
+    def stage(self, name):
+        if self._cancel.is_set():
+            raise JobCancelled()
+        # Stages may be skipped (e.g. cached results), so progress follows the stage list
+        if name in self.stages:
+            self.completed_stages = self.stages.index(name)
+        self.current_stage = name
+    
+    def to_dict(self):
+        return {"job_id": self.job_id, "status": self.status, "stage": self.current_stage,
+                "progress": round(self.progress, 3), "error": self.error}
+
+class JobRunner:
+    """
+    Thread pool for pipeline runs shared by all dashboard sessions.
+    Threads (not processes) so results stay in memory for the Streamlit
+    server and the heavy pandas/NumPy work still overlaps between jobs.
+    At most max_workers jobs run at once; the rest wait in the queue.
+    Finished jobs are kept for retrieval until max_finished newer ones exist.
+    """
+    def __init__(self, max_workers=2, max_finished=32):
+        self.max_finished = max_finished
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cdas-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def submit(self, fn, *args, stages=(), key=None, **kwargs):
+        """
+        Runs fn(job, *args, **kwargs) in the pool.
+        Returns: job_id
+        """
+        job = Job(uuid.uuid4().hex, stages, key)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._prune()
+        job._future = self._pool.submit(self._run, job, fn, args, kwargs)
+        return job.job_id
+    
+    def _run(self, job, fn, args, kwargs):
+        if job.cancel_requested:
+            job.status = CANCELLED
+        else:
+            job.status = RUNNING
+            try:
+                job.result = fn(job, *args, **kwargs)
+                job.completed_stages = len(job.stages)
+                job.status = DONE
+            except JobCancelled:
+                job.status = CANCELLED
+            except Exception as e:
+                job.error = f"{type(e).__name__}: {e}"
+                job.status = FAILED
+        job.finished_at = time.time()
+    
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+    
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+    
+    def cancel(self, job_id):
+        """
+        Requests cancellation. A queued job never starts; a running one stops
+        at its next stage boundary.
+        """
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED:
+            return False
+        job._cancel.set()
+        if job._future is not None and job._future.cancel():
+            job.status = CANCELLED
+            job.finished_at = time.time()
+        return True
+    
+    def wait(self, job_id, timeout=None):
+        """
+        Blocks until the job has finished (for scripts and tests).
+        """
+        job = self.get(job_id)
+        deadline = None if timeout is None else time.time() + timeout
+        while job is not None and job.status not in FINISHED:
+            if deadline is not None and time.time() > deadline:
+                break
+            time.sleep(0.02)
+        return job
+    
+    def active(self):
+        with self._lock:
+            return [job for job in self._jobs.values() if job.status not in FINISHED]
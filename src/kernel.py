@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+from src.etl import EDC_COLUMN_MAP, LAB_COLUMN_MAP, _standardize_date, normalize_temp_series, read_raw_chunks, read_table
+from src.instrument import step
+from src.rules import DEFAULT_RULES
+
+# Standardized vitals computed by the kernel itself; every other rule field
+# must be a raw EDC column or a Lab column (see _score_frame)
+DERIVED_FIELDS = {"VSSTRESN_TEMP", "VSSTRESN_HR"}
+KEY_FIELDS = {"USUBJID", "SVSTDTC"}
+_NAT_DAY = np.int64(2**31 - 1)  # missing dates still match each other, like the pandas merge
+
+def _day_numbers(values):
+    """
+    Visit dates as int64 day numbers (what the ISO date string identifies).
+    """
+    # Few distinct dates per batch: parse each once (first-seen order keeps format inference)
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    days = pd.to_datetime(uniques).to_numpy(dtype="datetime64[D]").astype(np.int64)
+    return np.where(days == np.iinfo(np.int64).min, _NAT_DAY, days)[codes]
+
+def _visit_keys(subject_codes, days):
+    # One int64 per (subject, day): code in the high 32 bits, day in the low 32
+    return (subject_codes.astype(np.int64) << 32) | (days & 0xFFFFFFFF)
+
+class LabIndex:
+    """
+    Lab results keyed by (subject, visit day) as sorted int64 keys, so each
+    EDC batch finds its lab rows with a binary search instead of a merge.
+    Lab rows for the same key keep file order, matching the left merge.
+    """
+    def __init__(self, lab_raw):
+        lab_raw = lab_raw.rename(columns=LAB_COLUMN_MAP)
+        codes, self.subjects = pd.factorize(lab_raw["USUBJID"], use_na_sentinel=False)
+        keys = _visit_keys(codes, _day_numbers(lab_raw["SVSTDTC"]))
+        self.order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[self.order]
+        # Non-key columns plus one all-missing row that unmatched visits point to (-1)
+        values = lab_raw.drop(columns=list(KEY_FIELDS)).reset_index(drop=True)
+        self.columns = values.reindex(range(len(values) + 1))
+    
+    def match(self, subjects, days):
+        """
+        Left-join positions for a batch of visits.
+        Returns: (visit_pos, lab_pos) with one entry per output row; lab_pos -1 if no lab row
+        """
+        codes = self.subjects.get_indexer(subjects)
+        keys = _visit_keys(np.maximum(codes, 0), days)
+        lo = np.searchsorted(self.sorted_keys, keys, side="left")
+        hi = np.searchsorted(self.sorted_keys, keys, side="right")
+        counts = np.where(codes >= 0, hi - lo, 0)
+        
+        # Expand visits with several lab rows, as the merge does
+        out_counts = np.maximum(counts, 1)
+        visit_pos = np.repeat(np.arange(len(keys)), out_counts)
+        within = np.arange(len(visit_pos)) - np.repeat(np.cumsum(out_counts) - out_counts, out_counts)
+        matched = counts[visit_pos] > 0
+        lab_pos = np.full(len(visit_pos), -1, dtype=np.int64)
+        lab_pos[matched] = self.order[lo[visit_pos[matched]] + within[matched]]
+        return visit_pos, lab_pos
+    
+    def take(self, lab_pos, columns=None):
+        rows = np.where(lab_pos < 0, len(self.columns) - 1, lab_pos)
+        values = self.columns if columns is None else self.columns[columns]
+        return values.iloc[rows].reset_index(drop=True)
+
+def _parse_vitals(raw):
+    """
+    Standardized vitals for one raw batch, straight from the text columns.
+    """
+    return {
+        "VSSTRESN_TEMP": normalize_temp_series(raw["Raw_Temp"]).to_numpy(),
+        "VSSTRESN_HR": pd.to_numeric(raw["Raw_HR"], errors="coerce").to_numpy(dtype="float64", na_value=np.nan),
+    }
+
+def _score_frame(raw, vitals, visit_pos, lab_pos, lab_index, fields):
+    """
+    Minimal frame of only the rule fields for one batch, built from arrays.
+    """
+    raw_names = {v: k for k, v in EDC_COLUMN_MAP.items()}
+    lab_fields = [f for f in fields if f in lab_index.columns.columns]
+    columns = {}
+    for field in fields:
+        if field in DERIVED_FIELDS:
+            values = vitals[field]
+        elif field in lab_fields:
+            continue
+        elif field not in KEY_FIELDS and raw_names.get(field, field) in raw.columns:
+            values = raw[raw_names.get(field, field)].to_numpy()
+        else:
+            raise ValueError(f"Fused kernel cannot evaluate field '{field}'; use run_checks instead")
+        columns[field] = values[visit_pos]
+    frame = pd.DataFrame(columns)
+    for field in lab_fields:
+        frame[field] = lab_index.take(lab_pos, field).to_numpy()
+    return frame
+
+def _iso_dates(days):
+    text = np.datetime_as_string(days.astype("datetime64[D]")).astype(object)
+    text[days == _NAT_DAY] = np.nan
+    return text
+
+def _gather(raw, vitals, days, visit_pos, lab_pos, lab_index, rows, check_ids, offset, rules):
+    """
+    Builds the standardized rows of the flagged visits only, reusing the
+    batch's parsed vitals and visit days, and joins their lab columns.
+    """
+    visits = visit_pos[rows]
+    flagged = raw.iloc[visits].rename(columns=EDC_COLUMN_MAP).reset_index(drop=True)
+    # Same columns, order and values as standardize_edc
+    flagged["SVSTDTC"] = _iso_dates(days[visits])
+    if "BRTHDTC" in flagged.columns:
+        flagged["BRTHDTC"] = _standardize_date(flagged["BRTHDTC"])
+    for field in ("VSSTRESN_TEMP", "VSSTRESN_HR"):
+        flagged[field] = vitals[field][visits]
+    flagged = pd.concat([flagged, lab_index.take(lab_pos[rows])], axis=1)
+    flagged["Query_Text"] = np.asarray(rules.query_texts, dtype=object)[check_ids]
+    flagged.index = rows + offset
+    return flagged
+
+def run_checks_fused(edc_source, lab_source, batch_size=100_000, rules=None):
+    """
+    Single-pass ETL + edit checks. Each raw EDC batch is keyed, joined to a
+    sorted Lab key index, and scored on just the rule fields (temperature and
+    HR parsed straight from the raw text). Only the flagged rows are then fully
+    standardized. No standardized or merged copy of the whole study is built.
+    Returns: safety_df, recon_df (same rows, order and report columns as
+             run_checks on clean_and_standardize output; raw vitals stay text)
+    """
+    rules = rules or DEFAULT_RULES
+    print(f"[INFO] Running fused ETL + checks (batch_size={batch_size})...")
+    with step("lab_index"):
+        lab_index = LabIndex(read_table(lab_source))
+    
+    parts = {"safety": [], "recon": []}
+    offset = 0
+    with step("score_batches") as rec:
+        rows_in = 0
+        # Free-text vitals stay text in every batch, as in stream_standardized
+        for raw in read_raw_chunks(edc_source, batch_size, dtype={"Raw_Temp": str, "Raw_HR": str}):
+            rows_in += len(raw)
+            days = _day_numbers(raw["VisitDate"])
+            visit_pos, lab_pos = lab_index.match(raw["SubjectID"], days)
+            vitals = _parse_vitals(raw)
+            flags = rules.evaluate(_score_frame(raw, vitals, visit_pos, lab_pos, lab_index, rules.fields))
+            rows, check_ids = np.nonzero(flags)
+            if len(rows):
+                flagged = _gather(raw, vitals, days, visit_pos, lab_pos, lab_index, rows, check_ids, offset, rules)
+                outputs = rules.outputs[check_ids]
+                for output in parts:
+                    parts[output].append(flagged[outputs == output])
+            offset += len(visit_pos)
+        rec["rows_in"] = rows_in
+    
+    safety_df, recon_df = [pd.concat(parts[o]) if parts[o] else pd.DataFrame() for o in ("safety", "recon")]
+    if not recon_df.empty:
+        print(f"[WARN] Found {len(recon_df)} reconciliation issues.")
+    if not safety_df.empty:
+        print(f"[WARN] Found {len(safety_df)} potential sepsis cases.")
+    return safety_df, recon_df
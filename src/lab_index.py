@@ -0,0 +1,137 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from src.etl import read_table, standardize_lab
+from src.kernel import _day_numbers, _visit_keys
+
+INDEX_FILES = {"meta": "index.json", "subjects": "subjects.npy", "source_keys": "source_keys.npz"}
+
+class LabKeyIndex:
+    """
+    Persistent set of the (USUBJID, SVSTDTC) keys that have a Lab SampleID,
+    for one study. Subjects get append-only integer codes, so a key is one
+    int64 (code << 32 | day number). Keys are kept per source file, and
+    membership is a binary search in the sorted union. A re-delivered
+    (changed) source replaces its own keys, so withdrawn samples stop
+    counting, and the other files are not re-read.
+    """
+    def __init__(self, study=None, subjects=None, source_keys=None, sources=None):
+        self.study = study
+        self.subjects = np.asarray(subjects if subjects is not None else [], dtype=str)
+        self.source_keys = dict(source_keys or {})  # source -> sorted unique keys
+        self.sources = dict(sources or {})  # source path -> [size, mtime_ns]
+        self._lookup = pd.Index(self.subjects)
+        self._merge()
+    
+    def __len__(self):
+        return len(self.keys)
+    
+    def _merge(self):
+        keys = list(self.source_keys.values())
+        self.keys = np.unique(np.concatenate(keys)) if keys else np.array([], dtype=np.int64)
+    
+    @classmethod
+    def from_frame(cls, lab_df, study=None):
+        index = cls(study)
+        index.add(lab_df)
+        return index
+    
+    def _codes(self, subjects, grow=False):
+        # Visits repeat subjects: look up each distinct ID once
+        positions, uniques = pd.factorize(subjects)
+        codes = self._lookup.get_indexer(uniques)
+        if grow and (codes < 0).any():
+            self.subjects = np.concatenate([self.subjects, np.asarray(uniques[codes < 0], dtype=str)])
+            self._lookup = pd.Index(self.subjects)
+            codes = self._lookup.get_indexer(uniques)
+        return np.append(codes, -1)[positions]  # missing IDs (-1) never match
+    
+    def add(self, lab_df, source=None):
+        """
+        Sets the keys of one source from a standardized Lab frame, replacing
+        the keys it had before (rows without a SampleID or USUBJID are skipped).
+        source: name of the delivery (default: a new in-memory source)
+        Returns: change in the number of indexed keys (negative if samples were withdrawn)
+        """
+        source = source if source is not None else f"<frame {len(self.source_keys)}>"
+        lab_df = lab_df[lab_df["SampleID"].notna() & lab_df["USUBJID"].notna()]
+        codes = self._codes(lab_df["USUBJID"].astype(str), grow=True)
+        before = len(self.keys)
+        self.source_keys[source] = np.unique(_visit_keys(codes, _day_numbers(lab_df["SVSTDTC"])))
+        self._merge()
+        return len(self.keys) - before
+    
+    def contains(self, subjects, dates):
+        """
+        Vectorized membership test for EDC visits.
+        Returns: boolean array, True where the visit's key has a lab sample
+        """
+        codes = self._codes(subjects)
+        keys = _visit_keys(np.maximum(codes, 0), _day_numbers(dates))
+        pos = np.minimum(np.searchsorted(self.keys, keys), max(len(self.keys) - 1, 0))
+        found = self.keys[pos] == keys if len(self.keys) else np.zeros(len(keys), dtype=bool)
+        return found & (codes >= 0)
+    
+    def save(self, index_dir):
+        os.makedirs(index_dir, exist_ok=True)
+        names = {source: f"s{i}" for i, source in enumerate(self.source_keys)}
+        meta = {"study": self.study,
+                "sources": [{"source": source, "keys": names[source], "fingerprint": self.sources.get(source)}
+                            for source in self.source_keys]}
+        np.save(os.path.join(index_dir, INDEX_FILES["subjects"]), self.subjects, allow_pickle=False)
+        np.savez(os.path.join(index_dir, INDEX_FILES["source_keys"]),
+                 **{names[source]: keys for source, keys in self.source_keys.items()})
+        with open(os.path.join(index_dir, INDEX_FILES["meta"]), "w") as f:
+            json.dump(meta, f, indent=2)
+    
+    @classmethod
+    def load(cls, index_dir):
+        """
+        Loads an index written by save(); an empty index if there is none yet.
+        """
+        paths = {k: os.path.join(index_dir, v) for k, v in INDEX_FILES.items()}
+        if not all(os.path.exists(p) for p in paths.values()):
+            return cls()
+        with open(paths["meta"]) as f:
+            meta = json.load(f)
+        with np.load(paths["source_keys"], allow_pickle=False) as arrays:
+            source_keys = {entry["source"]: arrays[entry["keys"]] for entry in meta["sources"]}
+        sources = {entry["source"]: entry["fingerprint"] for entry in meta["sources"] if entry["fingerprint"]}
+        return cls(meta["study"], np.load(paths["subjects"]), source_keys, sources)
+    
+    def update_from_files(self, lab_paths):
+        """
+        Indexes every Lab export that is new or changed since it was indexed
+        (by path, size and mtime); a changed file replaces its earlier keys.
+        Returns: number of files read
+        """
+        read = 0
+        for path in lab_paths:
+            stat = os.stat(path)
+            fingerprint = [stat.st_size, stat.st_mtime_ns]
+            source = os.path.abspath(path)
+            if self.sources.get(source) == fingerprint:
+                continue
+            redelivered = source in self.source_keys
+            change = self.add(standardize_lab(read_table(path)), source)
+            self.sources[source] = fingerprint
+            read += 1
+            action = "Re-indexed changed" if redelivered else "Indexed"
+            print(f"[INFO] {action} {path}: {change:+d} lab keys ({len(self)} total).")
+        return read
+
+def open_lab_index(index_dir, lab_paths=(), study=None):
+    """
+    Loads the index in index_dir, adds new or changed Lab files and saves it back.
+    An index belongs to one study: opening it for another study is refused,
+    so one study's keys can never hide another study's missing labs.
+    """
+    index = LabKeyIndex.load(index_dir)
+    if not index.source_keys:
+        index.study = study
+    elif index.study != study:
+        raise ValueError(f"Lab index in {index_dir} belongs to study {index.study!r}, not {study!r}")
+    if index.update_from_files(lab_paths):
+        index.save(index_dir)
+    return index
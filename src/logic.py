@@ -1,63 +1,224 @@
+import os
+import tempfile
 import pandas as pd
 import numpy as np
+from src.instrument import step
+from src.rules import DEFAULT_RULES
+from src.results import QueryResults
+from src.recon import reconcile_within_window
 
-def run_checks(edc_df, lab_df):
+MERGE_KEYS = ["USUBJID", "SVSTDTC"]
+INDEXED_SAMPLE = "<indexed>"  # SampleID stand-in for visits found in a LabKeyIndex
+
+def run_checks(edc_df, lab_df, rules=None, tolerance_days=None):
     """
     Runs safety and reconciliation checks.
+    rules: CompiledRules from src.rules.compile_rules (default: edit_checks.json)
+    tolerance_days: match labs to the nearest visit within +/- this many days
+                    instead of on the exact visit date (see src.recon)
     Returns: safety_df (rows with sepsis flags), recon_df (missing labs)
     """
-    print("[INFO] Running logic checks...")
-    
-    # --- Merge Data ---
-    # Left join EDC with Lab to find missing labs
-    merged_df = pd.merge(edc_df, lab_df, on=["USUBJID", "SVSTDTC"], how="left")
-    
-    # --- Reconciliation Check ---
-    # Flag: Blood_Draw_Performed == "Yes" AND SampleID is Null
-    recon_mask = (merged_df["Blood_Draw_Performed"] == "Yes") & (merged_df["SampleID"].isnull())
-    recon_df = merged_df[recon_mask].copy()
-    recon_df["Query_Text"] = "Lab sample missing despite blood draw confirmation."
+    results = run_query_checks(edc_df, lab_df, rules, tolerance_days)
+    safety_df = results.gather("safety")
+    recon_df = results.gather("recon")
     
     if not recon_df.empty:
         print(f"[WARN] Found {len(recon_df)} reconciliation issues.")
+    if not safety_df.empty:
+        print(f"[WARN] Found {len(safety_df)} potential sepsis cases.")
+        
+    return safety_df, recon_df
 
-    # --- Safety Check (Sepsis) ---
-    # Criteria:
-    # 1. Temp > 38 C or < 36 C
-    # 2. HR > 90
-    # 3. RR > 20
-    # 4. WBC > 12 (12,000) or < 4 (4,000) - Assuming units in 10^3/uL based on data_sim
-    
-    # We need to calculate flags for each criterion
-    # Temp
-    # Note: VSSTRESN_TEMP is in C
-    temp_flag = (merged_df["VSSTRESN_TEMP"] > 38) | (merged_df["VSSTRESN_TEMP"] < 36)
-    
-    # HR
-    hr_flag = merged_df["VSSTRESN_HR"] > 90
+def run_query_checks(edc_df, lab_df, rules=None, tolerance_days=None):
+    """
+    Like run_checks, but returns the compact QueryResults instead of copying
+    flagged rows; call .gather("safety" / "recon", columns) when reporting.
+    """
+    print("[INFO] Running logic checks...")
     
-    # RR
-    rr_flag = merged_df["Raw_RR"] > 20
+    # --- Merge Data ---
+    # Left join EDC with Lab to find missing labs
+    lab_issues = None
+    with step("merge", rows_in=len(edc_df) + len(lab_df)) as rec:
+        if tolerance_days is None:
+            merged_df = pd.merge(edc_df, lab_df, on=MERGE_KEYS, how="left")
+        else:
+            merged_df, lab_issues = reconcile_within_window(edc_df, lab_df, tolerance_days)
+        rec["rows_out"] = len(merged_df)
     
-    # WBC
-    # WBC is in Lab data. 
-    # data_sim generates WBC between 3.0 and 15.0. 
-    # Criteria: > 12 or < 4
-    wbc_flag = (merged_df["WBC"] > 12) | (merged_df["WBC"] < 4)
+    with step("evaluate", rows_in=len(merged_df)) as rec:
+        results = flag_queries(merged_df, rules, lab_issues)
+        rec["rows_out"] = len(results)
+    return results
+
+def run_recon_checks(edc_df, lab_index, rules=None):
+    """
+    Reconciliation against a LabKeyIndex (src.lab_index) instead of a merge:
+    only the recon checks run, over the EDC rows, with SampleID taken from a
+    key membership test. Recon checks may use EDC fields and SampleID only.
+    Returns: QueryResults over the EDC rows (no safety queries)
+    """
+    print("[INFO] Running reconciliation against the Lab key index...")
+    with step("lab_index_lookup", rows_in=len(edc_df)) as rec:
+        has_sample = lab_index.contains(edc_df["USUBJID"], edc_df["SVSTDTC"])
+        rec["rows_out"] = int(has_sample.sum())
+    # Only presence matters; flagged (missing) rows keep a null SampleID as after the merge
+    sample = pd.Categorical.from_codes(has_sample.astype(np.int8) - 1, categories=[INDEXED_SAMPLE])
+    visits = edc_df.assign(SampleID=sample)
     
-    # Sum flags (False=0, True=1)
-    # We need at least 2 flags to be "Potential Sepsis"
-    criteria_count = temp_flag.astype(int) + hr_flag.astype(int) + rr_flag.astype(int) + wbc_flag.astype(int)
+    with step("evaluate", rows_in=len(visits)) as rec:
+        results = flag_queries(visits, (rules or DEFAULT_RULES).for_output("recon"))
+        rec["rows_out"] = len(results)
+    return results
+
+def flag_queries(merged_df, rules=None, lab_issues=None):
+    """
+    Runs the edit checks over an already merged EDC/Lab frame in one fused pass.
+    Returns: QueryResults (row positions + check codes, no row copies)
+    """
+    rules = rules or DEFAULT_RULES
+    flags = rules.evaluate(merged_df)
+    # Row-major: each flagged row, then its checks in spec order
+    rows, check_ids = np.nonzero(flags)
+    return QueryResults(merged_df, rows, check_ids, rules, lab_issues)
+
+def _evaluate_checks(merged_df, rules=None):
+    """
+    Evaluates the edit checks (recon and SIRS by default, see edit_checks.json)
+    and gathers the flagged rows.
+    Returns: safety_df, recon_df (one row per flagged row and check)
+    """
+    results = flag_queries(merged_df, rules)
+    return results.gather("safety"), results.gather("recon")
+
+def _as_chunks(frames):
+    """
+    Accepts a single DataFrame or an iterable of DataFrame chunks.
+    """
+    if isinstance(frames, pd.DataFrame):
+        return [frames]
+    return frames
+
+def _partition_ids(subject_ids, num_partitions):
+    """
+    Stable hash partition of each row by its subject ID.
+    """
+    hashes = pd.util.hash_pandas_object(subject_ids, index=False).to_numpy()
+    return hashes % np.uint64(num_partitions)
+
+def _hash_partition(frames, num_partitions, spill_dir, name, written):
+    """
+    Splits every chunk into `num_partitions` pieces by USUBJID.
+    Pieces are kept in memory, or pickled under `spill_dir` if one is given
+    (each file path is appended to `written` as soon as it exists).
+    Returns: (list of piece lists per partition, column template)
+    """
+    partitions = [[] for _ in range(num_partitions)]
+    template = None
+    row_offset = 0
     
-    safety_mask = criteria_count >= 2
-    safety_df = merged_df[safety_mask].copy()
-    safety_df["Query_Text"] = "Potential Sepsis: >= 2 criteria met. Please confirm clinical status."
+    for chunk_no, chunk in enumerate(_as_chunks(frames)):
+        chunk = chunk.reset_index(drop=True)
+        if template is None:
+            template = chunk.iloc[0:0]
+        if name == "edc":
+            # Remember original visit order so the output matches run_checks
+            chunk["_VISIT_SEQ"] = np.arange(row_offset, row_offset + len(chunk))
+        row_offset += len(chunk)
+        
+        part_ids = _partition_ids(chunk["USUBJID"], num_partitions)
+        for part_no, piece in chunk.groupby(part_ids, sort=False):
+            if spill_dir:
+                piece_path = os.path.join(spill_dir, f"{name}-{int(part_no):04d}-{chunk_no:06d}.pkl")
+                written.append(piece_path)
+                piece.to_pickle(piece_path)
+                partitions[int(part_no)].append(piece_path)
+            else:
+                partitions[int(part_no)].append(piece)
+                
+    return partitions, template
+
+def _load_partition(pieces, template):
+    frames = [pd.read_pickle(p) if isinstance(p, str) else p for p in pieces]
+    if not frames:
+        return template
+    return pd.concat(frames, ignore_index=True)
+
+def run_checks_partitioned(edc_frames, lab_frames, num_partitions=16, spill_dir=None, rules=None, spill=True):
+    """
+    Partition-and-join version of run_checks for very large inputs.
+    Both inputs are hash-partitioned by USUBJID, then each partition is joined
+    and checked on its own, and only the flagged rows are kept.
+    edc_frames / lab_frames: a DataFrame or an iterable of chunks (e.g. stream_standardized)
+    spill=True (default): partitions are written to spill_dir, or to a temporary
+        directory removed afterwards, so peak memory is about one partition plus
+        one chunk; spill files are removed even if the run fails.
+        spill=False keeps every partition in memory (memory grows with the input).
+    Returns: safety_df, recon_df (same rows and order as run_checks)
+    """
+    print(f"[INFO] Running partitioned logic checks ({num_partitions} partitions)...")
+    if not spill:
+        return _run_partitions(edc_frames, lab_frames, num_partitions, None, rules or DEFAULT_RULES)
+    if spill_dir is None:
+        with tempfile.TemporaryDirectory(prefix="cdas-spill-") as tmp_dir:
+            return _run_partitions(edc_frames, lab_frames, num_partitions, tmp_dir, rules or DEFAULT_RULES)
+    os.makedirs(spill_dir, exist_ok=True)
+    return _run_partitions(edc_frames, lab_frames, num_partitions, spill_dir, rules or DEFAULT_RULES)
+
+def _run_partitions(edc_frames, lab_frames, num_partitions, spill_dir, rules):
+    written = []
+    try:
+        edc_parts, edc_template = _hash_partition(edc_frames, num_partitions, spill_dir, "edc", written)
+        lab_parts, lab_template = _hash_partition(lab_frames, num_partitions, spill_dir, "lab", written)
+        if edc_template is None:
+            return pd.DataFrame(), pd.DataFrame()
+        edc_template = edc_template.assign(_VISIT_SEQ=pd.Series(dtype="int64"))
+        if lab_template is None:
+            # No lab chunks at all: the keys plus the lab fields the rules read, all missing
+            lab_template = pd.DataFrame(columns=MERGE_KEYS + [f for f in rules.fields if f not in edc_template.columns])
+            
+        safety_parts = []
+        recon_parts = []
+        for part_no in range(num_partitions):
+            edc_part = _load_partition(edc_parts[part_no], edc_template)
+            if edc_part.empty:
+                continue
+            lab_part = _load_partition(lab_parts[part_no], lab_template)
+            
+            merged_df = pd.merge(edc_part, lab_part, on=MERGE_KEYS, how="left")
+            safety_part, recon_part = _evaluate_checks(merged_df, rules)
+            safety_parts.append(safety_part)
+            recon_parts.append(recon_part)
+            
+            if spill_dir:
+                for piece_path in edc_parts[part_no] + lab_parts[part_no]:
+                    os.remove(piece_path)
+    finally:
+        for piece_path in written:
+            if os.path.exists(piece_path):
+                os.remove(piece_path)
+                
+    safety_df = _concat_flagged(safety_parts)
+    recon_df = _concat_flagged(recon_parts)
     
+    if not recon_df.empty:
+        print(f"[WARN] Found {len(recon_df)} reconciliation issues.")
     if not safety_df.empty:
         print(f"[WARN] Found {len(safety_df)} potential sepsis cases.")
         
     return safety_df, recon_df
 
+def _concat_flagged(parts):
+    """
+    Concatenates per-partition results back into original visit order.
+    """
+    if not parts:
+        return pd.DataFrame()
+    non_empty = [p for p in parts if not p.empty]
+    flagged = pd.concat(non_empty) if non_empty else parts[0]
+    flagged = flagged.sort_values("_VISIT_SEQ", kind="stable")
+    return flagged.drop(columns="_VISIT_SEQ").reset_index(drop=True)
+
 if __name__ == "__main__":
     # Test stub
     pass
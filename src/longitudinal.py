@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+from src.logic import MERGE_KEYS
+
+WBC_TREND_TEXT = "WBC rising across {n} consecutive visits. Please review for infection."
+HR_BASELINE_TEXT = "HR exceeds subject baseline by > {delta} bpm. Please confirm."
+
+def build_visit_index(edc_df, lab_df):
+    """
+    Sorted per-subject visit index over standardized EDC/Lab frames.
+    One row per EDC row, ordered by subject then visit date, with VISITNUM
+    (1-based within subject) and the first Lab sample of that date. Same-day
+    duplicate EDC entries are kept as consecutive visits in entry order, so
+    neither entry's vitals are lost. Each subject is one contiguous block,
+    so windowed checks can work on shifted arrays instead of per-subject loops.
+    """
+    lab_first = lab_df.drop_duplicates(subset=MERGE_KEYS, keep="first")
+    visits = pd.merge(edc_df, lab_first, on=MERGE_KEYS, how="left")
+    visits = visits.sort_values(MERGE_KEYS, kind="stable").reset_index(drop=True)
+    visits["VISITNUM"] = visits.groupby("USUBJID", sort=False, observed=True).cumcount() + 1
+    return visits
+
+def _float_values(visits, column):
+    return pd.to_numeric(visits[column], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+def wbc_rising(visits, consecutive=2):
+    """
+    True where WBC rose at each of the last `consecutive` visit-to-visit
+    steps of the same subject.
+    """
+    if consecutive < 1:
+        raise ValueError(f"consecutive must be at least 1, got {consecutive}")
+    wbc = _float_values(visits, "WBC")
+    visit_num = visits["VISITNUM"].to_numpy()
+    rise = np.zeros(len(visits), dtype=np.int64)
+    with np.errstate(invalid="ignore"):
+        rise[1:] = (wbc[1:] > wbc[:-1]) & (visit_num[1:] > 1)
+    # Rolling sum of rises over the window, via a cumulative sum
+    totals = np.cumsum(rise)
+    window = totals.copy()
+    window[consecutive:] -= totals[:-consecutive]
+    return (visit_num > consecutive) & (window == consecutive)
+
+def hr_above_baseline(visits, delta=30, min_baseline_visits=1):
+    """
+    True where HR exceeds the mean of the subject's earlier visits by more
+    than `delta` bpm. Missing HR values are left out of the baseline.
+    """
+    hr = _float_values(visits, "VSSTRESN_HR")
+    subjects = visits["USUBJID"].to_numpy()
+    present = ~np.isnan(hr)
+    hr_filled = np.where(present, hr, 0.0)
+    
+    # Expanding per-subject sums, minus the current visit = prior visits only
+    prior_sum = pd.Series(hr_filled).groupby(subjects, sort=False).cumsum().to_numpy() - hr_filled
+    prior_count = pd.Series(present.astype(np.int64)).groupby(subjects, sort=False).cumsum().to_numpy() - present
+    with np.errstate(invalid="ignore", divide="ignore"):
+        baseline = prior_sum / prior_count
+        return present & (prior_count >= min_baseline_visits) & (hr - baseline > delta)
+
+def run_longitudinal_checks(edc_df, lab_df, wbc_consecutive=2, hr_delta=30, min_baseline_visits=1):
+    """
+    Cross-visit safety checks over the sorted visit index:
+    - WBC rising across `wbc_consecutive` consecutive visits
+    - HR more than `hr_delta` bpm above the subject's own prior-visit mean
+    Returns: trend_df (one row per flagged visit and check, with Query_Text)
+    """
+    if wbc_consecutive < 1:
+        raise ValueError(f"wbc_consecutive must be at least 1, got {wbc_consecutive}")
+    print("[INFO] Running longitudinal checks...")
+    visits = build_visit_index(edc_df, lab_df)
+    
+    checks = [
+        (wbc_rising(visits, wbc_consecutive), WBC_TREND_TEXT.format(n=wbc_consecutive + 1)),
+        (hr_above_baseline(visits, hr_delta, min_baseline_visits), HR_BASELINE_TEXT.format(delta=hr_delta)),
+    ]
+    parts = []
+    for mask, query_text in checks:
+        flagged = visits[mask].copy()
+        flagged["Query_Text"] = query_text
+        parts.append(flagged)
+    trend_df = pd.concat(parts).sort_index(kind="stable")
+    
+    if not trend_df.empty:
+        print(f"[WARN] Found {len(trend_df)} longitudinal trend queries.")
+    return trend_df
@@ -0,0 +1,63 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from src.etl import guess_date_formats, read_table, standardize_edc, standardize_lab
+from src.logic import run_checks, _partition_ids, _concat_flagged
+from src.privacy import apply_privacy
+
+def _run_shard(edc_shard, lab_shard, region, edc_formats=None, lab_formats=None):
+    """
+    Worker: ETL -> checks -> privacy for one subject shard.
+    edc_formats / lab_formats: date formats of the whole exports (see guess_date_formats)
+    """
+    edc_df = standardize_edc(edc_shard, date_formats=edc_formats)
+    lab_df = standardize_lab(lab_shard, date_formats=lab_formats)
+    safety_df, recon_df = run_checks(edc_df, lab_df)
+    if region:
+        safety_df = apply_privacy(safety_df, region)
+        recon_df = apply_privacy(recon_df, region)
+    return safety_df, recon_df
+
+def run_pipeline_parallel(edc_path, lab_path, workers=None, region=None):
+    """
+    Runs ETL, logic checks and (optionally) privacy masking across a process pool.
+    Subjects are sharded by SubjectID so every visit and lab row of a subject
+    lands in the same worker; results are merged back in original visit order,
+    so output matches a single-process run.
+    Returns: safety_df, recon_df
+    """
+    workers = workers or os.cpu_count() or 1
+    print(f"[INFO] Starting parallel pipeline with {workers} workers...")
+    try:
+        edc_raw = read_table(edc_path)
+        lab_raw = read_table(lab_path)
+    except FileNotFoundError as e:
+        print(f"[ERROR] Input file not found: {e}")
+        return None, None
+        
+    # Guessed once from the whole files, so no shard guesses differently from its own first rows
+    edc_formats = guess_date_formats(edc_raw)
+    lab_formats = guess_date_formats(lab_raw)
+    
+    # Remember original visit order so shards can be merged deterministically
+    edc_raw["_VISIT_SEQ"] = np.arange(len(edc_raw))
+    edc_shard_ids = _partition_ids(edc_raw["SubjectID"], workers)
+    lab_shard_ids = _partition_ids(lab_raw["SubjectID"], workers)
+    
+    shards = []
+    for shard_no in range(workers):
+        edc_shard = edc_raw[edc_shard_ids == shard_no].reset_index(drop=True)
+        if edc_shard.empty:
+            continue
+        lab_shard = lab_raw[lab_shard_ids == shard_no].reset_index(drop=True)
+        shards.append((edc_shard, lab_shard))
+        
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_run_shard, edc_shard, lab_shard, region, edc_formats, lab_formats) for edc_shard, lab_shard in shards]
+        results = [f.result() for f in futures]
+        
+    safety_df = _concat_flagged([r[0] for r in results])
+    recon_df = _concat_flagged([r[1] for r in results])
+    print(f"[INFO] Parallel pipeline complete: {len(safety_df)} safety, {len(recon_df)} recon queries.")
+    return safety_df, recon_df
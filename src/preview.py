@@ -0,0 +1,38 @@
+import math
+import numpy as np
+from src.rules import DEFAULT_RULES, criterion_label
+
+PAGE_SIZES = (25, 50, 100, 250)
+
+def criterion_options(output, rules=None):
+    """
+    Filter choices for one output tab: {label: criterion} of the criteria its checks use.
+    """
+    rules = rules or DEFAULT_RULES
+    return {criterion_label(c): c for c in rules.criteria_for(output)}
+
+def filter_queries(df, subject=None, query_texts=None, criterion=None, rules=None):
+    """
+    Server-side filter of a query tab.
+    subject: case-insensitive substring of USUBJID
+    query_texts: keep only these Query_Text values (query types)
+    criterion: keep only rows meeting this rule criterion (see criterion_options)
+    """
+    keep = np.ones(len(df), dtype=bool)
+    if subject:
+        keep &= df["USUBJID"].astype("str").str.contains(subject, case=False, regex=False).to_numpy(dtype=bool, na_value=False)
+    if query_texts:
+        keep &= df["Query_Text"].isin(query_texts).to_numpy()
+    if criterion is not None and len(df):
+        keep &= (rules or DEFAULT_RULES).criterion_mask(df, criterion)
+    return df[keep]
+
+def page_of(df, page_no, page_size):
+    """
+    One page (1-based, clamped to the valid range) of df.
+    Returns: (page_df, page_no, num_pages)
+    """
+    num_pages = max(1, math.ceil(len(df) / page_size))
+    page_no = min(max(1, int(page_no)), num_pages)
+    start = (page_no - 1) * page_size
+    return df.iloc[start:start + page_size], page_no, num_pages
@@ -1,60 +1,116 @@
 import pandas as pd
+from src.regions import PRIVACY_CONFIG
 
-PRIVACY_CONFIG = {
-    "Alberta (HIA)": {"scrub_initials": True, "mask_dob": "YearMonth"},
-    "USA (HIPAA)": {"scrub_initials": False, "mask_dob": "Year"},
-    "Canada (PIPEDA)": {"scrub_initials": True, "mask_dob": "Full"},
-    "British Columbia (PIPA)": {"scrub_initials": True, "mask_dob": "YearMonth"},
-    "Ontario (PHIPA)": {"scrub_initials": True, "mask_dob": "YearMonth"}
-}
+def mask_date(date_str, mask_type):
+    """
+    Masks a single YYYY-MM-DD date. Scalar reference for _mask_dates.
+    """
+    if pd.isna(date_str):
+        return date_str
+    
+    # Assuming YYYY-MM-DD
+    try:
+        parts = str(date_str).split("-")
+        if len(parts) != 3:
+            return date_str
+            
+        year, month, day = parts[0], parts[1], parts[2]
+        
+        if mask_type == "YearMonth":
+            return f"{year}-{month}-XX"
+        elif mask_type == "Year":
+            return f"{year}"
+        elif mask_type == "Full":
+            return "[REDACTED]"
+        else:
+            return date_str
+    except:
+        return date_str
+
+def _mask_dates(dates, mask_type):
+    """
+    Vectorized mask_date over a whole column.
+    Only values that split into exactly three "-" parts are masked.
+    """
+    if dates.empty:
+        return dates
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        dates = dates.dt.strftime("%Y-%m-%d")
+    text = dates.astype(str)
+    valid = dates.notna() & text.str.fullmatch(r"[^-]*-[^-]*-[^-]*")
+    
+    if mask_type == "YearMonth":
+        masked = text.str.replace(r"-[^-]*$", "-XX", regex=True)
+    elif mask_type == "Year":
+        masked = text.str.replace(r"-[^-]*-[^-]*$", "", regex=True)
+    elif mask_type == "Full":
+        masked = "[REDACTED]"
+    else:
+        return dates
+    return dates.where(~valid, masked)
+
+def _scrub(values):
+    return pd.Series("[REDACTED]", index=values.index, dtype=object)
+
+def compile_policy(config):
+    """
+    Compiles a PRIVACY_CONFIG entry into a list of (column, column_op) steps.
+    """
+    steps = []
+    if config["scrub_initials"]:
+        steps.append(("INITIALS", _scrub))
+    mask_type = config["mask_dob"]
+    steps.append(("BRTHDTC", lambda dates: _mask_dates(dates, mask_type)))
+    return steps
+
+COMPILED_POLICIES = {region: compile_policy(config) for region, config in PRIVACY_CONFIG.items()}
 
 def apply_privacy(df, region):
     """
     Applies privacy rules to the DataFrame based on the selected region.
+    Only the masked columns are copied; the input frame is left untouched.
     """
-    if region not in PRIVACY_CONFIG:
+    if region not in COMPILED_POLICIES:
         return df
         
-    config = PRIVACY_CONFIG[region]
-    
-    # Create a copy to avoid SettingWithCopy warnings on the original df
-    df_scrubbed = df.copy()
-    
-    # --- Initials Scrubbing ---
-    if config["scrub_initials"] and "INITIALS" in df_scrubbed.columns:
-        df_scrubbed["INITIALS"] = "[REDACTED]"
-        
-    # --- DOB Masking ---
-    if "BRTHDTC" in df_scrubbed.columns:
-        mask_type = config["mask_dob"]
-        
-        def mask_date(date_str):
-            if pd.isna(date_str):
-                return date_str
+    # Shallow copy: untouched columns are shared with df, masked ones replaced
+    df_scrubbed = df.copy(deep=False)
+    for column, column_op in COMPILED_POLICIES[region]:
+        if column in df_scrubbed.columns:
+            df_scrubbed[column] = column_op(df_scrubbed[column])
             
-            # Assuming YYYY-MM-DD
-            try:
-                parts = str(date_str).split("-")
-                if len(parts) != 3:
-                    return date_str
-                    
-                year, month, day = parts[0], parts[1], parts[2]
-                
-                if mask_type == "YearMonth":
-                    return f"{year}-{month}-XX"
-                elif mask_type == "Year":
-                    return f"{year}"
-                elif mask_type == "Full":
-                    return "[REDACTED]"
-                else:
-                    return date_str
-            except:
-                return date_str
-                
-        df_scrubbed["BRTHDTC"] = df_scrubbed["BRTHDTC"].apply(mask_date)
-        
     return df_scrubbed
 
+def apply_privacy_many(frames, region):
+    """
+    Applies the same region policy to several frames (e.g. safety and recon).
+    The compiled policy runs once per masked column over the values of all
+    frames together, then the result is split back; same output as calling
+    apply_privacy on each frame.
+    Returns: list of masked frames, in input order
+    """
+    if region not in COMPILED_POLICIES:
+        return list(frames)
+        
+    masked = [df.copy(deep=False) for df in frames]
+    for column, column_op in COMPILED_POLICIES[region]:
+        holders = [df for df in masked if column in df.columns]
+        batch = [df for df in holders if len(df)]
+        # One call per column only when the pieces share a dtype (string vs datetime64 dates mask differently)
+        if len({df[column].dtype for df in batch}) > 1 or len(batch) < 2:
+            batch = []
+        batched = {id(df) for df in batch}
+        for df in holders:
+            if id(df) not in batched:
+                df[column] = column_op(df[column])
+        if batch:
+            combined = column_op(pd.concat([df[column] for df in batch], ignore_index=True))
+            start = 0
+            for df in batch:
+                df[column] = combined.iloc[start:start + len(df)].set_axis(df.index)
+                start += len(df)
+    return masked
+
 if __name__ == "__main__":
     # Test
     test_data = {
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+DUPLICATE_LAB_TEXT = "Duplicate lab sample: SampleID or visit already has a result. Please confirm which is valid."
+ORPHAN_LAB_TEXT = "Lab sample has no EDC visit within +/- {days} day(s). Please confirm visit date."
+
+def _visit_dates(values):
+    """
+    SVSTDTC as datetime64, whether it holds ISO strings or datetimes (optimized dtypes).
+    """
+    return pd.to_datetime(pd.Series(values).reset_index(drop=True), errors="coerce")
+
+def _subject_keys(values):
+    # Plain strings, so categorical EDC/Lab subjects with different categories still match
+    return pd.Series(values).reset_index(drop=True).astype("str")
+
+def match_labs(edc_df, lab_df, tolerance_days=2):
+    """
+    Sorted as-of join of every lab sample to the nearest EDC visit date of the
+    same subject, within +/- tolerance_days.
+    Each visit keeps at most one sample (the closest, then the first in the file);
+    a sample that loses its nearest visit moves on to the nearest visit still
+    without a sample, so visits closer together than the window each keep one.
+    A SampleID repeated within a subject, and a sample left over once every
+    visit in its window is taken, count as duplicates.
+    Returns: (lab_visit, duplicate) arrays aligned with lab_df rows
+             lab_visit: matched EDC row position, -1 if none
+    """
+    edc_dates = _visit_dates(edc_df["SVSTDTC"])
+    visits = pd.DataFrame({"USUBJID": _subject_keys(edc_df["USUBJID"]), "_DATE": edc_dates})
+    visits["_VISIT_POS"] = np.arange(len(visits))
+    visits = visits[visits["_DATE"].notna() & edc_df["USUBJID"].notna().to_numpy()]
+    # Repeated EDC visits share the same key, so match against the first one
+    visits = visits.drop_duplicates(subset=["USUBJID", "_DATE"], keep="first").sort_values("_DATE", kind="stable")
+    
+    samples = pd.DataFrame({"USUBJID": _subject_keys(lab_df["USUBJID"]), "_DATE": _visit_dates(lab_df["SVSTDTC"])})
+    samples["_LAB_POS"] = np.arange(len(samples))
+    duplicate = np.zeros(len(samples), dtype=bool)
+    if "SampleID" in lab_df.columns:
+        repeated = pd.DataFrame({"USUBJID": samples["USUBJID"], "SampleID": lab_df["SampleID"].to_numpy()}).duplicated(keep="first")
+        duplicate = (repeated & lab_df["SampleID"].notna().to_numpy()).to_numpy(copy=True)
+    samples = samples[samples["_DATE"].notna() & lab_df["USUBJID"].notna().to_numpy() & ~duplicate]
+    samples = samples.sort_values("_DATE", kind="stable")
+    
+    lab_visit = np.full(len(lab_df), -1, dtype=np.int64)
+    # Each round, the samples still pending claim their nearest open visit and
+    # each visit keeps its closest claimant; the others try again without it
+    while not samples.empty and not visits.empty:
+        matched = pd.merge_asof(
+            samples, visits, on="_DATE", by="USUBJID", direction="nearest",
+            tolerance=pd.Timedelta(days=tolerance_days),
+        )
+        # merge_asof keeps the left (sorted) order; the visit date comes back via its position
+        matched = matched[matched["_VISIT_POS"].notna()]
+        if matched.empty:
+            break
+        visit_pos = matched["_VISIT_POS"].to_numpy(dtype=np.int64)
+        gap = np.abs((matched["_DATE"].to_numpy() - edc_dates.to_numpy()[visit_pos]).astype("timedelta64[s]").astype(np.int64))
+        lab_pos = matched["_LAB_POS"].to_numpy(dtype=np.int64)
+        
+        # Closest sample per visit wins, ties go to file order
+        order = np.lexsort((lab_pos, gap, visit_pos))
+        visit_pos, lab_pos = visit_pos[order], lab_pos[order]
+        first = np.ones(len(visit_pos), dtype=bool)
+        first[1:] = visit_pos[1:] != visit_pos[:-1]
+        lab_visit[lab_pos[first]] = visit_pos[first]
+        duplicate[lab_pos[first]] = False
+        duplicate[lab_pos[~first]] = True
+        samples = samples[samples["_LAB_POS"].isin(lab_pos[~first])]
+        visits = visits[~visits["_VISIT_POS"].isin(visit_pos[first])]
+    return lab_visit, duplicate
+
+def merge_within_window(edc_df, lab_df, lab_visit):
+    """
+    Left join of EDC with the matched lab samples, one row per EDC row.
+    The lab's own date is kept as LBDTC; SVSTDTC is the EDC visit date.
+    """
+    kept = lab_visit >= 0
+    lab_matched = lab_df[kept].rename(columns={"SVSTDTC": "LBDTC"})
+    lab_matched.insert(1, "SVSTDTC", edc_df["SVSTDTC"].to_numpy()[lab_visit[kept]])
+    return pd.merge(edc_df, lab_matched, on=["USUBJID", "SVSTDTC"], how="left")
+
+def lab_sample_issues(lab_df, lab_visit, duplicate, tolerance_days=2):
+    """
+    Duplicate and orphan lab samples as recon queries, in lab file order.
+    """
+    orphan = (lab_visit < 0) & ~duplicate
+    issues = lab_df[duplicate | orphan].copy()
+    query_texts = np.where(duplicate, DUPLICATE_LAB_TEXT, ORPHAN_LAB_TEXT.format(days=tolerance_days))
+    issues["Query_Text"] = query_texts[duplicate | orphan]
+    return issues
+
+def reconcile_within_window(edc_df, lab_df, tolerance_days=2):
+    """
+    Date-tolerant reconciliation. O(n log n): both sides are sorted once and
+    joined with merge_asof per subject, never cross-joined.
+    Returns: merged_df (one row per EDC row, for the edit checks),
+             issues_df (duplicate / orphan lab samples with Query_Text)
+    """
+    lab_visit, duplicate = match_labs(edc_df, lab_df, tolerance_days)
+    merged_df = merge_within_window(edc_df, lab_df, lab_visit)
+    issues_df = lab_sample_issues(lab_df, lab_visit, duplicate, tolerance_days)
+    return merged_df, issues_df
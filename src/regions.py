@@ -0,0 +1,9 @@
+# Region -> PII masking protocol. Kept free of pandas so the CLI can list
+# regions (--help, argument validation) without loading the data stack.
+PRIVACY_CONFIG = {
+    "Alberta (HIA)": {"scrub_initials": True, "mask_dob": "YearMonth"},
+    "USA (HIPAA)": {"scrub_initials": False, "mask_dob": "Year"},
+    "Canada (PIPEDA)": {"scrub_initials": True, "mask_dob": "Full"},
+    "British Columbia (PIPA)": {"scrub_initials": True, "mask_dob": "YearMonth"},
+    "Ontario (PHIPA)": {"scrub_initials": True, "mask_dob": "YearMonth"}
+}
@@ -1,68 +1,153 @@
+import os
+import numpy as np
 import pandas as pd
-from openpyxl import Workbook
-from openpyxl.styles import PatternFill
-from openpyxl.utils.dataframe import dataframe_to_rows
+from src.instrument import step
 
-def generate_excel(safety_df, recon_df, output_file="Query_Log.xlsx"):
+# openpyxl is imported inside the writers: it is only needed once a report is
+# actually generated, not by CLI startup or worker processes that only check.
+
+SAFETY_COLUMNS = ["USUBJID", "INITIALS", "BRTHDTC", "SVSTDTC", "VSSTRESN_TEMP", "VSSTRESN_HR", "Raw_RR", "WBC", "Query_Text"]
+RECON_COLUMNS = ["USUBJID", "INITIALS", "BRTHDTC", "SVSTDTC", "Blood_Draw_Performed", "SampleID", "Query_Text"]
+
+# Excel's row limit per sheet (including the header row)
+EXCEL_MAX_ROWS = 1_048_576
+
+# Fill colours: header grey, safety rows RED, recon rows YELLOW
+STYLE_FILLS = {
+    "cdas_header": "DDDDDD",
+    "cdas_safety": "FFCCCC",
+    "cdas_recon": "FFFFCC",
+}
+
+def _fill(style_name):
+    from openpyxl.styles import PatternFill
+    color = STYLE_FILLS[style_name]
+    return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+def _register_styles(wb):
     """
-    Generates an Excel report with highlighted queries.
+    Adds one NamedStyle per STYLE_FILLS entry to the workbook, so cells refer
+    to a shared style by name instead of each carrying its own fill.
     """
-    print(f"[INFO] Generating report: {output_file}...")
-    
-    wb = Workbook()
-    
-    # --- Tab 1: Safety Queries ---
-    ws1 = wb.active
-    ws1.title = "Safety Queries"
-    
-    # Convert dataframe to rows with header
-    # Include relevant columns only if too many
-    # Convert dataframe to rows with header
-    # Include relevant columns only if too many
-    cols = ["USUBJID", "INITIALS", "BRTHDTC", "SVSTDTC", "VSSTRESN_TEMP", "VSSTRESN_HR", "Raw_RR", "WBC", "Query_Text"]
+    from openpyxl.styles import NamedStyle
+    for style_name in STYLE_FILLS:
+        wb.add_named_style(NamedStyle(name=style_name, fill=_fill(style_name)))
+
+def report_frames(results, extra_columns=()):
+    """
+    Gathers only the report columns of each tab from a QueryResults store.
+    extra_columns: also kept where present (e.g. SITEID for sharding by site);
+                   the workbook itself still shows only the report columns
+    Returns: safety_df, recon_df
+    """
+    extra = [c for c in extra_columns if c not in SAFETY_COLUMNS + RECON_COLUMNS]
+    return results.gather("safety", SAFETY_COLUMNS + extra), results.gather("recon", RECON_COLUMNS + extra)
+
+def _sheet_rows(df, cols):
+    """
+    Header + data rows for the report columns present in df.
+    """
+    from openpyxl.utils.dataframe import dataframe_to_rows
     # Check if cols exist (some might be missing if no merges happened correctly or empty df)
-    existing_cols = [c for c in cols if c in safety_df.columns]
+    existing_cols = [c for c in cols if c in df.columns]
     
-    if not safety_df.empty:
-        rows = dataframe_to_rows(safety_df[existing_cols], index=False, header=True)
-    else:
-        rows = [existing_cols] # just header
-        
+    if not df.empty:
+        frame = df[existing_cols]
+        # Dates kept as datetime64 (optimized dtypes) are formatted only here
+        date_cols = [c for c in existing_cols if pd.api.types.is_datetime64_any_dtype(frame[c])]
+        if date_cols:
+            frame = frame.assign(**{c: frame[c].dt.strftime("%Y-%m-%d") for c in date_cols})
+        # Nullable ints (Int16) hold pd.NA, which openpyxl cannot write
+        nullable_cols = [c for c in existing_cols if isinstance(frame[c].dtype, pd.api.extensions.ExtensionDtype)
+                         and pd.api.types.is_integer_dtype(frame[c])]
+        if nullable_cols:
+            frame = frame.assign(**{c: frame[c].astype("float64") for c in nullable_cols})
+        # float32 vitals hold the source decimals only approximately (36.9 -> 36.900001525...);
+        # their shortest repr is the source value, so go through it rather than astype
+        float32_cols = [c for c in existing_cols if frame[c].dtype == np.float32]
+        if float32_cols:
+            frame = frame.assign(**{c: frame[c].to_numpy().astype(str).astype("float64") for c in float32_cols})
+        return dataframe_to_rows(frame, index=False, header=True)
+    return [existing_cols] # just header
+
+def _write_sheet(ws, rows, row_style):
+    """
+    Cell-by-cell writer (regular workbook mode).
+    """
     for r_idx, row in enumerate(rows, 1):
+        style = "cdas_header" if r_idx == 1 else row_style
         for c_idx, value in enumerate(row, 1):
-            cell = ws1.cell(row=r_idx, column=c_idx, value=value)
-            
-            # Highlight header
-            if r_idx == 1:
-                cell.fill = PatternFill(start_color="DDDDDD", end_color="DDDDDD", fill_type="solid")
-            else:
-                # Highlight rows RED
-                cell.fill = PatternFill(start_color="FFCCCC", end_color="FFCCCC", fill_type="solid")
+            ws.cell(row=r_idx, column=c_idx, value=value).style = style
 
-    # --- Tab 2: Recon Queries ---
-    ws2 = wb.create_sheet(title="Recon Queries")
-    
-    cols_recon = ["USUBJID", "INITIALS", "BRTHDTC", "SVSTDTC", "Blood_Draw_Performed", "SampleID", "Query_Text"]
-    existing_cols_recon = [c for c in cols_recon if c in recon_df.columns]
+def _stream_sheet(ws, rows, row_style):
+    """
+    Streaming writer (write-only workbook mode). Only the header cells carry
+    the cdas_header style; data rows are appended as plain values and
+    highlighted with a single conditional-format fill over the data range
+    (conditional formats cannot refer to named styles).
+    """
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.formatting.rule import FormulaRule
+    from openpyxl.utils import get_column_letter
+    rows = iter(rows)
+    header = next(rows)
+    header_cells = []
+    for value in header:
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = "cdas_header"
+        header_cells.append(cell)
+    ws.append(header_cells)
     
-    if not recon_df.empty:
-        rows_recon = dataframe_to_rows(recon_df[existing_cols_recon], index=False, header=True)
-    else:
-        rows_recon = [existing_cols_recon]
+    last_row = 1
+    for row in rows:
+        ws.append(row)
+        last_row += 1
         
-    for r_idx, row in enumerate(rows_recon, 1):
-        for c_idx, value in enumerate(row, 1):
-            cell = ws2.cell(row=r_idx, column=c_idx, value=value)
-            
-            # Highlight header
-            if r_idx == 1:
-                cell.fill = PatternFill(start_color="DDDDDD", end_color="DDDDDD", fill_type="solid")
-            else:
-                # Highlight rows YELLOW
-                cell.fill = PatternFill(start_color="FFFFCC", end_color="FFFFCC", fill_type="solid")
+    if last_row > 1 and header:
+        data_range = f"A2:{get_column_letter(len(header))}{last_row}"
+        ws.conditional_formatting.add(data_range, FormulaRule(formula=["TRUE"], fill=_fill(row_style), stopIfTrue=False))
+
+def _sheet_parts(title, df, max_rows):
+    """
+    (sheet title, rows) pieces of one tab: "Title", "Title (2)", ... once df
+    has more than max_rows rows. An empty tab still gets its header sheet.
+    """
+    if len(df) <= max_rows:
+        return [(title, df)]
+    return [(title if start == 0 else f"{title} ({start // max_rows + 1})", df.iloc[start:start + max_rows])
+            for start in range(0, len(df), max_rows)]
 
-    wb.save(output_file)
-    print(f"[INFO] Report generated successfully: {output_file}")
+def generate_excel(safety_df, recon_df, output_file="Query_Log.xlsx", write_only=True, max_sheet_rows=EXCEL_MAX_ROWS - 1):
+    """
+    Generates an Excel report with highlighted queries.
+    output_file: a path or a writable binary buffer (e.g. io.BytesIO)
+    write_only=True (default) streams rows and highlights them with
+    conditional-format fills (fast path for large query logs); write_only=False
+    builds the workbook cell by cell, each cell using a shared named style.
+    Both give the same tabs, columns, values and colours.
+    max_sheet_rows: query rows per sheet; larger tabs continue on numbered sheets
+    """
+    from openpyxl import Workbook
+    label = output_file if isinstance(output_file, (str, os.PathLike)) else "in-memory workbook"
+    print(f"[INFO] Generating report: {label}...")
+    
+    wb = Workbook(write_only=write_only)
+    _register_styles(wb)
+    write_sheet = _stream_sheet if write_only else _write_sheet
+    if not write_only:
+        wb.remove(wb.active)
+    
+    # --- Tab 1: Safety Queries, Tab 2: Recon Queries ---
+    tabs = (("Safety Queries", safety_df, SAFETY_COLUMNS, "cdas_safety", "safety_tab"),
+            ("Recon Queries", recon_df, RECON_COLUMNS, "cdas_recon", "recon_tab"))
+    for title, df, columns, row_style, step_name in tabs:
+        with step(step_name, rows_in=len(df)):
+            for sheet_title, part in _sheet_parts(title, df, max_sheet_rows):
+                write_sheet(wb.create_sheet(title=sheet_title), _sheet_rows(part, columns), row_style)
+    
+    with step("save"):
+        wb.save(output_file)
+    print(f"[INFO] Report generated successfully: {label}")
 
 if __name__ == "__main__":
     # Test stub
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+class QueryResults:
+    """
+    Compact, query-level store of edit-check results over a merged EDC/Lab frame.
+    Each query is an integer row position into merged_df plus a categorical
+    check code; query texts and output tabs live once in query_table.
+    Full rows are only gathered (e.g. at reporting time) via gather().
+    lab_issues: optional recon queries with no merged row (duplicate / orphan
+    lab samples from date-window reconciliation), appended to the recon output.
+    """
+    def __init__(self, merged_df, rows, check_ids, rules, lab_issues=None):
+        self.merged_df = merged_df
+        self.lab_issues = lab_issues
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.codes = pd.Categorical.from_codes(check_ids, categories=[c["name"] for c in rules.checks])
+        self.query_table = pd.DataFrame(
+            {"output": rules.outputs, "query_text": rules.query_texts},
+            index=pd.Index(self.codes.categories, name="code"),
+        )
+        
+    def __len__(self):
+        return len(self.rows) + self._num_lab_issues()
+        
+    def _num_lab_issues(self):
+        return 0 if self.lab_issues is None else len(self.lab_issues)
+        
+    def counts(self):
+        """
+        Number of queries per check code.
+        """
+        return pd.Series(self.codes).value_counts(sort=False)
+        
+    def _selection(self, output):
+        check_outputs = self.query_table["output"].to_numpy()
+        return check_outputs[self.codes.codes] == output
+        
+    def count(self, output):
+        extra = self._num_lab_issues() if output == "recon" else 0
+        return int(self._selection(output).sum()) + extra
+        
+    def gather(self, output, columns=None):
+        """
+        Materializes the flagged rows of one output ("safety" or "recon"),
+        optionally only `columns`, with a Query_Text column.
+        """
+        selected = self._selection(output)
+        rows = self.rows[selected]
+        if columns is None:
+            frame = self.merged_df.iloc[rows]
+        else:
+            positions = [self.merged_df.columns.get_loc(c) for c in columns if c in self.merged_df.columns]
+            frame = self.merged_df.iloc[rows, positions]
+        frame = frame.copy()
+        query_texts = self.query_table["query_text"].to_numpy(dtype=object)
+        frame["Query_Text"] = query_texts[self.codes.codes[selected]] if len(rows) else pd.Series(dtype=object)
+        
+        if output == "recon" and self._num_lab_issues():
+            issue_cols = [c for c in frame.columns if c in self.lab_issues.columns]
+            frame = pd.concat([frame, self.lab_issues[issue_cols]])
+        return frame
@@ -0,0 +1,166 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "edit_checks.json")
+OUTPUTS = ("safety", "recon")
+
+# Comparator -> (number of thresholds, vectorized test over a column array)
+COMPARATORS = {
+    ">": (1, lambda x, t: x > t[0]),
+    ">=": (1, lambda x, t: x >= t[0]),
+    "<": (1, lambda x, t: x < t[0]),
+    "<=": (1, lambda x, t: x <= t[0]),
+    "outside": (2, lambda x, t: (x < t[0]) | (x > t[1])),
+    "between": (2, lambda x, t: (x >= t[0]) & (x <= t[1])),
+}
+
+def load_rules(path=DEFAULT_RULES_PATH):
+    """
+    Loads an edit-check spec from JSON, or YAML (.yml/.yaml, requires PyYAML).
+    """
+    with open(path) as f:
+        if str(path).lower().endswith((".yml", ".yaml")):
+            import yaml
+            return yaml.safe_load(f)
+        return json.load(f)
+
+def _criterion_key(criterion):
+    return json.dumps(criterion, sort_keys=True)
+
+def criterion_label(criterion):
+    """
+    Human-readable criterion, e.g. "VSSTRESN_HR > 90" (used in dashboard filters).
+    """
+    comparator = criterion["comparator"]
+    if comparator in ("isnull", "notnull"):
+        return f"{criterion['field']} {comparator}"
+    if comparator in ("==", "!="):
+        return f"{criterion['field']} {comparator} {criterion['value']}"
+    if comparator == "in":
+        return f"{criterion['field']} in {criterion['values']}"
+    if COMPARATORS[comparator][0] == 1:
+        return f"{criterion['field']} {comparator} {criterion['thresholds'][0]}"
+    return f"{criterion['field']} {comparator} {criterion['thresholds']}"
+
+def _validate(check):
+    name = check.get("name")
+    if not name:
+        raise ValueError("Every check needs a name")
+    if check.get("output") not in OUTPUTS:
+        raise ValueError(f"Check {name}: output must be one of {OUTPUTS}")
+    if not check.get("criteria"):
+        raise ValueError(f"Check {name}: at least one criterion is required")
+    for criterion in check["criteria"]:
+        comparator = criterion.get("comparator")
+        if comparator in COMPARATORS:
+            if len(criterion.get("thresholds", [])) != COMPARATORS[comparator][0]:
+                raise ValueError(f"Check {name}: '{comparator}' on {criterion.get('field')} needs {COMPARATORS[comparator][0]} threshold(s)")
+        elif comparator in ("==", "!="):
+            if "value" not in criterion:
+                raise ValueError(f"Check {name}: '{comparator}' on {criterion.get('field')} needs a value")
+        elif comparator == "in":
+            if not isinstance(criterion.get("values"), list):
+                raise ValueError(f"Check {name}: 'in' on {criterion.get('field')} needs a list of values")
+        elif comparator not in ("isnull", "notnull"):
+            raise ValueError(f"Check {name}: unknown comparator '{comparator}'")
+
+class CompiledRules:
+    """
+    Edit checks compiled into one fused evaluation.
+    Every distinct criterion is evaluated once into a column of a boolean
+    matrix; a single matrix product with the check/criterion incidence matrix
+    then gives the met-criteria count for every check on every row.
+    """
+    def __init__(self, spec):
+        self.checks = spec["checks"]
+        for check in self.checks:
+            _validate(check)
+        names = [check["name"] for check in self.checks]
+        if len(set(names)) != len(names):
+            raise ValueError("Check names must be unique")
+            
+        self.criteria = []
+        index = {}
+        for check in self.checks:
+            for criterion in check["criteria"]:
+                key = _criterion_key(criterion)
+                if key not in index:
+                    index[key] = len(self.criteria)
+                    self.criteria.append(criterion)
+                    
+        self.incidence = np.zeros((len(self.criteria), len(self.checks)), dtype=np.int32)
+        for c, check in enumerate(self.checks):
+            for criterion in check["criteria"]:
+                self.incidence[index[_criterion_key(criterion)], c] = 1
+        self.min_criteria = np.array([check.get("min_criteria", len(check["criteria"])) for check in self.checks])
+        self.query_texts = [check["query_text"] for check in self.checks]
+        self.outputs = np.array([check["output"] for check in self.checks])
+        
+    @property
+    def fields(self):
+        return sorted({criterion["field"] for criterion in self.criteria})
+        
+    def criteria_for(self, output):
+        """
+        Distinct criteria used by the checks of one output tab, in spec order.
+        """
+        used = self.incidence[:, self.outputs == output].any(axis=1)
+        return [criterion for criterion, is_used in zip(self.criteria, used) if is_used]
+        
+    def for_output(self, output):
+        """
+        CompiledRules with only the checks of one output tab.
+        """
+        return CompiledRules({"checks": [check for check in self.checks if check["output"] == output]})
+        
+    def criterion_mask(self, df, criterion):
+        """
+        Boolean array of the rows of df that meet one criterion.
+        """
+        field = criterion["field"]
+        if field not in df.columns:
+            raise ValueError(f"Edit check field '{field}' not found in merged data")
+        comparator = criterion["comparator"]
+        column = df[field]
+        
+        if comparator == "isnull":
+            return column.isna().to_numpy()
+        if comparator == "notnull":
+            return column.notna().to_numpy()
+        if comparator == "==":
+            return (column == criterion["value"]).to_numpy(dtype=bool, na_value=False)
+        if comparator == "!=":
+            return (column != criterion["value"]).to_numpy(dtype=bool, na_value=True)
+        if comparator == "in":
+            return column.isin(criterion["values"]).to_numpy()
+        thresholds = criterion["thresholds"]
+        if column.dtype == np.float32:
+            # float32 vitals (optimized dtypes) hold their decimals only approximately,
+            # e.g. float32(38.3) < 38.3: compare against thresholds rounded the same way
+            values = column.to_numpy()
+            thresholds = np.asarray(thresholds, dtype=np.float32)
+        else:
+            values = pd.to_numeric(column, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        # NaN compares False, same as the pandas expressions
+        with np.errstate(invalid="ignore"):
+            return COMPARATORS[comparator][1](values, thresholds)
+        
+    def evaluate(self, df):
+        """
+        Returns: boolean matrix (rows x checks) of flagged rows per check
+        """
+        matrix = np.empty((len(df), len(self.criteria)), dtype=np.int32)
+        for i, criterion in enumerate(self.criteria):
+            matrix[:, i] = self.criterion_mask(df, criterion)
+        counts = matrix @ self.incidence
+        return counts >= self.min_criteria
+
+def compile_rules(spec=None):
+    """
+    Compiles a spec dict (or the default spec file) into CompiledRules.
+    """
+    return CompiledRules(spec if spec is not None else load_rules())
+
+DEFAULT_RULES = compile_rules()
@@ -0,0 +1,144 @@
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from src.instrument import step
+from src.reporter import RECON_COLUMNS, SAFETY_COLUMNS, generate_excel
+from src.rules import DEFAULT_RULES
+
+SHARD_MODES = ("query", "subjects", "site")
+REPORT_FORMATS = ("xlsx", "csv", "parquet")
+INDEX_COLUMNS = ["shard", "output", "file", "rows", "first_subject", "last_subject"]
+INDEX_FILE = "report_index.csv"
+UNASSIGNED_SITE = "unassigned"
+
+def _slug(text, words=4):
+    return "_".join(re.findall(r"[a-z0-9]+", str(text).lower())[:words]) or "query"
+
+def _query_shard_names(query_texts, rules):
+    """
+    Shard name per query text: the check name for rule queries, else a slug of the text.
+    """
+    names = dict(zip(rules.query_texts, (check["name"] for check in rules.checks)))
+    return {text: names.get(text, _slug(text)) for text in query_texts}
+
+def shard_queries(safety_df, recon_df, by=None, subjects_per_shard=10_000, site_column="SITEID", rules=None):
+    """
+    Splits both query tabs into report shards; rows keep their order within a shard.
+    by: None (one shard), "query" (one shard per query type), "subjects"
+        (consecutive ranges of subjects_per_shard sorted USUBJIDs) or "site"
+        (one shard per value of site_column, which the data must carry)
+    Returns: list of (shard name, safety part, recon part)
+    """
+    if by is None:
+        return [("all", safety_df, recon_df)]
+    if by not in SHARD_MODES:
+        raise ValueError(f"Unknown shard mode '{by}'; use one of {SHARD_MODES}")
+    frames = {"safety": safety_df, "recon": recon_df}
+    
+    if by == "query":
+        texts = pd.unique(pd.concat([df["Query_Text"] for df in frames.values() if "Query_Text" in df.columns]
+                                    or [pd.Series(dtype=object)]))
+        names = _query_shard_names(texts, rules or DEFAULT_RULES)
+        keys = {o: df["Query_Text"].map(names) if "Query_Text" in df.columns else pd.Series(dtype=object)
+                for o, df in frames.items()}
+        order = list(dict.fromkeys(names.values()))
+    elif by == "subjects":
+        subjects = {o: df["USUBJID"].astype(str).to_numpy() if "USUBJID" in df.columns else np.array([], dtype=str)
+                    for o, df in frames.items()}
+        sorted_subjects = np.unique(np.concatenate(list(subjects.values())))
+        keys = {o: np.searchsorted(sorted_subjects, s) // subjects_per_shard for o, s in subjects.items()}
+        order = range(-(-len(sorted_subjects) // subjects_per_shard))
+    else:
+        missing = [o for o, df in frames.items() if len(df) and site_column not in df.columns]
+        if missing:
+            raise ValueError(f"Cannot shard by site: column '{site_column}' not in the {', '.join(missing)} queries")
+        # Queries without a site go to their own shard rather than being dropped
+        keys = {o: df[site_column].astype(object).where(df[site_column].notna(), UNASSIGNED_SITE)
+                if site_column in df.columns else pd.Series(dtype=object) for o, df in frames.items()}
+        order = pd.unique(pd.concat(list(keys.values())))
+    
+    shards = []
+    used_names = set()
+    for key in order:
+        parts = [df[np.asarray(keys[o] == key, dtype=bool)] for o, df in frames.items()]
+        name = f"subjects_{key + 1:04d}" if by == "subjects" else _slug(key, words=6) if by == "site" else key
+        shards.append((_unique_name(name, used_names), *parts))
+    return shards
+
+def _unique_name(name, used_names):
+    """
+    name, or name_2, name_3, ... if another shard already uses it (e.g. sites
+    "A-1" and "A 1" slug the same), so no shard file overwrites another.
+    """
+    unique, n = name, 1
+    while unique in used_names:
+        n += 1
+        unique = f"{name}_{n}"
+    used_names.add(unique)
+    return unique
+
+def _subject_range(df):
+    if df.empty or "USUBJID" not in df.columns:
+        return None, None
+    subjects = df["USUBJID"].astype(str)
+    return subjects.min(), subjects.max()
+
+def _write_flat(df, columns, path, fmt):
+    frame = df[[c for c in columns if c in df.columns]]
+    if fmt == "csv":
+        frame.to_csv(path, index=False)
+    else:
+        frame.to_parquet(path, index=False)
+
+def write_shard(name, safety_df, recon_df, out_dir, fmt="xlsx", prefix="Query_Log"):
+    """
+    Worker: writes one shard. xlsx is a styled two-tab workbook (see
+    generate_excel); csv/parquet write one unstyled file per tab with only
+    the report columns (fast path for downstream systems).
+    Returns: index rows (see INDEX_COLUMNS)
+    """
+    rows = []
+    if fmt == "xlsx":
+        path = os.path.join(out_dir, f"{prefix}_{name}.xlsx")
+        generate_excel(safety_df, recon_df, path)
+    for output, df, columns in (("safety", safety_df, SAFETY_COLUMNS), ("recon", recon_df, RECON_COLUMNS)):
+        if fmt != "xlsx":
+            path = os.path.join(out_dir, f"{prefix}_{name}_{output}.{fmt}")
+            _write_flat(df, columns, path, fmt)
+        first, last = _subject_range(df)
+        rows.append({"shard": name, "output": output, "file": os.path.basename(path),
+                     "rows": len(df), "first_subject": first, "last_subject": last})
+    return rows
+
+def write_report_shards(safety_df, recon_df, out_dir, by=None, fmt="xlsx", workers=2,
+                        subjects_per_shard=10_000, site_column="SITEID", prefix="Query_Log"):
+    """
+    Sharded reporting: splits the queries (see shard_queries) and writes the
+    shards with at most `workers` processes (workers=1 writes in-process).
+    Writes out_dir/report_index.csv listing every shard file.
+    Returns: the index table
+    """
+    if fmt not in REPORT_FORMATS:
+        raise ValueError(f"Unknown report format '{fmt}'; use one of {REPORT_FORMATS}")
+    os.makedirs(out_dir, exist_ok=True)
+    shards = shard_queries(safety_df, recon_df, by, subjects_per_shard, site_column)
+    print(f"[INFO] Writing {len(shards)} {fmt} report shard(s) to {out_dir} with {workers} worker(s)...")
+    
+    start = time.perf_counter()
+    with step("write_shards", rows_in=len(safety_df) + len(recon_df)):
+        if workers <= 1 or len(shards) <= 1:
+            results = [write_shard(*shard, out_dir, fmt, prefix) for shard in shards]
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as pool:
+                futures = [pool.submit(write_shard, *shard, out_dir, fmt, prefix) for shard in shards]
+                results = [future.result() for future in futures]
+    
+    index_df = pd.DataFrame([row for rows in results for row in rows], columns=INDEX_COLUMNS)
+    index_df["rows"] = index_df["rows"].astype("int64")
+    index_path = os.path.join(out_dir, INDEX_FILE)
+    index_df.to_csv(index_path, index=False)
+    print(f"[INFO] {len(shards)} shard(s) written in {time.perf_counter() - start:.2f}s; index: {index_path}")
+    return index_df
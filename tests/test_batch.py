@@ -0,0 +1,86 @@
+import os
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+from src.batch import discover_studies, load_manifest, run_batch
+from src.data_sim import generate_load_data
+import main
+
+def test_batch_runs_each_study_into_its_own_output(tmp_path):
+    """
+    Verifies studies found by glob and by manifest each get a report and a
+    summary row, a broken study fails alone, and results do not depend on the pool size.
+    """
+    for i, fmt in enumerate(["csv", "parquet"]):
+        generate_load_data(300, visits_per_subject=2, seed=i, output_format=fmt, out_dir=tmp_path / "studies" / f"study_{i}")
+    broken = tmp_path / "studies" / "broken"
+    broken.mkdir()
+    (broken / "raw_edc_visits.csv").write_text("a,b\n1,2\n")
+    (broken / "raw_lab_results.csv").write_text("a\n1\n")
+    (tmp_path / "manifest.csv").write_text(
+        "study,edc,lab,region\n"
+        "from_manifest,studies/study_0/raw_edc_visits.csv,studies/study_0/raw_lab_results.csv,Alberta (HIA)\n"
+    )
+    
+    studies = discover_studies([str(tmp_path / "studies" / "*")]) + load_manifest(tmp_path / "manifest.csv")
+    assert [s["study"] for s in studies] == ["broken", "study_0", "study_1", "from_manifest"]
+    
+    serial = run_batch(studies, tmp_path / "serial", jobs=1, region="USA (HIPAA)")
+    pooled = run_batch(studies, tmp_path / "pooled", jobs=2, region="USA (HIPAA)")
+    
+    assert serial["status"].tolist() == ["failed: 'SVSTDTC'", "ok", "ok", "ok"]
+    count_cols = ["study", "edc_rows", "lab_rows", "safety", "recon"]
+    pd.testing.assert_frame_equal(serial[count_cols], pooled[count_cols])
+    assert (serial.loc[1:, "edc_rows"] == 600).all()
+    
+    # Same data, different region: Alberta scrubs initials, HIPAA keeps them
+    hipaa = load_workbook(tmp_path / "serial" / "study_0" / "Query_Log.xlsx")["Safety Queries"]
+    alberta = load_workbook(tmp_path / "serial" / "from_manifest" / "Query_Log.xlsx")["Safety Queries"]
+    assert hipaa["B2"].value != alberta["B2"].value
+    assert (tmp_path / "serial" / "batch_summary.csv").exists()
+
+class _KillWorker:
+    """
+    Unpickling this in a worker process kills the worker outright.
+    """
+    def __reduce__(self):
+        return os._exit, (1,)
+
+def test_batch_survives_a_dead_worker(tmp_path):
+    """
+    Verifies a study that kills its worker process (which breaks the whole
+    pool) fails alone, and the studies in flight with it are re-run.
+    """
+    generate_load_data(50, seed=0, out_dir=tmp_path / "study")
+    study = {"edc": str(tmp_path / "study" / "raw_edc_visits.csv"), "lab": str(tmp_path / "study" / "raw_lab_results.csv")}
+    studies = [dict(study, study="first"), dict(study, study="killer", payload=_KillWorker()),
+               dict(study, study="second"), dict(study, study="third")]
+    summary_df = run_batch(studies, tmp_path / "out", jobs=2)
+    assert summary_df["study"].tolist() == ["first", "killer", "second", "third"]
+    assert summary_df["status"].tolist() == ["ok", "failed: worker process died (BrokenProcessPool)", "ok", "ok"]
+    assert (summary_df.loc[summary_df["status"] == "ok", "edc_rows"] == 50).all()
+
+def test_batch_rejects_unsafe_names_and_survives_worker_errors(tmp_path):
+    """
+    Verifies study names cannot escape the output directory, a study whose
+    worker raises is reported as failed without aborting the others, and
+    single-run options are refused in batch mode.
+    """
+    generate_load_data(50, seed=0, out_dir=tmp_path / "study")
+    study = {"study": "good", "edc": str(tmp_path / "study" / "raw_edc_visits.csv"),
+             "lab": str(tmp_path / "study" / "raw_lab_results.csv")}
+    for name in ("../escape", str(tmp_path / "abs"), ".."):
+        with pytest.raises(ValueError):
+            run_batch([dict(study, study=name)], tmp_path / "out")
+    
+    # A lambda cannot be pickled to the worker, so that study's future raises
+    crashing = dict(study, study="crashing", callback=lambda: None)
+    summary_df = run_batch([crashing, study], tmp_path / "out", jobs=2)
+    assert summary_df["status"].tolist()[1] == "ok"
+    assert summary_df["status"].tolist()[0].startswith("failed:")
+    
+    for flags in (["--fused"], ["--run-log", "log.json"], ["--profile", "run.prof"], ["--generate"],
+                  ["--edc", "edc.csv"], ["--output", "log.xlsx"]):
+        with pytest.raises(SystemExit):
+            main.parse_args(["--studies", "nightly/*"] + flags)
+    assert main.parse_args(["--studies", "nightly/*", "--lab-window", "2"]).lab_window == 2
@@ -0,0 +1,18 @@
+import pytest
+from benchmarks.run_benchmarks import find_regressions
+
+def test_find_regressions_uses_threshold():
+    """
+    Verifies a stage is only reported when it is slower than baseline by more than the threshold.
+    """
+    baseline = {
+        "run_checks@10000": {"stage": "run_checks", "size": 10000, "wall_s": 1.0},
+        "generate_excel@10000": {"stage": "generate_excel", "size": 10000, "wall_s": 2.0},
+    }
+    results = [
+        {"stage": "run_checks", "size": 10000, "wall_s": 1.2},
+        {"stage": "generate_excel", "size": 10000, "wall_s": 3.0},
+        {"stage": "apply_privacy", "size": 10000, "wall_s": 9.0},
+    ]
+    regressions = find_regressions(results, baseline, threshold=0.25)
+    assert [r["stage"] for r, _ in regressions] == ["generate_excel"]
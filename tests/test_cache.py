@@ -0,0 +1,30 @@
+import pandas as pd
+import pytest
+from src.cache import ResultCache, content_key
+
+def test_content_key_depends_on_bytes_and_boundaries():
+    assert content_key(b"abc", b"def") == content_key(b"abc", b"def")
+    assert content_key(b"abc", b"def") != content_key(b"abcd", b"ef")
+    assert content_key(b"abc", ".csv") != content_key(b"abc", ".parquet")
+
+def test_result_cache_lru_and_size_cap():
+    """
+    Verifies least recently used entries are evicted by entry count and by size.
+    """
+    cache = ResultCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1 # "a" now most recent
+    cache.put("c", 3)
+    assert "b" not in cache and "a" in cache and "c" in cache
+    
+    frame = pd.DataFrame({"x": range(1000)})
+    size = int(frame.memory_usage(deep=True).sum())
+    cache = ResultCache(max_entries=10, max_bytes=int(size * 2.5))
+    for key in ["a", "b", "c"]:
+        cache.put(key, (frame,))
+    assert len(cache) == 2 and "a" not in cache
+    assert cache.total_bytes <= cache.max_bytes
+    
+    cache.put("huge", (frame,) * 3)
+    assert "huge" not in cache
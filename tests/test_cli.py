@@ -0,0 +1,25 @@
+import pytest
+import main
+
+@pytest.mark.parametrize("argv, message", [
+    (["--fused", "--lab-window", "2"], "--lab-window cannot be used with --fused"),
+    (["--fused", "--optimize-dtypes"], "--optimize-dtypes cannot be used with --fused"),
+    (["--fused", "--longitudinal"], "--longitudinal cannot be used with --fused"),
+    (["--fused", "--lab-index", "idx"], "--lab-index cannot be used with --fused"),
+    (["--fused", "--workers", "2"], "--workers and --fused cannot be combined"),
+    (["--incremental", "state", "--workers", "2"], "--incremental and --workers cannot be combined"),
+    (["--incremental", "state", "--lab-index", "idx"], "--lab-index cannot be used with --incremental"),
+])
+def test_cli_rejects_options_the_run_mode_ignores(argv, message, capsys):
+    """
+    Verifies options a run mode cannot honour are refused instead of silently dropped.
+    """
+    with pytest.raises(SystemExit):
+        main.parse_args(argv)
+    assert message in capsys.readouterr().err
+
+def test_cli_accepts_lab_window_with_incremental():
+    """
+    Verifies the one single-process option the incremental mode supports is kept.
+    """
+    assert main.parse_args(["--incremental", "state", "--lab-window", "2"]).lab_window == 2
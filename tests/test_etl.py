@@ -0,0 +1,221 @@
+import io
+import os
+import warnings
+import numpy as np
+import pandas as pd
+import pytest
+from src.etl import clean_and_standardize, normalize_temp, normalize_temp_series, stream_standardized
+from src.logic import run_checks
+from src.data_sim import generate_load_data
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_temp_vectorized_parity():
+    """
+    Verifies the vectorized temperature parser matches the scalar normalize_temp
+    on mixed units, unitless values, typos and missing values.
+    """
+    raw_values = [
+        "37.2 C", "99.1 F", "98.6", "36.9", "38.5c", " 101.3 f ", "CF 40",
+        "High", "", "inf", "1_0", "NAN", np.nan, None, 98.0, "37.25 C", "95.09 F",
+    ]
+    rng = np.random.default_rng(7)
+    raw_values += [f"{v:.1f} F" for v in rng.uniform(95, 104, 500)]
+    raw_values += [f"{v:.2f}" for v in rng.uniform(35, 104, 500)]
+    raw = pd.Series(raw_values, dtype=object)
+    
+    expected = raw.apply(normalize_temp)
+    result = normalize_temp_series(raw)
+    
+    pd.testing.assert_series_equal(result, expected, check_names=False)
+
+def test_temp_vectorized_parity_on_random_strings():
+    """
+    Property check: on random strings built from digits, signs, exponents,
+    units, spaces and inf/nan letters, the vectorized parser matches
+    normalize_temp exactly, without floating-point warnings.
+    """
+    rng = np.random.default_rng(11)
+    alphabet = np.array(list("0123456789..eE+-_ CcFfINAinaty"))
+    raw_values = ["".join(rng.choice(alphabet, rng.integers(0, 9))) for _ in range(20000)]
+    raw_values += ["1E 3", "C2e -2", "inf F", "-INFINITY", "1e400", "nan C", "1_0.5 f"]
+    raw = pd.Series(raw_values, dtype=object)
+    
+    expected = raw.apply(normalize_temp)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", RuntimeWarning)
+        result = normalize_temp_series(raw)
+    pd.testing.assert_series_equal(result, expected, check_names=False)
+
+def test_stream_matches_full_etl(tmp_path):
+    """
+    Verifies that streaming ETL in small chunks yields the same rows as the
+    in-memory clean_and_standardize.
+    """
+    edc_path = tmp_path / "edc.csv"
+    lab_path = tmp_path / "lab.csv"
+    pd.DataFrame({
+        "SubjectID": [f"SUBJ-{i:03d}" for i in range(7)],
+        "VisitDate": ["2023-01-0%d" % (i + 1) for i in range(7)],
+        "PatientInitials": ["ABC"] * 7,
+        "DateOfBirth": ["1980-05-12"] * 7,
+        "Raw_Temp": ["37.2 C", "99.1 F", "98.6", "36.9", "High", "38.5 C", "101 F"],
+        "Raw_HR": ["80", "High", "95", "900", "TBD", "70", "101"],
+        "Raw_RR": [12, 22, 18, 25, 14, 16, 21],
+        "Blood_Draw_Performed": ["Yes", "No", "Yes", "Yes", "No", "Yes", "Yes"],
+    }).to_csv(edc_path, index=False)
+    pd.DataFrame({
+        "SubjectID": ["SUBJ-000", "SUBJ-002", "SUBJ-003"],
+        "VisitDate": ["2023-01-01", "2023-01-03", "2023-01-04"],
+        "SampleID": ["SMP-1", "SMP-2", "SMP-3"],
+        "WBC": [5.0, 13.1, 3.2],
+    }).to_csv(lab_path, index=False)
+    
+    edc_df, lab_df = clean_and_standardize(edc_path, lab_path)
+    edc_stream = pd.concat(stream_standardized(edc_path, "edc", chunksize=3), ignore_index=True)
+    lab_stream = pd.concat(stream_standardized(lab_path, "lab", chunksize=2), ignore_index=True)
+    
+    pd.testing.assert_frame_equal(edc_stream, edc_df)
+    pd.testing.assert_frame_equal(lab_stream, lab_df)
+
+def test_stream_parses_dates_like_the_whole_file(tmp_path):
+    """
+    Verifies later chunks whose dates all look month-first keep the day-first
+    format implied by the file's first date, as the full ETL parses them.
+    """
+    edc_path = tmp_path / "edc.csv"
+    pd.DataFrame({
+        "SubjectID": [f"SUBJ-{i:03d}" for i in range(4)],
+        "VisitDate": ["25/12/2022", "01/02/2023", "03/04/2023", "05/06/2023"],
+        "PatientInitials": ["ABC"] * 4,
+        "DateOfBirth": [None, "30/01/1990", "12/05/1980", "02/11/1975"],
+        "Raw_Temp": ["37.2 C"] * 4,
+        "Raw_HR": ["80", "High", "95", "70"],
+        "Raw_RR": [12] * 4,
+        "Blood_Draw_Performed": ["Yes"] * 4,
+    }).to_csv(edc_path, index=False)
+    lab_path = tmp_path / "lab.csv"
+    pd.DataFrame(columns=["SubjectID", "VisitDate", "SampleID", "WBC"]).to_csv(lab_path, index=False)
+    
+    edc_df, _ = clean_and_standardize(edc_path, lab_path)
+    edc_stream = pd.concat(stream_standardized(edc_path, "edc", chunksize=1), ignore_index=True)
+    assert edc_df["SVSTDTC"].tolist()[1] == "2023-02-01"
+    pd.testing.assert_frame_equal(edc_stream, edc_df)
+
+def test_parquet_inputs_and_sdtm_cache(tmp_path, capsys):
+    """
+    Verifies Parquet inputs standardize like CSV, and that persisted SDTM
+    frames are reused on the next run.
+    """
+    edc_csv = tmp_path / "edc.csv"
+    lab_csv = tmp_path / "lab.csv"
+    pd.DataFrame({
+        "SubjectID": ["SUBJ-001", "SUBJ-002"],
+        "VisitDate": ["2023-01-01", "2023-01-02"],
+        "PatientInitials": ["ABC", "DEF"],
+        "DateOfBirth": ["1980-05-12", "1975-11-02"],
+        "Raw_Temp": ["37.2 C", "101 F"],
+        "Raw_HR": ["80", "High"],
+        "Raw_RR": [12, 22],
+        "Blood_Draw_Performed": ["Yes", "No"],
+    }).to_csv(edc_csv, index=False)
+    pd.DataFrame({
+        "SubjectID": ["SUBJ-001"],
+        "VisitDate": ["2023-01-01"],
+        "SampleID": ["SMP-1"],
+        "WBC": [5.0],
+    }).to_csv(lab_csv, index=False)
+    edc_pq = tmp_path / "edc.parquet"
+    lab_pq = tmp_path / "lab.parquet"
+    pd.read_csv(edc_csv).to_parquet(edc_pq)
+    pd.read_csv(lab_csv).to_parquet(lab_pq)
+    
+    edc_df, lab_df = clean_and_standardize(edc_csv, lab_csv)
+    edc_from_pq, lab_from_pq = clean_and_standardize(edc_pq, lab_pq, sdtm_dir=tmp_path / "sdtm")
+    pd.testing.assert_frame_equal(edc_from_pq, edc_df)
+    pd.testing.assert_frame_equal(lab_from_pq, lab_df)
+    
+    capsys.readouterr()
+    edc_cached, lab_cached = clean_and_standardize(edc_pq, lab_pq, sdtm_dir=tmp_path / "sdtm")
+    assert "Reusing standardized frames" in capsys.readouterr().out
+    pd.testing.assert_frame_equal(edc_cached, edc_df)
+    pd.testing.assert_frame_equal(lab_cached, lab_df)
+
+def _write_study(study_dir, subjects):
+    study_dir.mkdir()
+    pd.DataFrame({
+        "SubjectID": subjects,
+        "VisitDate": ["2023-01-01"] * len(subjects),
+        "PatientInitials": ["ABC"] * len(subjects),
+        "DateOfBirth": ["1980-05-12"] * len(subjects),
+        "Raw_Temp": ["37.2 C"] * len(subjects),
+        "Raw_HR": ["80"] * len(subjects),
+        "Raw_RR": [12] * len(subjects),
+        "Blood_Draw_Performed": ["Yes"] * len(subjects),
+    }).to_csv(study_dir / "edc.csv", index=False)
+    pd.DataFrame({"SubjectID": subjects[:1], "VisitDate": ["2023-01-01"], "SampleID": ["SMP-1"], "WBC": [5.0]}).to_csv(
+        study_dir / "lab.csv", index=False)
+    return study_dir / "edc.csv", study_dir / "lab.csv"
+
+def test_sdtm_cache_is_tied_to_its_source_files(tmp_path, capsys):
+    """
+    Verifies a shared SDTM cache built from study A is not reused for study B,
+    even when B's files are older than the cache.
+    """
+    study_b = _write_study(tmp_path / "b", ["B-0", "B-1"])
+    study_a = _write_study(tmp_path / "a", ["A-0", "A-1"])
+    for path in study_b:
+        os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+    sdtm_dir = tmp_path / "sdtm"
+    
+    edc_a, _ = clean_and_standardize(*study_a, sdtm_dir=sdtm_dir)
+    assert edc_a["USUBJID"].tolist() == ["A-0", "A-1"]
+    capsys.readouterr()
+    edc_b, _ = clean_and_standardize(*study_b, sdtm_dir=sdtm_dir)
+    assert "Reusing standardized frames" not in capsys.readouterr().out
+    assert edc_b["USUBJID"].tolist() == ["B-0", "B-1"]
+    
+    # Same files, different dtype mode: not reused either
+    clean_and_standardize(*study_b, sdtm_dir=sdtm_dir, optimize=True)
+    assert "Reusing standardized frames" not in capsys.readouterr().out
+    clean_and_standardize(*study_b, sdtm_dir=sdtm_dir, optimize=True)
+    assert "Reusing standardized frames" in capsys.readouterr().out
+
+def test_clean_and_standardize_from_buffers():
+    """
+    Verifies uploads can be parsed straight from memory: CSV buffers, and
+    Parquet detected by its magic bytes without a file name.
+    """
+    edc_path = os.path.join(ROOT, "raw_edc_visits.csv")
+    lab_path = os.path.join(ROOT, "raw_lab_results.csv")
+    edc_df, lab_df = clean_and_standardize(edc_path, lab_path)
+    
+    with open(edc_path, "rb") as f:
+        edc_bytes = f.read()
+    lab_parquet = io.BytesIO()
+    pd.read_csv(lab_path).to_parquet(lab_parquet)
+    
+    edc_mem, lab_mem = clean_and_standardize(io.BytesIO(edc_bytes), lab_parquet.getvalue())
+    pd.testing.assert_frame_equal(edc_mem, edc_df)
+    pd.testing.assert_frame_equal(lab_mem, lab_df)
+
+def test_optimized_dtypes_preserve_check_results(tmp_path):
+    """
+    Verifies the optimized-dtypes mode (categoricals, datetime64, float32/Int16)
+    uses less memory and flags the same queries as the default string frames.
+    """
+    edc_path, lab_path = generate_load_data(2000, visits_per_subject=4, seed=2, out_dir=tmp_path)
+    edc_df, lab_df = clean_and_standardize(edc_path, lab_path)
+    edc_opt, lab_opt = clean_and_standardize(edc_path, lab_path, optimize=True)
+    
+    assert isinstance(edc_opt["USUBJID"].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_any_dtype(edc_opt["SVSTDTC"])
+    assert edc_opt["VSSTRESN_TEMP"].dtype == np.float32
+    assert str(edc_opt["Raw_RR"].dtype) == "Int16"
+    assert edc_opt.memory_usage(deep=True).sum() < edc_df.memory_usage(deep=True).sum()
+    
+    safety_df, recon_df = run_checks(edc_df, lab_df)
+    safety_opt, recon_opt = run_checks(edc_opt, lab_opt)
+    assert safety_opt.index.tolist() == safety_df.index.tolist()
+    assert recon_opt.index.tolist() == recon_df.index.tolist()
+    assert safety_opt["SVSTDTC"].dt.strftime("%Y-%m-%d").tolist() == safety_df["SVSTDTC"].tolist()
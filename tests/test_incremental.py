@@ -0,0 +1,84 @@
+import os
+import pandas as pd
+import pytest
+from src.etl import clean_and_standardize
+from src.logic import run_checks
+from src.incremental import run_checks_incremental
+from src.rules import compile_rules, load_rules
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _full_run(edc_path, lab_path, tolerance_days=None):
+    edc_df, lab_df = clean_and_standardize(edc_path, lab_path)
+    safety_df, recon_df = run_checks(edc_df, lab_df, tolerance_days=tolerance_days)
+    return safety_df.reset_index(drop=True), recon_df.reset_index(drop=True)
+
+@pytest.mark.parametrize("tolerance_days", [None, 2])
+def test_incremental_matches_full_run(tmp_path, capsys, tolerance_days):
+    """
+    Verifies that an incremental re-run over a modified export (edited vitals,
+    a removed lab sample, a dropped subject, a new subject and a subject only
+    in the Lab export) returns the same queries as a full run, with exact or
+    date-window reconciliation, while only re-processing the changed subjects.
+    """
+    edc_raw = pd.read_csv(os.path.join(ROOT, "raw_edc_visits.csv"))
+    lab_raw = pd.read_csv(os.path.join(ROOT, "raw_lab_results.csv"))
+    # An orphan sample (window mode) at the end of the file, for a subject that never changes
+    orphan = lab_raw.iloc[[40]].assign(VisitDate="2030-01-01", SampleID="SMP-ORPHAN")
+    lab_raw = pd.concat([lab_raw, orphan], ignore_index=True)
+    edc_path = tmp_path / "edc.csv"
+    lab_path = tmp_path / "lab.csv"
+    state_dir = tmp_path / "state"
+    edc_raw.to_csv(edc_path, index=False)
+    lab_raw.to_csv(lab_path, index=False)
+    
+    first = run_checks_incremental(edc_path, lab_path, state_dir, tolerance_days=tolerance_days)
+    expected = _full_run(edc_path, lab_path, tolerance_days)
+    pd.testing.assert_frame_equal(first[0], expected[0])
+    pd.testing.assert_frame_equal(first[1], expected[1])
+    
+    # Next export: a few subjects change
+    edc_raw.loc[3, "Raw_Temp"] = "39.5 C"
+    edc_raw.loc[3, "Raw_HR"] = "120"
+    edc_raw = edc_raw.drop(index=10)
+    new_visit = edc_raw.iloc[[0]].assign(SubjectID="SUBJ-999", Raw_RR=24, Raw_HR="110")
+    edc_raw = pd.concat([edc_raw.iloc[:20], new_visit, edc_raw.iloc[20:]], ignore_index=True)
+    lab_raw = lab_raw.drop(index=0)
+    # Late samples (orphans in window mode) for a subject missing from the EDC export
+    lab_only = lab_raw.iloc[[5, 6]].assign(SubjectID="SUBJ-888", SampleID=["SMP-888A", "SMP-888B"])
+    lab_raw = pd.concat([lab_raw.iloc[:30], lab_only, lab_raw.iloc[30:]], ignore_index=True)
+    edc_raw.to_csv(edc_path, index=False)
+    lab_raw.to_csv(lab_path, index=False)
+    
+    capsys.readouterr()
+    second = run_checks_incremental(edc_path, lab_path, state_dir, tolerance_days=tolerance_days)
+    assert "5 of 102 subjects changed" in capsys.readouterr().out
+    expected = _full_run(edc_path, lab_path, tolerance_days)
+    if tolerance_days:
+        # The new lab-only subject's samples come before the carried-forward orphan, as in the file
+        assert expected[1]["SampleID"].tolist()[-3:] == ["SMP-888A", "SMP-888B", "SMP-ORPHAN"]
+    pd.testing.assert_frame_equal(second[0], expected[0])
+    pd.testing.assert_frame_equal(second[1], expected[1])
+
+def test_rule_change_rechecks_unchanged_subjects(tmp_path, capsys):
+    """
+    Verifies a changed threshold re-flags subjects whose rows did not change,
+    instead of carrying forward results computed under the old rules.
+    """
+    edc_path = os.path.join(ROOT, "raw_edc_visits.csv")
+    lab_path = os.path.join(ROOT, "raw_lab_results.csv")
+    state_dir = tmp_path / "state"
+    run_checks_incremental(edc_path, lab_path, state_dir)
+    
+    spec = load_rules()
+    sirs = next(check for check in spec["checks"] if check["name"] == "SIRS")
+    sirs["min_criteria"] = 1
+    rules = compile_rules(spec)
+    capsys.readouterr()
+    safety_df, recon_df = run_checks_incremental(edc_path, lab_path, state_dir, rules=rules)
+    assert "re-checking all subjects" in capsys.readouterr().out
+    
+    expected_safety, expected_recon = run_checks(*clean_and_standardize(edc_path, lab_path), rules=rules)
+    assert len(expected_safety) > len(run_checks(*clean_and_standardize(edc_path, lab_path))[0])
+    pd.testing.assert_frame_equal(safety_df, expected_safety.reset_index(drop=True))
+    pd.testing.assert_frame_equal(recon_df, expected_recon.reset_index(drop=True))
@@ -0,0 +1,66 @@
+import json
+import threading
+import tracemalloc
+import pytest
+from src.instrument import RunLog, step
+
+def test_run_log_records_nested_steps(tmp_path):
+    """
+    Verifies nested steps are recorded with their path, timings and row counts,
+    and that step() is a no-op outside an active RunLog.
+    """
+    with step("outside") as rec:
+        rec["rows_out"] = 1
+        
+    with RunLog() as log:
+        with step("etl", rows_in=10) as outer:
+            with step("read"):
+                pass
+            outer["rows_out"] = 8
+            
+    assert [r["stage"] for r in log.records] == ["etl/read", "etl"]
+    assert log.records[1]["rows_in"] == 10 and log.records[1]["rows_out"] == 8
+    assert all(r["wall_s"] >= 0 and r["cpu_s"] >= 0 for r in log.records)
+    
+    log.write_json(tmp_path / "run.json")
+    assert len(json.loads((tmp_path / "run.json").read_text())["stages"]) == 2
+
+def test_nested_step_keeps_parent_peak():
+    """
+    Verifies a parent step's traced peak covers allocations made before a
+    nested step started, not only the part after it.
+    """
+    with RunLog(trace_memory=True) as log:
+        with step("outer"):
+            block = bytearray(20 * 1024 * 1024)
+            del block
+            with step("inner"):
+                pass
+                
+    peaks = {r["stage"]: r["peak_alloc_mb"] for r in log.records}
+    assert peaks["outer/inner"] < 1
+    assert peaks["outer"] >= 20
+
+def test_only_one_run_log_traces_memory():
+    """
+    Verifies a second memory-tracing RunLog (here in another thread) is refused
+    instead of sharing, and later stopping, the process-wide tracemalloc.
+    """
+    errors = []
+    def second_run():
+        try:
+            with RunLog(trace_memory=True):
+                pass
+        except RuntimeError as e:
+            errors.append(e)
+            
+    with RunLog(trace_memory=True):
+        thread = threading.Thread(target=second_run)
+        thread.start()
+        thread.join()
+        assert tracemalloc.is_tracing()
+    assert len(errors) == 1
+    assert not tracemalloc.is_tracing()
+    
+    with RunLog(trace_memory=True):
+        pass
@@ -0,0 +1,54 @@
+import threading
+from src.instrument import RunLog, step
+from src.jobs import JobRunner, DONE, FAILED, CANCELLED, QUEUED
+
+def _staged_job(job, gate, stages):
+    run_log = RunLog()
+    with run_log:
+        for name in stages:
+            job.stage(name)
+            with step(name):
+                gate.wait(timeout=5)
+    return [r["stage"] for r in run_log.records]
+
+def test_jobs_report_progress_cancel_and_fail():
+    """
+    Verifies stage progress and per-job run logs, cooperative cancellation of a
+    running job, cancellation of a queued job, and error capture.
+    """
+    runner = JobRunner(max_workers=1)
+    stages = ["etl", "checks", "report"]
+    gate = threading.Event()
+    
+    running_id = runner.submit(_staged_job, gate, stages, stages=stages)
+    queued_id = runner.submit(_staged_job, gate, stages, stages=stages)
+    while runner.get(running_id).current_stage != "etl":
+        pass
+    assert runner.get(running_id).progress == 0.0 and runner.get(queued_id).status == QUEUED
+    
+    assert runner.cancel(queued_id)
+    assert runner.cancel(running_id)
+    gate.set()
+    assert runner.wait(running_id, timeout=5).status == CANCELLED
+    assert runner.wait(queued_id, timeout=5).status == CANCELLED
+    assert runner.get(running_id).current_stage == "etl"  # stopped at the next stage boundary
+    
+    done_id = runner.submit(_staged_job, gate, stages, stages=stages)
+    failed_id = runner.submit(lambda job: 1 / 0, stages=stages)
+    done = runner.wait(done_id, timeout=5)
+    assert (done.status, done.progress, done.result) == (DONE, 1.0, stages)
+    failed = runner.wait(failed_id, timeout=5)
+    assert failed.status == FAILED and "ZeroDivisionError" in failed.error
+    assert runner.active() == []
+
+def test_concurrent_jobs_keep_separate_run_logs():
+    """
+    Verifies step() records into the RunLog of its own thread only.
+    """
+    runner = JobRunner(max_workers=2)
+    gate = threading.Event()
+    first = runner.submit(_staged_job, gate, ["a1", "a2"], stages=["a1", "a2"])
+    second = runner.submit(_staged_job, gate, ["b1", "b2"], stages=["b1", "b2"])
+    gate.set()
+    assert runner.wait(first, timeout=5).result == ["a1", "a2"]
+    assert runner.wait(second, timeout=5).result == ["b1", "b2"]
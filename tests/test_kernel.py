@@ -0,0 +1,44 @@
+import os
+import pandas as pd
+import pytest
+from src.data_sim import generate_load_data
+from src.etl import clean_and_standardize
+from src.kernel import run_checks_fused
+from src.logic import run_checks
+from src.reporter import RECON_COLUMNS, SAFETY_COLUMNS
+from src.rules import compile_rules
+
+def _study(tmp_path):
+    generate_load_data(400, visits_per_subject=3, seed=7, out_dir=str(tmp_path))
+    edc_path = os.path.join(tmp_path, "raw_edc_visits.csv")
+    lab_path = os.path.join(tmp_path, "raw_lab_results.csv")
+    # Re-sent lab rows: some visits join to two lab records
+    lab_raw = pd.read_csv(lab_path)
+    pd.concat([lab_raw, lab_raw.iloc[::25]]).to_csv(lab_path, index=False)
+    return edc_path, lab_path
+
+def test_fused_kernel_matches_multi_pass(tmp_path):
+    """
+    Verifies the fused kernel flags the same rows, in the same order, with the
+    same report columns as clean_and_standardize + run_checks, across batches.
+    """
+    edc_path, lab_path = _study(tmp_path)
+    safety_df, recon_df = run_checks(*clean_and_standardize(edc_path, lab_path))
+    fused_safety, fused_recon = run_checks_fused(edc_path, lab_path, batch_size=250)
+    
+    assert len(safety_df) and len(recon_df)
+    for expected, actual, columns in ((safety_df, fused_safety, SAFETY_COLUMNS), (recon_df, fused_recon, RECON_COLUMNS)):
+        assert list(actual.columns) == list(expected.columns)
+        assert list(actual.index) == list(expected.index)
+        pd.testing.assert_frame_equal(actual[columns].reset_index(drop=True),
+                                      expected[columns].reset_index(drop=True), check_dtype=False)
+
+def test_fused_kernel_rejects_unknown_fields(tmp_path):
+    """
+    Verifies rules on fields the kernel cannot build fail loudly instead of scoring NaN.
+    """
+    edc_path, lab_path = _study(tmp_path)
+    rules = compile_rules({"checks": [{"name": "AGE", "output": "safety", "query_text": "Age", "min_criteria": 1,
+                                       "criteria": [{"field": "AGE", "comparator": ">", "thresholds": [90]}]}]})
+    with pytest.raises(ValueError):
+        run_checks_fused(edc_path, lab_path, rules=rules)
@@ -0,0 +1,72 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from src.data_sim import generate_load_data
+from src.etl import clean_and_standardize
+from src.lab_index import LabKeyIndex, open_lab_index
+from src.logic import run_checks, run_recon_checks
+from src.reporter import RECON_COLUMNS
+
+def _study(tmp_path):
+    generate_load_data(300, visits_per_subject=3, seed=3, out_dir=str(tmp_path))
+    return os.path.join(tmp_path, "raw_edc_visits.csv"), os.path.join(tmp_path, "raw_lab_results.csv")
+
+def test_index_recon_matches_merge(tmp_path):
+    """
+    Verifies recon from the key index flags the same visits as the merge-based run_checks.
+    """
+    edc_df, lab_df = clean_and_standardize(*_study(tmp_path))
+    _, recon_df = run_checks(edc_df, lab_df)
+    indexed = run_recon_checks(edc_df, LabKeyIndex.from_frame(lab_df)).gather("recon", RECON_COLUMNS)
+    
+    assert len(recon_df)
+    pd.testing.assert_frame_equal(indexed.reset_index(drop=True), recon_df[RECON_COLUMNS].reset_index(drop=True),
+                                  check_dtype=False, check_categorical=False)
+
+def test_index_is_updated_incrementally(tmp_path):
+    """
+    Verifies lab deliveries added one at a time (and reloaded from disk) give the
+    same keys as indexing everything at once, and unchanged files are not re-read.
+    """
+    edc_path, lab_path = _study(tmp_path)
+    lab_raw = pd.read_csv(lab_path)
+    deliveries = [os.path.join(tmp_path, f"labs_{i}.csv") for i in range(2)]
+    lab_raw.iloc[::2].to_csv(deliveries[0], index=False)
+    lab_raw.iloc[1::2].to_csv(deliveries[1], index=False)
+    index_dir = os.path.join(tmp_path, "lab_index")
+    
+    first = open_lab_index(index_dir, deliveries[:1], study="S1")
+    assert 0 < len(first) < len(LabKeyIndex.from_frame(clean_and_standardize(edc_path, lab_path)[1]))
+    index = open_lab_index(index_dir, deliveries, study="S1")
+    assert index.update_from_files(deliveries) == 0
+    
+    edc_df, lab_df = clean_and_standardize(edc_path, lab_path)
+    full = LabKeyIndex.from_frame(lab_df)
+    assert len(index) == len(full)
+    np.testing.assert_array_equal(index.contains(edc_df["USUBJID"], edc_df["SVSTDTC"]),
+                                  full.contains(edc_df["USUBJID"], edc_df["SVSTDTC"]))
+
+def test_redelivery_replaces_keys_and_study_is_enforced(tmp_path):
+    """
+    Verifies a corrected re-delivery withdraws the samples it no longer has
+    (so the missing-lab query comes back), and another study cannot reuse the index.
+    """
+    edc_path, lab_path = _study(tmp_path)
+    edc_df, lab_df = clean_and_standardize(edc_path, lab_path)
+    index_dir = os.path.join(tmp_path, "lab_index")
+    before = run_recon_checks(edc_df, open_lab_index(index_dir, [lab_path], study="S1")).count("recon")
+    
+    lab_raw = pd.read_csv(lab_path)
+    lab_raw.iloc[5:].to_csv(lab_path, index=False)
+    stat = os.stat(lab_path)
+    os.utime(lab_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    index = open_lab_index(index_dir, [lab_path], study="S1")
+    
+    edc_df, lab_df = clean_and_standardize(edc_path, lab_path)
+    _, recon_df = run_checks(edc_df, lab_df)
+    assert len(index) == len(LabKeyIndex.from_frame(lab_df))
+    assert run_recon_checks(edc_df, index).count("recon") == len(recon_df) > before
+    
+    with pytest.raises(ValueError):
+        open_lab_index(index_dir, [lab_path], study="S2")
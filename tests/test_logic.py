@@ -1,6 +1,7 @@
+import numpy as np
 import pandas as pd
 import pytest
-from src.logic import run_checks
+from src.logic import run_checks, run_checks_partitioned, run_query_checks
 
 def test_sepsis_logic():
     """
@@ -54,3 +55,71 @@ def test_sepsis_logic():
     assert "SEPSIS-001" in safety_df["USUBJID"].values, "Sepsis patient should be flagged"
     assert "HEALTHY-001" not in safety_df["USUBJID"].values, "Healthy patient should NOT be flagged"
     assert len(safety_df) == 1
+
+def _random_study(num_visits, seed=0):
+    rng = np.random.default_rng(seed)
+    subjects = [f"SUBJ-{i:04d}" for i in rng.integers(0, num_visits // 2, num_visits)]
+    edc_df = pd.DataFrame({
+        "USUBJID": subjects,
+        "SVSTDTC": [f"2023-01-{d:02d}" for d in rng.integers(1, 4, num_visits)],
+        "VSSTRESN_TEMP": rng.uniform(35, 40, num_visits).round(1),
+        "VSSTRESN_HR": rng.integers(60, 120, num_visits).astype(float),
+        "Raw_RR": rng.integers(12, 25, num_visits),
+        "Blood_Draw_Performed": rng.choice(["Yes", "No"], num_visits),
+    })
+    lab_df = edc_df.loc[rng.random(num_visits) < 0.7, ["USUBJID", "SVSTDTC"]].reset_index(drop=True)
+    lab_df["SampleID"] = [f"SMP-{i}" for i in range(len(lab_df))]
+    lab_df["WBC"] = rng.uniform(3, 15, len(lab_df)).round(1)
+    return edc_df, lab_df
+
+def test_partitioned_checks_match_run_checks(tmp_path):
+    """
+    Verifies the partition-and-join engine flags the same rows, in the same
+    order, as the single merge in run_checks, in memory and spilled to a
+    temporary or given directory, which is left empty.
+    """
+    edc_df, lab_df = _random_study(500)
+    safety_df, recon_df = run_checks(edc_df, lab_df)
+    
+    edc_chunks = [edc_df.iloc[i:i + 120] for i in range(0, len(edc_df), 120)]
+    spill_dir = tmp_path / "spill"
+    for options in [{"spill": False}, {}, {"spill_dir": str(spill_dir)}]:
+        safety_part, recon_part = run_checks_partitioned(edc_chunks, lab_df, num_partitions=7, **options)
+        pd.testing.assert_frame_equal(safety_part, safety_df.reset_index(drop=True))
+        pd.testing.assert_frame_equal(recon_part, recon_df.reset_index(drop=True))
+    assert list(spill_dir.iterdir()) == []
+
+def test_partitioned_checks_without_lab_chunks_and_on_failure(tmp_path):
+    """
+    Verifies an empty lab iterable flags every blood draw as a missing lab
+    (like run_checks with an empty lab frame), and spill files are removed
+    when a partition fails.
+    """
+    edc_df, lab_df = _random_study(200, seed=3)
+    _, recon_df = run_checks(edc_df, lab_df.iloc[0:0])
+    _, recon_part = run_checks_partitioned([edc_df], [], num_partitions=3)
+    assert recon_part["USUBJID"].tolist() == recon_df["USUBJID"].tolist()
+    
+    spill_dir = tmp_path / "spill"
+    with pytest.raises(ValueError):
+        run_checks_partitioned([edc_df], lab_df.drop(columns="WBC"), num_partitions=3, spill_dir=str(spill_dir))
+    assert list(spill_dir.iterdir()) == []
+
+def test_query_results_gather_matches_run_checks():
+    """
+    Verifies the compact query store (row positions + check codes) gathers
+    the same rows as run_checks, and can gather just the report columns.
+    """
+    edc_df, lab_df = _random_study(400, seed=5)
+    safety_df, recon_df = run_checks(edc_df, lab_df)
+    results = run_query_checks(edc_df, lab_df)
+    
+    assert len(results) == len(safety_df) + len(recon_df)
+    assert results.counts().to_dict() == {"MISSING_LAB": len(recon_df), "SIRS": len(safety_df)}
+    assert results.rows.dtype == np.int64
+    pd.testing.assert_frame_equal(results.gather("safety"), safety_df)
+    pd.testing.assert_frame_equal(results.gather("recon"), recon_df)
+    
+    slim = results.gather("safety", ["USUBJID", "WBC", "NOT_A_COLUMN"])
+    assert slim.columns.tolist() == ["USUBJID", "WBC", "Query_Text"]
+    assert slim["USUBJID"].tolist() == safety_df["USUBJID"].tolist()
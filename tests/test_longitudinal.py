@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.data_sim import generate_load_data
+from src.etl import clean_and_standardize
+from src.longitudinal import build_visit_index, run_longitudinal_checks, wbc_rising
+import main
+
+def _visits():
+    edc_df = pd.DataFrame({
+        # Out of order on purpose: the index sorts by subject and date
+        "USUBJID": ["A", "B", "A", "A", "B", "B", "A"],
+        "SVSTDTC": ["2023-01-03", "2023-01-01", "2023-01-01", "2023-01-02", "2023-01-02", "2023-01-03", "2023-01-04"],
+        "VSSTRESN_HR": [75, 70, 70, np.nan, 72, 110, 80],
+        "Blood_Draw_Performed": "Yes",
+    })
+    lab_df = pd.DataFrame({
+        "USUBJID": ["A", "A", "A", "A", "B", "B"],
+        "SVSTDTC": ["2023-01-01", "2023-01-02", "2023-01-03", "2023-01-04", "2023-01-01", "2023-01-02"],
+        "SampleID": ["S1", "S2", "S3", "S4", "S5", "S6"],
+        "WBC": [5.0, 6.0, 7.5, 7.0, 9.0, 10.0],
+    })
+    return edc_df, lab_df
+
+def test_visit_index_is_sorted_per_subject():
+    visits = build_visit_index(*_visits())
+    assert visits["USUBJID"].tolist() == ["A"] * 4 + ["B"] * 3
+    assert visits["VISITNUM"].tolist() == [1, 2, 3, 4, 1, 2, 3]
+    assert visits.groupby("USUBJID")["SVSTDTC"].apply(lambda s: s.is_monotonic_increasing).all()
+
+def test_longitudinal_checks_flag_trends():
+    """
+    Subject A: WBC 5 -> 6 -> 7.5 rises over two steps (flag at visit 3), then falls.
+    Subject B: HR 110 vs prior mean 71 is > 30 bpm above baseline (flag at visit 3);
+    B's WBC only has two visits, so no trend flag.
+    """
+    trend_df = run_longitudinal_checks(*_visits(), wbc_consecutive=2, hr_delta=30)
+    flagged = list(zip(trend_df["USUBJID"], trend_df["SVSTDTC"], trend_df["Query_Text"].str.split().str[0]))
+    assert flagged == [("A", "2023-01-03", "WBC"), ("B", "2023-01-03", "HR")]
+
+@pytest.mark.parametrize("consecutive", [0, -1])
+def test_wbc_consecutive_must_be_positive(consecutive):
+    """
+    Verifies a WBC window below one visit step is rejected instead of
+    crashing (0) or returning meaningless flags (negative).
+    """
+    visits = build_visit_index(*_visits())
+    with pytest.raises(ValueError, match="consecutive"):
+        wbc_rising(visits, consecutive)
+    with pytest.raises(ValueError, match="wbc_consecutive"):
+        run_longitudinal_checks(*_visits(), wbc_consecutive=consecutive)
+    assert wbc_rising(visits, 1).any()
+
+def test_same_day_duplicate_visits_are_kept():
+    """
+    Verifies a re-entered visit on the same date is kept as its own visit,
+    so its high HR is still checked against the subject's baseline.
+    """
+    edc_df, lab_df = _visits()
+    edc_df = pd.concat([edc_df, pd.DataFrame({"USUBJID": ["A"], "SVSTDTC": ["2023-01-04"], "VSSTRESN_HR": [140],
+                                              "Blood_Draw_Performed": ["Yes"]})], ignore_index=True)
+    visits = build_visit_index(edc_df, lab_df)
+    assert visits["VISITNUM"].tolist() == [1, 2, 3, 4, 5, 1, 2, 3]
+    assert visits["VSSTRESN_HR"].tolist()[3:5] == [80, 140]
+    
+    trend_df = run_longitudinal_checks(edc_df, lab_df)
+    assert ("A", "2023-01-04", 140) in list(zip(trend_df["USUBJID"], trend_df["SVSTDTC"], trend_df["VSSTRESN_HR"]))
+
+def test_trend_rows_keep_extra_report_columns(tmp_path):
+    """
+    Verifies trend queries added to the safety tab carry the same extra
+    columns (SITEID for site shards) as the rule-based queries.
+    """
+    edc_path = tmp_path / "edc.csv"
+    lab_path = tmp_path / "lab.csv"
+    pd.DataFrame({
+        "SubjectID": ["SUBJ-001"] * 3,
+        "SITEID": ["101"] * 3,
+        "VisitDate": ["2023-01-01", "2023-01-02", "2023-01-03"],
+        "PatientInitials": ["ABC"] * 3,
+        "DateOfBirth": ["1980-05-12"] * 3,
+        "Raw_Temp": ["37.0 C"] * 3,
+        "Raw_HR": ["70", "72", "140"],
+        "Raw_RR": [12] * 3,
+        "Blood_Draw_Performed": ["No"] * 3,
+    }).to_csv(edc_path, index=False)
+    pd.DataFrame(columns=["SubjectID", "VisitDate", "SampleID", "WBC"]).to_csv(lab_path, index=False)
+    
+    safety_df, _ = main.run_single_process(str(edc_path), str(lab_path), longitudinal=True, extra_columns=["SITEID"])
+    assert "SITEID" in safety_df.columns
+    trend_rows = safety_df[safety_df["Query_Text"].str.startswith("HR exceeds")]
+    assert trend_rows["SITEID"].astype(str).tolist() == ["101"]
+
+def test_longitudinal_checks_match_per_subject_loop(tmp_path):
+    """
+    Verifies the vectorized windows against a plain per-subject loop on generated multi-visit data.
+    """
+    edc_df, lab_df = clean_and_standardize(*generate_load_data(300, visits_per_subject=5, seed=5, out_dir=tmp_path))
+    visits = build_visit_index(edc_df, lab_df)
+    
+    expected = []
+    for _, subject in visits.groupby("USUBJID", sort=False):
+        wbc = pd.to_numeric(subject["WBC"], errors="coerce").tolist()
+        hr = pd.to_numeric(subject["VSSTRESN_HR"], errors="coerce").tolist()
+        for i, row_id in enumerate(subject.index):
+            if i >= 2 and wbc[i] > wbc[i - 1] > wbc[i - 2]:
+                expected.append((row_id, "WBC"))
+            prior = [v for v in hr[:i] if not np.isnan(v)]
+            if prior and not np.isnan(hr[i]) and hr[i] - np.mean(prior) > 30:
+                expected.append((row_id, "HR"))
+    
+    trend_df = run_longitudinal_checks(edc_df, lab_df)
+    assert len(expected) > 0
+    assert sorted(zip(trend_df.index, trend_df["Query_Text"].str.split().str[0])) == sorted(expected)
@@ -0,0 +1,49 @@
+import os
+import pandas as pd
+import pytest
+from src.etl import clean_and_standardize
+from src.logic import run_checks
+from src.privacy import apply_privacy
+from src.pipeline import run_pipeline_parallel
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EDC_PATH = os.path.join(ROOT, "raw_edc_visits.csv")
+LAB_PATH = os.path.join(ROOT, "raw_lab_results.csv")
+
+def test_parallel_pipeline_matches_single_process():
+    """
+    Verifies that sharding subjects across worker processes produces the same
+    safety and recon queries, in the same order, as a single-process run.
+    """
+    region = "Alberta (HIA)"
+    edc_df, lab_df = clean_and_standardize(EDC_PATH, LAB_PATH)
+    safety_df, recon_df = run_checks(edc_df, lab_df)
+    safety_df = apply_privacy(safety_df, region).reset_index(drop=True)
+    recon_df = apply_privacy(recon_df, region).reset_index(drop=True)
+    
+    safety_par, recon_par = run_pipeline_parallel(EDC_PATH, LAB_PATH, workers=3, region=region)
+    
+    pd.testing.assert_frame_equal(safety_par, safety_df)
+    pd.testing.assert_frame_equal(recon_par, recon_df)
+
+def test_parallel_pipeline_parses_dates_like_the_whole_file(tmp_path):
+    """
+    Verifies shards whose own dates all look month-first (day <= 12) still
+    parse them day-first, as the whole file's first date ("25/12/2022") implies.
+    """
+    edc_raw = pd.read_csv(EDC_PATH)
+    lab_raw = pd.read_csv(LAB_PATH)
+    visit_dates = [f"{i % 12 + 1:02d}/{(i + 5) % 12 + 1:02d}/2023" for i in range(len(edc_raw))]
+    visit_dates[0] = "25/12/2022"
+    edc_raw["VisitDate"] = visit_dates
+    lab_raw["VisitDate"] = lab_raw["SubjectID"].map(edc_raw.set_index("SubjectID")["VisitDate"])
+    edc_path, lab_path = tmp_path / "edc.csv", tmp_path / "lab.csv"
+    edc_raw.to_csv(edc_path, index=False)
+    lab_raw.to_csv(lab_path, index=False)
+    
+    edc_df, lab_df = clean_and_standardize(edc_path, lab_path)
+    assert edc_df["SVSTDTC"].tolist()[:2] == ["2022-12-25", "2023-07-02"]
+    safety_df, recon_df = run_checks(edc_df, lab_df)
+    safety_par, recon_par = run_pipeline_parallel(edc_path, lab_path, workers=3)
+    pd.testing.assert_frame_equal(safety_par, safety_df.reset_index(drop=True))
+    pd.testing.assert_frame_equal(recon_par, recon_df.reset_index(drop=True))
@@ -0,0 +1,29 @@
+import pandas as pd
+from src.preview import criterion_options, filter_queries, page_of
+
+def _safety_queries():
+    return pd.DataFrame({
+        "USUBJID": [f"SUBJ-{i:03d}" for i in range(120)],
+        "VSSTRESN_TEMP": [39.0 if i % 2 else 37.0 for i in range(120)],
+        "VSSTRESN_HR": [100.0 if i % 3 == 0 else 80.0 for i in range(120)],
+        "Query_Text": ["Potential Sepsis" if i % 4 else "WBC trend" for i in range(120)],
+    })
+
+def test_filter_and_page_queries():
+    """
+    Verifies subject / query-type / criterion filters and clamped 1-based paging.
+    """
+    df = _safety_queries()
+    options = criterion_options("safety")
+    assert list(options) == ["VSSTRESN_TEMP outside [36, 38]", "VSSTRESN_HR > 90", "Raw_RR > 20", "WBC outside [4, 12]"]
+    assert list(criterion_options("recon")) == ["Blood_Draw_Performed == Yes", "SampleID isnull"]
+    
+    assert filter_queries(df, subject="subj-01")["USUBJID"].tolist() == [f"SUBJ-01{i}" for i in range(10)]
+    assert len(filter_queries(df, query_texts=["WBC trend"])) == 30
+    fever_tachy = filter_queries(df, criterion=options["VSSTRESN_HR > 90"], query_texts=["Potential Sepsis"])
+    assert len(fever_tachy) == 30 and (fever_tachy["VSSTRESN_HR"] > 90).all()
+    
+    page_df, page_no, num_pages = page_of(df, 3, 50)
+    assert (page_no, num_pages, len(page_df)) == (3, 3, 20)
+    assert page_df["USUBJID"].iloc[0] == "SUBJ-100"
+    assert page_of(df, 99, 50)[1] == 3 and page_of(df.iloc[0:0], 1, 50)[2] == 1
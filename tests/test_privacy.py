@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.privacy import PRIVACY_CONFIG, apply_privacy, apply_privacy_many, mask_date
+
+def _reference_privacy(df, region):
+    """
+    Row-by-row masking as done before the vectorized engine.
+    """
+    config = PRIVACY_CONFIG[region]
+    expected = df.copy()
+    if config["scrub_initials"]:
+        expected["INITIALS"] = "[REDACTED]"
+    expected["BRTHDTC"] = expected["BRTHDTC"].apply(mask_date, mask_type=config["mask_dob"])
+    return expected
+
+@pytest.mark.parametrize("region", list(PRIVACY_CONFIG))
+def test_vectorized_privacy_parity(region):
+    """
+    Verifies the compiled region policies mask exactly like the per-row mask_date,
+    and leave the input frame untouched.
+    """
+    df = pd.DataFrame({
+        "USUBJID": ["SUBJ-001", "SUBJ-002", "SUBJ-003", "SUBJ-004", "SUBJ-005"],
+        "INITIALS": ["ABC", "DEF", "GHI", None, "JKL"],
+        "BRTHDTC": ["1990-05-12", "1985-11-23", np.nan, "1970", "1970-01-02-03"],
+    })
+    original = df.copy()
+    
+    result = apply_privacy(df, region)
+    expected = _reference_privacy(df, region)
+    
+    assert result["BRTHDTC"].tolist() == expected["BRTHDTC"].tolist()
+    assert result["INITIALS"].tolist() == expected["INITIALS"].tolist()
+    pd.testing.assert_frame_equal(df, original)
+    
+@pytest.mark.parametrize("region", list(PRIVACY_CONFIG))
+def test_apply_privacy_many(region):
+    """
+    Verifies masking several frames in one pass gives the same frames as
+    apply_privacy on each: different lengths and indexes, a frame without
+    INITIALS, an empty frame and datetime64 birth dates.
+    """
+    frames = [
+        pd.DataFrame({"INITIALS": ["ABC", None], "BRTHDTC": ["1990-05-12", np.nan]}, index=[7, 3]),
+        pd.DataFrame({"USUBJID": ["SUBJ-001"], "BRTHDTC": ["1970"]}),
+        pd.DataFrame({"INITIALS": [], "BRTHDTC": []}),
+        pd.DataFrame({"INITIALS": ["XYZ"], "BRTHDTC": pd.to_datetime(["1985-11-23"])}),
+        pd.DataFrame({"INITIALS": ["DEF"], "BRTHDTC": ["1985-11-23"]}),
+    ]
+    masked = apply_privacy_many(frames, region)
+    assert len(masked) == len(frames)
+    for result, df in zip(masked, frames):
+        pd.testing.assert_frame_equal(result, apply_privacy(df, region))
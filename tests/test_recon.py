@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+from src.logic import run_checks
+from src.recon import match_labs, DUPLICATE_LAB_TEXT
+
+def _study():
+    edc_df = pd.DataFrame({
+        "USUBJID": ["A", "A", "B", "C"],
+        "SVSTDTC": ["2023-01-01", "2023-01-10", "2023-01-05", "2023-01-07"],
+        "Blood_Draw_Performed": ["Yes", "Yes", "Yes", "Yes"],
+        "VSSTRESN_TEMP": [37.0, 37.0, 37.0, 37.0],
+        "VSSTRESN_HR": [70, 70, 70, 70],
+        "Raw_RR": [16, 16, 16, 16],
+    })
+    lab_df = pd.DataFrame({
+        "USUBJID": ["A", "A", "B", "B", "C", "D", "A"],
+        "SVSTDTC": ["2023-01-02", "2023-01-20", "2023-01-05", "2023-01-06", "2023-01-07", "2023-01-07", "2023-01-01"],
+        "SampleID": ["S1", "S2", "S3", "S4", "S3", "S5", "S1"],
+        "WBC": [5.0, 5.0, 5.0, 5.0, 5.0, 5.0, 5.0],
+    })
+    return edc_df, lab_df
+
+def test_window_recon_matches_near_dates_and_flags_lab_issues():
+    """
+    A's lab one day off matches visit 1 and its re-sent S1 is a duplicate;
+    visit 2 has no lab within 2 days and its 10-days-late sample is an orphan.
+    B's second sample is a duplicate for the visit, C's S3 only collides with
+    another subject's ID, and D has no EDC visits at all.
+    """
+    edc_df, lab_df = _study()
+    _, exact_recon = run_checks(edc_df, lab_df)
+    assert exact_recon["SVSTDTC"].tolist() == ["2023-01-10"]
+    
+    _, recon_df = run_checks(edc_df, lab_df, tolerance_days=2)
+    summary = list(zip(recon_df["USUBJID"], recon_df["SVSTDTC"], recon_df["Query_Text"].str.split().str[0]))
+    assert summary == [
+        ("A", "2023-01-10", "Lab"),        # missing despite blood draw
+        ("A", "2023-01-20", "Lab"),        # orphan
+        ("B", "2023-01-06", "Duplicate"),
+        ("D", "2023-01-07", "Lab"),        # orphan
+        ("A", "2023-01-01", "Duplicate"),
+    ]
+    assert (recon_df["Query_Text"] == DUPLICATE_LAB_TEXT).sum() == 2
+
+def test_match_labs_agrees_with_cross_join():
+    """
+    Verifies the as-of join picks the nearest in-window visit a brute-force cross join would.
+    """
+    rng = np.random.default_rng(4)
+    # Visits >= 10 days apart, so each lab has at most one visit within the window
+    dates = pd.Timestamp("2023-01-01") + pd.to_timedelta(10 * rng.choice(1000, 600, replace=False), unit="D")
+    subjects = rng.choice(["S1", "S2", "S3"], 600)
+    edc_df = pd.DataFrame({"USUBJID": subjects[:300], "SVSTDTC": dates[:300].strftime("%Y-%m-%d")})
+    lab_df = pd.DataFrame({
+        "USUBJID": rng.choice(["S1", "S2", "S3", "S4"], 400),
+        "SVSTDTC": (dates[:300].append(dates[300:400]) + pd.to_timedelta(rng.integers(-4, 5, 400), unit="D")).strftime("%Y-%m-%d"),
+        "SampleID": [f"L{i}" for i in range(400)],
+    })
+    lab_visit, duplicate = match_labs(edc_df, lab_df, tolerance_days=3)
+    
+    cross = lab_df.reset_index().merge(edc_df.reset_index(), on="USUBJID", suffixes=("_lab", "_edc"))
+    cross["gap"] = (pd.to_datetime(cross["SVSTDTC_lab"]) - pd.to_datetime(cross["SVSTDTC_edc"])).abs().dt.days
+    cross = cross[cross["gap"] <= 3].sort_values(["gap", "index_lab"])
+    # Nearest visit per lab, then one lab per visit
+    nearest = cross.drop_duplicates("index_lab").drop_duplicates("index_edc")
+    
+    expected = np.full(len(lab_df), -1)
+    expected[nearest["index_lab"].to_numpy()] = nearest["index_edc"].to_numpy()
+    assert (lab_visit == expected).all()
+    assert (duplicate == (lab_df.index.isin(cross["index_lab"]) & (expected < 0))).all()
+
+def test_close_visits_each_keep_a_sample():
+    """
+    Visits 3 days apart with a 3-day window: S1 takes visit 1, S2 loses it
+    and falls back to visit 2 instead of being flagged, and S3 is left over
+    once both visits have a sample.
+    """
+    edc_df = pd.DataFrame({
+        "USUBJID": ["A", "A"],
+        "SVSTDTC": ["2023-01-01", "2023-01-04"],
+        "Blood_Draw_Performed": ["Yes", "Yes"],
+        "VSSTRESN_TEMP": [37.0, 37.0],
+        "VSSTRESN_HR": [70, 70],
+        "Raw_RR": [16, 16],
+    })
+    lab_df = pd.DataFrame({
+        "USUBJID": ["A", "A", "A"],
+        "SVSTDTC": ["2023-01-01", "2023-01-02", "2023-01-01"],
+        "SampleID": ["S1", "S2", "S3"],
+        "WBC": [5.0, 5.0, 5.0],
+    })
+    lab_visit, duplicate = match_labs(edc_df, lab_df, tolerance_days=3)
+    assert lab_visit.tolist() == [0, 1, -1]
+    assert duplicate.tolist() == [False, False, True]
+    
+    _, recon_df = run_checks(edc_df, lab_df.iloc[:2], tolerance_days=3)
+    assert recon_df.empty
@@ -0,0 +1,110 @@
+import io
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+from src.data_sim import generate_load_data
+from src.etl import clean_and_standardize
+from src.logic import run_query_checks
+from src.reporter import generate_excel, report_frames
+
+def _sheet_values(ws):
+    return [list(row) for row in ws.iter_rows(values_only=True)]
+
+def test_write_only_report_matches_cell_writer(tmp_path):
+    """
+    Verifies the streaming writer produces the same tabs, columns and values as
+    the cell-by-cell writer, with the header and query rows highlighted.
+    """
+    safety_df = pd.DataFrame({
+        "USUBJID": ["SUBJ-001", "SUBJ-002"],
+        "SVSTDTC": ["2023-01-01", "2023-01-02"],
+        "VSSTRESN_TEMP": [39.0, 35.5],
+        "VSSTRESN_HR": [100.0, np.nan],
+        "Raw_RR": [22, 24],
+        "WBC": [13.0, 3.1],
+        "Query_Text": ["Potential Sepsis: >= 2 criteria met. Please confirm clinical status."] * 2,
+    })
+    recon_df = pd.DataFrame(columns=["USUBJID", "SVSTDTC", "Blood_Draw_Performed", "SampleID", "Query_Text"])
+    
+    generate_excel(safety_df, recon_df, tmp_path / "cells.xlsx", write_only=False)
+    generate_excel(safety_df, recon_df, tmp_path / "stream.xlsx", write_only=True)
+    cells = load_workbook(tmp_path / "cells.xlsx")
+    stream = load_workbook(tmp_path / "stream.xlsx")
+    
+    assert stream.sheetnames == cells.sheetnames == ["Safety Queries", "Recon Queries"]
+    for name in cells.sheetnames:
+        assert _sheet_values(stream[name]) == _sheet_values(cells[name])
+        
+    ws = stream["Safety Queries"]
+    assert ws["A1"].fill.start_color.rgb.endswith("DDDDDD")
+    cf = list(ws.conditional_formatting)[0]
+    assert str(cf.sqref) == "A2:G3"
+    assert cf.rules[0].dxf.fill.start_color.rgb.endswith("FFCCCC")
+
+def test_default_writer_keeps_the_old_report(tmp_path):
+    """
+    Verifies callers of the old generate_excel(safety_df, recon_df, path)
+    signature, now on the write-only default, still get the cell writer's
+    tabs, values and colours, with fills shared through named styles.
+    """
+    safety_df = pd.DataFrame({"USUBJID": ["SUBJ-001"], "SVSTDTC": ["2023-01-01"], "Query_Text": ["Potential Sepsis"]})
+    recon_df = pd.DataFrame({"USUBJID": ["SUBJ-002", "SUBJ-003"], "Query_Text": ["Lab sample missing"] * 2})
+    generate_excel(safety_df, recon_df, tmp_path / "default.xlsx")
+    generate_excel(safety_df, recon_df, tmp_path / "cells.xlsx", write_only=False)
+    default = load_workbook(tmp_path / "default.xlsx")
+    cells = load_workbook(tmp_path / "cells.xlsx")
+    
+    for name in ["Safety Queries", "Recon Queries"]:
+        assert _sheet_values(default[name]) == _sheet_values(cells[name])
+        assert default[name]["A1"].style == cells[name]["A1"].style == "cdas_header"
+    assert {style for style in cells.named_styles} >= {"cdas_header", "cdas_safety", "cdas_recon"}
+    assert cells["Recon Queries"]["B3"].style == "cdas_recon"
+    assert cells["Recon Queries"]["B3"].fill.start_color.rgb.endswith("FFFFCC")
+    cf = list(default["Recon Queries"].conditional_formatting)[0]
+    assert str(cf.sqref) == "A2:B3"
+    assert cf.rules[0].dxf.fill.start_color.rgb.endswith("FFFFCC")
+
+def test_report_to_buffer():
+    """
+    Verifies the report can be built in memory for the dashboard download.
+    """
+    safety_df = pd.DataFrame({"USUBJID": ["SUBJ-001"], "Query_Text": ["Potential Sepsis"]})
+    recon_df = pd.DataFrame({"USUBJID": ["SUBJ-002"], "Query_Text": ["Lab sample missing"]})
+    report = io.BytesIO()
+    generate_excel(safety_df, recon_df, report)
+    
+    wb = load_workbook(io.BytesIO(report.getvalue()))
+    assert _sheet_values(wb["Recon Queries"]) == [["USUBJID", "Query_Text"], ["SUBJ-002", "Lab sample missing"]]
+
+def test_report_accepts_optimized_dtypes():
+    """
+    Verifies nullable Int16 / datetime64 columns (--optimize-dtypes) are written like the plain frame.
+    """
+    safety_df = pd.DataFrame({
+        "USUBJID": pd.Categorical(["SUBJ-001", "SUBJ-002"]),
+        "SVSTDTC": pd.to_datetime(["2023-01-01", "2023-01-02"]),
+        "VSSTRESN_HR": pd.array([100, None], dtype="Int16"),
+        "Query_Text": ["Potential Sepsis"] * 2,
+    })
+    report = io.BytesIO()
+    generate_excel(safety_df, safety_df.iloc[0:0], report)
+    rows = _sheet_values(load_workbook(report)["Safety Queries"])
+    assert rows[1] == ["SUBJ-001", "2023-01-01", 100, "Potential Sepsis"]
+
+def test_optimized_report_cells_match_plain_run(tmp_path):
+    """
+    Verifies every report cell written from --optimize-dtypes frames equals the
+    plain-dtype report (float32 vitals are written as their source decimals).
+    """
+    edc_path, lab_path = generate_load_data(500, visits_per_subject=2, seed=4, out_dir=tmp_path)
+    reports = []
+    for optimize in (False, True):
+        safety_df, recon_df = report_frames(run_query_checks(*clean_and_standardize(edc_path, lab_path, optimize=optimize)))
+        report = io.BytesIO()
+        generate_excel(safety_df, recon_df, report)
+        reports.append(load_workbook(report))
+    plain, optimized = reports
+    assert len(_sheet_values(plain["Safety Queries"])) > 1
+    for name in plain.sheetnames:
+        assert _sheet_values(optimized[name]) == _sheet_values(plain[name])
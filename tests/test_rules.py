@@ -0,0 +1,96 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from src.etl import optimize_dtypes
+from src.logic import run_checks
+from src.rules import compile_rules, load_rules
+
+def _hardcoded_checks(edc_df, lab_df):
+    """
+    The SIRS and recon expressions as they were written before the rules engine.
+    """
+    merged_df = pd.merge(edc_df, lab_df, on=["USUBJID", "SVSTDTC"], how="left")
+    recon_mask = (merged_df["Blood_Draw_Performed"] == "Yes") & (merged_df["SampleID"].isnull())
+    temp_flag = (merged_df["VSSTRESN_TEMP"] > 38) | (merged_df["VSSTRESN_TEMP"] < 36)
+    hr_flag = merged_df["VSSTRESN_HR"] > 90
+    rr_flag = merged_df["Raw_RR"] > 20
+    wbc_flag = (merged_df["WBC"] > 12) | (merged_df["WBC"] < 4)
+    criteria_count = temp_flag.astype(int) + hr_flag.astype(int) + rr_flag.astype(int) + wbc_flag.astype(int)
+    return merged_df[criteria_count >= 2], merged_df[recon_mask]
+
+def _random_study(n, seed=0):
+    rng = np.random.default_rng(seed)
+    edc_df = pd.DataFrame({
+        "USUBJID": [f"SUBJ-{i:04d}" for i in range(n)],
+        "SVSTDTC": "2023-01-01",
+        "VSSTRESN_TEMP": np.where(rng.random(n) < 0.1, np.nan, rng.uniform(35, 40, n).round(1)),
+        "VSSTRESN_HR": np.where(rng.random(n) < 0.1, np.nan, rng.integers(60, 120, n)),
+        "Raw_RR": rng.integers(12, 25, n),
+        "Blood_Draw_Performed": rng.choice(["Yes", "No"], n),
+    })
+    lab_df = edc_df.loc[rng.random(n) < 0.7, ["USUBJID", "SVSTDTC"]].reset_index(drop=True)
+    lab_df["SampleID"] = [f"SMP-{i}" for i in range(len(lab_df))]
+    lab_df["WBC"] = rng.uniform(3, 15, len(lab_df)).round(1)
+    return edc_df, lab_df
+
+def test_default_rules_match_hardcoded_checks():
+    """
+    Verifies the default edit_checks.json spec flags exactly the rows the
+    hardcoded SIRS and recon expressions did.
+    """
+    edc_df, lab_df = _random_study(2000)
+    safety_df, recon_df = run_checks(edc_df, lab_df)
+    expected_safety, expected_recon = _hardcoded_checks(edc_df, lab_df)
+    
+    assert safety_df.index.tolist() == expected_safety.index.tolist()
+    assert recon_df.index.tolist() == expected_recon.index.tolist()
+    assert set(safety_df["Query_Text"]) == {"Potential Sepsis: >= 2 criteria met. Please confirm clinical status."}
+
+def test_custom_rules_from_json(tmp_path):
+    """
+    Verifies a custom spec: several checks on the same output each raise their
+    own query, and shared criteria are evaluated once.
+    """
+    spec = load_rules()
+    spec["checks"].append({
+        "name": "TACHYCARDIA",
+        "output": "safety",
+        "query_text": "HR > 90 bpm. Please confirm.",
+        "criteria": [{"field": "VSSTRESN_HR", "comparator": ">", "thresholds": [90]}],
+    })
+    spec_path = tmp_path / "checks.json"
+    spec_path.write_text(json.dumps(spec))
+    rules = compile_rules(load_rules(spec_path))
+    assert len(rules.criteria) == 6 # HR > 90 shared by SIRS and TACHYCARDIA
+    
+    edc_df, lab_df = _random_study(300, seed=1)
+    safety_df, _ = run_checks(edc_df, lab_df, rules=rules)
+    tachy = safety_df[safety_df["Query_Text"] == "HR > 90 bpm. Please confirm."]
+    merged_hr = pd.merge(edc_df, lab_df, on=["USUBJID", "SVSTDTC"], how="left")["VSSTRESN_HR"]
+    assert tachy.index.tolist() == merged_hr.index[merged_hr > 90].tolist()
+
+def test_decimal_thresholds_on_optimized_dtypes():
+    """
+    Verifies one-decimal thresholds flag the same rows on float32 vitals
+    (--optimize-dtypes) as on float64, including values equal to the threshold.
+    """
+    spec = {"checks": [{"name": "FEVER", "output": "safety", "query_text": "Fever", "min_criteria": 1,
+                        "criteria": [{"field": "VSSTRESN_TEMP", "comparator": ">=", "thresholds": [38.3]},
+                                     {"field": "VSSTRESN_TEMP", "comparator": "between", "thresholds": [35.1, 35.7]},
+                                     {"field": "WBC", "comparator": "<=", "thresholds": [3.3]}]}]}
+    rules = compile_rules(spec)
+    edc_df, lab_df = _random_study(3000, seed=4)
+    edc_opt, lab_opt = optimize_dtypes(edc_df, lab_df)
+    assert edc_opt["VSSTRESN_TEMP"].dtype == np.float32
+    
+    safety_df, _ = run_checks(edc_df, lab_df, rules=rules)
+    safety_opt, _ = run_checks(edc_opt, lab_opt, rules=rules)
+    assert (safety_df["VSSTRESN_TEMP"] == 38.3).any()
+    assert safety_opt.index.tolist() == safety_df.index.tolist()
+
+def test_invalid_rule_rejected():
+    spec = {"checks": [{"name": "BAD", "output": "safety", "query_text": "x",
+                        "criteria": [{"field": "WBC", "comparator": "outside", "thresholds": [4]}]}]}
+    with pytest.raises(ValueError, match="threshold"):
+        compile_rules(spec)
@@ -0,0 +1,109 @@
+import os
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+import main
+from src.reporter import generate_excel
+from src.shards import shard_queries, write_report_shards
+
+def _queries():
+    safety_df = pd.DataFrame({
+        "USUBJID": ["SUBJ-003", "SUBJ-001", "SUBJ-004"],
+        "SVSTDTC": ["2023-01-01", "2023-01-02", "2023-01-03"],
+        "WBC": [13.0, 3.1, 14.0],
+        "Query_Text": ["Potential Sepsis: >= 2 criteria met. Please confirm clinical status."] * 3,
+    })
+    recon_df = pd.DataFrame({
+        "USUBJID": ["SUBJ-002", "SUBJ-004"],
+        "SVSTDTC": ["2023-01-05", "2023-01-06"],
+        "SampleID": [None, None],
+        "Query_Text": ["Lab sample missing despite blood draw confirmation."] * 2,
+    })
+    return safety_df, recon_df
+
+def test_shards_split_by_query_and_subject_range():
+    """
+    Verifies query shards are named after their check and subject shards hold
+    consecutive sorted subject ranges across both tabs, keeping row order.
+    """
+    safety_df, recon_df = _queries()
+    by_query = shard_queries(safety_df, recon_df, by="query")
+    assert [(name, len(s), len(r)) for name, s, r in by_query] == [("SIRS", 3, 0), ("MISSING_LAB", 0, 2)]
+    
+    by_subjects = shard_queries(safety_df, recon_df, by="subjects", subjects_per_shard=2)
+    assert [name for name, _, _ in by_subjects] == ["subjects_0001", "subjects_0002"]
+    assert by_subjects[0][1]["USUBJID"].tolist() == ["SUBJ-001"]
+    assert by_subjects[0][2]["USUBJID"].tolist() == ["SUBJ-002"]
+    assert by_subjects[1][1]["USUBJID"].tolist() == ["SUBJ-003", "SUBJ-004"]
+    
+    with pytest.raises(ValueError):
+        shard_queries(safety_df, recon_df, by="site")
+
+@pytest.mark.parametrize("fmt, workers", [("xlsx", 2), ("csv", 1), ("parquet", 1)])
+def test_write_report_shards_writes_index(tmp_path, fmt, workers):
+    """
+    Verifies every shard file exists, is listed in report_index.csv and holds its queries.
+    """
+    safety_df, recon_df = _queries()
+    index_df = write_report_shards(safety_df, recon_df, tmp_path, by="subjects", fmt=fmt,
+                                   workers=workers, subjects_per_shard=2)
+    
+    assert pd.read_csv(tmp_path / "report_index.csv")["file"].tolist() == index_df["file"].tolist()
+    assert index_df["rows"].sum() == len(safety_df) + len(recon_df)
+    assert all(os.path.exists(tmp_path / f) for f in index_df["file"])
+    first = index_df.iloc[0]
+    if fmt == "xlsx":
+        rows = list(load_workbook(tmp_path / first["file"])["Safety Queries"].iter_rows(values_only=True))
+        assert len(rows) == first["rows"] + 1
+    else:
+        shard = pd.read_csv(tmp_path / first["file"]) if fmt == "csv" else pd.read_parquet(tmp_path / first["file"])
+        assert shard["USUBJID"].tolist() == ["SUBJ-001"]
+
+def test_report_continues_on_numbered_sheets(tmp_path):
+    """
+    Verifies tabs longer than max_sheet_rows are split over "Tab", "Tab (2)", ...
+    """
+    safety_df, recon_df = _queries()
+    generate_excel(safety_df, recon_df, tmp_path / "capped.xlsx", max_sheet_rows=2)
+    wb = load_workbook(tmp_path / "capped.xlsx")
+    assert wb.sheetnames == ["Safety Queries", "Safety Queries (2)", "Recon Queries"]
+    assert [r[0] for r in wb["Safety Queries (2)"].iter_rows(values_only=True)] == ["USUBJID", "SUBJ-004"]
+
+def test_site_shards_keep_unassigned_rows_and_unique_names(tmp_path):
+    """
+    Verifies queries without a site get an "unassigned" shard, and sites whose
+    names slug the same still get separate files in the index.
+    """
+    safety_df, recon_df = _queries()
+    safety_df["SITEID"] = ["A-1", "A 1", None]
+    recon_df["SITEID"] = ["A-1", "B"]
+    shards = shard_queries(safety_df, recon_df, by="site")
+    assert [(name, len(s), len(r)) for name, s, r in shards] == [("a_1", 1, 1), ("a_1_2", 1, 0), ("unassigned", 1, 0), ("b", 0, 1)]
+    
+    index_df = write_report_shards(safety_df, recon_df, tmp_path, by="site", fmt="csv", workers=1)
+    assert index_df["file"].is_unique
+    assert index_df["rows"].sum() == len(safety_df) + len(recon_df)
+
+def test_cli_shards_by_site_column_of_edc(tmp_path):
+    """
+    Verifies the default CLI path carries SITEID through to the site shards.
+    """
+    edc_path = tmp_path / "edc.csv"
+    lab_path = tmp_path / "lab.csv"
+    pd.DataFrame({
+        "SubjectID": ["SUBJ-001", "SUBJ-002"],
+        "SITEID": ["101", "102"],
+        "VisitDate": ["2023-01-01", "2023-01-02"],
+        "PatientInitials": ["ABC", "DEF"],
+        "DateOfBirth": ["1980-05-12", "1975-11-02"],
+        "Raw_Temp": ["39.2 C", "37.0 C"],
+        "Raw_HR": ["120", "70"],
+        "Raw_RR": [12, 12],
+        "Blood_Draw_Performed": ["No", "Yes"],
+    }).to_csv(edc_path, index=False)
+    pd.DataFrame(columns=["SubjectID", "VisitDate", "SampleID", "WBC"]).to_csv(lab_path, index=False)
+    
+    main.main(["--edc", str(edc_path), "--lab", str(lab_path), "--shard-by", "site", "--report-format", "csv",
+               "--report-dir", str(tmp_path / "out")])
+    index_df = pd.read_csv(tmp_path / "out" / "report_index.csv")
+    assert sorted(index_df.loc[index_df["rows"] > 0, "shard"].astype(str)) == ["101", "102"]
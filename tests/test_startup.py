@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _loaded_after(code, modules):
+    check = f"{code}; import sys; print(','.join(m for m in {modules!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", check], cwd=REPO_ROOT, check=True, capture_output=True, text=True)
+    return [m for m in result.stdout.strip().split(",") if m]
+
+def test_cli_startup_does_not_load_data_stack():
+    """
+    Verifies the CLI and reporter only pull in heavy dependencies when they are used.
+    """
+    heavy = ["pandas", "numpy", "openpyxl", "pyarrow", "src.data_sim"]
+    assert _loaded_after("import main; main.parse_args(['--region', 'USA (HIPAA)'])", heavy) == []
+    assert _loaded_after("import src.reporter", ["openpyxl", "src.data_sim"]) == []
+    assert _loaded_after("import src.batch", ["openpyxl", "src.data_sim"]) == []
+    
+    help_text = subprocess.run([sys.executable, "main.py", "--help"], cwd=REPO_ROOT, check=True, capture_output=True, text=True).stdout
+    assert "Alberta (HIA)" in help_text